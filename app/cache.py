@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_TTL = int(os.getenv('CACHE_TTL', 60))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+MISSING = object()
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value, ttl: int):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    async def delete_prefix(self, prefix: str):
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            del self.entries[key]
+
+    async def close(self):
+        self.entries.clear()
+
+
+class RedisBackend:
+    def __init__(self, url: str = REDIS_URL, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+
+    async def get(self, key: str):
+        value = await self.client.get(key)
+        return MISSING if value is None else pickle.loads(value)
+
+    async def set(self, key: str, value, ttl: int):
+        await self.client.set(key, pickle.dumps(value), ex=ttl)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def delete_prefix(self, prefix: str):
+        keys = [key async for key in self.client.scan_iter(match=f'{prefix}*', count=500)]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class Cache:
+    def __init__(self, backend, ttl: int = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.loading = {}
+        self.locks = {}
+
+    async def get_or_load(self, key: str, loader, ttl: int = None):
+        value = await self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                value = await self.backend.get(key)
+                if value is not MISSING:
+                    self.hits += 1
+                    return value
+                self.misses += 1
+                self.loading[key] = 0
+                try:
+                    value = await loader()
+                finally:
+                    invalidated = self.loading.pop(key)
+                if not invalidated:
+                    await self.backend.set(key, value, ttl or self.ttl)
+                return value
+        finally:
+            if not lock.locked() and self.locks.get(key) is lock:
+                del self.locks[key]
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            if key in self.loading:
+                self.loading[key] += 1
+        self.invalidations += len(keys)
+        await self.backend.delete(*keys)
+
+    async def invalidate_prefix(self, prefix: str):
+        for key in self.loading:
+            if key.startswith(prefix):
+                self.loading[key] += 1
+        self.invalidations += 1
+        await self.backend.delete_prefix(prefix)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations}
+
+    async def close(self):
+        await self.backend.close()
+
+
+def build_cache():
+    if CACHE_BACKEND == 'redis':
+        try:
+            return Cache(RedisBackend())
+        except ImportError:
+            logger.error("CACHE_BACKEND=redis requires the 'redis' package, falling back to memory")
+    return Cache(MemoryBackend())
+
+
+cache = build_cache()
@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import re
+import statistics
+import sys
+import time
+from app.database import connect_to_mongo, close_mongo_connection, mongo
+from app.services.indexes import ensure_indexes, check_query_plans
+from app.services.books import BookService
+from app.services.recommendations import RECOMMEND_TOP_K, RecommendationService
+from app.services.reviews import ReviewService
+from app.services.rollups import RollupService
+from app.services.snapshots import SnapshotService
+from app.services.transfer import FORMATS, IMPORT_CHUNK_SIZE, RESTORE_ORDER, export_stream, import_file
+
+
+async def explain_command(args):
+    if args.create_indexes:
+        await ensure_indexes(mongo.db)
+    report = await check_query_plans(mongo.db)
+    for plan in report:
+        flag = 'COLLSCAN' if plan['collscan'] else 'ok'
+        print(f"{flag:<9} {plan['service']}.{plan['method']:<16} {plan['collection']:<12} {' > '.join(plan['stages'])}")
+    return 1 if any(plan['collscan'] for plan in report) else 0
+
+
+async def reconcile_ratings_command(args):
+    repaired = await ReviewService(mongo.db).reconcile_book_ratings(batch_size=args.batch_size)
+    print(f"Repaired rating counters on {repaired} books")
+    return 0
+
+
+async def rebuild_rollups_command(args):
+    repaired = await RollupService(mongo.db, batch_size=args.batch_size).rebuild()
+    print(f"Repaired rollups on {repaired['authors']} authors, {repaired['categories']} categories and {repaired['users']} users")
+    return 0
+
+
+async def rebuild_similarities_command(args):
+    started = time.perf_counter()
+    result = await RecommendationService(mongo.db, top_k=args.top_k, batch_size=args.batch_size).rebuild()
+    print(f"Stored top {args.top_k} similar books for {result['books']} books from {result['users']} users "
+          f"with {result['engine']}, removed {result['removed']} stale rows in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+async def backfill_search_command(args):
+    updated = await BookService(mongo.db).backfill_search_terms(batch_size=args.batch_size, refresh=args.all)
+    print(f"Added search terms to {updated} books")
+    return 0
+
+
+async def refresh_snapshots_command(args):
+    resumed = await SnapshotService(mongo.db, batch_size=args.batch_size).resume_jobs(include_failed=True)
+    print(f"Ran {resumed} unfinished snapshot jobs")
+    return 0
+
+
+async def export_command(args):
+    fmt = args.format or ('csv' if '.csv' in args.output else 'ndjson')
+    started = time.perf_counter()
+    written = 0
+    with open(args.output, 'wb') as output:
+        async for chunk in export_stream(mongo.db, args.collection, fmt, args.output.endswith('.gz'), include_secrets=True):
+            output.write(chunk)
+            written += len(chunk)
+    print(f"Exported {args.collection} to {args.output} ({written} bytes in {time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+async def import_command(args):
+    try:
+        state = await import_file(mongo.db, args.collection, args.path, fmt=args.format, chunk_size=args.chunk_size,
+                                  checkpoint_path=args.checkpoint, restart=args.restart)
+    except ValueError as e:
+        print(str(e))
+        return 1
+    print(f"Imported {args.collection}: {state['records']} records, {state['inserted']} inserted, "
+          f"{state['duplicates']} duplicates, {state['rejected']} rejected in {state['seconds']}s "
+          f"({state['records_per_second']} records/s)")
+    return 1 if state['rejected'] else 0
+
+
+async def _time_query(run_query, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run_query()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+async def bench_search_command(args):
+    service = BookService(mongo.db)
+    print(f"{'query':<20} {'text p50':>9} {'text p95':>9} {'regex p50':>10} {'regex p95':>10}  (ms)")
+    for text in args.queries:
+        regex = {'$or': [{field: {'$regex': re.escape(text), '$options': 'i'}} for field in service.text_paths]}
+        text_p50, text_p95 = await _time_query(lambda: service.search_books(text, size=args.size), args.repeat)
+        regex_p50, regex_p95 = await _time_query(lambda: service.collection.find(regex).limit(args.size).to_list(args.size), args.repeat)
+        print(f"{text:<20} {text_p50:>9.2f} {text_p95:>9.2f} {regex_p50:>10.2f} {regex_p95:>10.2f}")
+    return 0
+
+
+async def run(args):
+    await connect_to_mongo()
+    try:
+        return await args.command(args)
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description='Bookshelf manager admin commands')
+    commands = parser.add_subparsers(required=True)
+
+    explain = commands.add_parser('explain', help='Explain every service query and flag collection scans')
+    explain.add_argument('--create-indexes', action='store_true', help='Apply the index registry first')
+    explain.set_defaults(command=explain_command)
+
+    reconcile = commands.add_parser('reconcile-ratings', help='Recompute book rating counters from reviews')
+    reconcile.add_argument('--batch-size', type=int, default=1000)
+    reconcile.set_defaults(command=reconcile_ratings_command)
+
+    rollups = commands.add_parser('rebuild-rollups', help='Recompute author, category and user totals from books and reviews')
+    rollups.add_argument('--batch-size', type=int, default=1000)
+    rollups.set_defaults(command=rebuild_rollups_command)
+
+    similarities = commands.add_parser('rebuild-similarities', help='Recompute the similar books of every book from favorites and reviews')
+    similarities.add_argument('--batch-size', type=int, default=1000)
+    similarities.add_argument('--top-k', type=int, default=RECOMMEND_TOP_K)
+    similarities.set_defaults(command=rebuild_similarities_command)
+
+    backfill = commands.add_parser('backfill-search', help='Add autocomplete search terms to books missing them')
+    backfill.add_argument('--batch-size', type=int, default=1000)
+    backfill.add_argument('--all', action='store_true', help='Recompute search terms for every book, not only those missing them')
+    backfill.set_defaults(command=backfill_search_command)
+
+    refresh = commands.add_parser('refresh-snapshots', help='Finish pending or failed author and category snapshot jobs')
+    refresh.add_argument('--batch-size', type=int, default=1000)
+    refresh.set_defaults(command=refresh_snapshots_command)
+
+    export = commands.add_parser('export', help='Stream a collection to an NDJSON or CSV file, gzipped if it ends in .gz')
+    export.add_argument('collection', choices=RESTORE_ORDER)
+    export.add_argument('--output', required=True)
+    export.add_argument('--format', choices=FORMATS, help='Defaults to the output file extension')
+    export.set_defaults(command=export_command)
+
+    load = commands.add_parser('import', help='Bulk insert an NDJSON or CSV export, resuming from its checkpoint')
+    load.add_argument('collection', choices=RESTORE_ORDER,
+                      help=f"Restore collections in this order so references resolve: {', '.join(RESTORE_ORDER)}")
+    load.add_argument('path')
+    load.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+    load.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    load.add_argument('--checkpoint', help='Progress file, defaults to PATH.checkpoint')
+    load.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+    load.set_defaults(command=import_command)
+
+    bench = commands.add_parser('bench-search', help='Compare text index search latency against a regex scan')
+    bench.add_argument('queries', nargs='+', help='Search strings to time')
+    bench.add_argument('--repeat', type=int, default=20)
+    bench.add_argument('--size', type=int, default=20)
+    bench.set_defaults(command=bench_search_command)
+
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
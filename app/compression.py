@@ -0,0 +1,168 @@
+import logging
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from app.etags import encoded
+from app.metrics import COMPRESSION_BYTES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_ENCODINGS = os.getenv('COMPRESSION_ENCODINGS', 'br,zstd,gzip')
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv('COMPRESSION_ZSTD_LEVEL', 3))
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+class GzipEncoder:
+    def __init__(self):
+        self.compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def available_encoders(names: str = COMPRESSION_ENCODINGS):
+    supported = {'gzip': GzipEncoder, 'br': BrotliEncoder if brotli else None, 'zstd': ZstdEncoder if zstandard else None}
+    encoders = {}
+    for name in (name.strip() for name in names.split(',') if name.strip()):
+        if name not in supported:
+            logger.warning(f"Unknown compression '{name}' ignored")
+        elif supported[name] is not None:
+            encoders[name] = supported[name]
+    return encoders
+
+
+def negotiate(header: str, preference: list):
+    weights = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for name in preference:
+        weight = weights.get(name, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, encodings: str = COMPRESSION_ENCODINGS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders(encodings)
+
+    def _compressible(self, start: dict, headers: MutableHeaders):
+        return (start['status'] not in (204, 304) and 'content-encoding' not in headers
+                and headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES)
+                and 'no-transform' not in headers.get('cache-control', ''))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.encoders:
+            return await self.app(scope, receive, send)
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get('accept-encoding', ''), list(self.encoders))
+        validators = [candidate.strip().removeprefix('W/') for candidate in request_headers.get('if-none-match', '').split(',')]
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                return await send(message)
+            body, more_body = message.get('body', b''), message.get('more_body', False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start['headers'])
+                if start['status'] == 304 and encoding and 'etag' in headers:
+                    tag = encoded(headers['etag'], encoding)
+                    if tag in validators:
+                        headers['ETag'] = tag
+                        headers.add_vary_header('Accept-Encoding')
+                if not self._compressible(start, headers):
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                headers.add_vary_header('Accept-Encoding')
+                if encoding is None or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                encoder = self.encoders[encoding]()
+                headers['Content-Encoding'] = encoding
+                if 'etag' in headers:
+                    headers['ETag'] = encoded(headers['etag'], encoding)
+                if 'content-length' in headers:
+                    del headers['Content-Length']
+                if not more_body:
+                    data = encoder.compress(body) + encoder.finish()
+                    headers['Content-Length'] = str(len(data))
+                    COMPRESSION_BYTES.labels(encoding, 'raw').inc(len(body))
+                    COMPRESSION_BYTES.labels(encoding, 'sent').inc(len(data))
+                    await send(start)
+                    return await send({'type': 'http.response.body', 'body': data})
+                await send(start)
+            data = encoder.compress(body) + (encoder.flush() if more_body else encoder.finish())
+            COMPRESSION_BYTES.labels(encoding, 'raw').inc(len(body))
+            COMPRESSION_BYTES.labels(encoding, 'sent').inc(len(data))
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+        await self.app(scope, receive, send_wrapper)
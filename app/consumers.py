@@ -0,0 +1,68 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.cache import cache
+from app.singleflight import flights
+from app.services.recommendations import RecommendationService
+from app.services.rollups import BOOK_FIELDS, RollupService, _category_id
+from app.services.snapshots import SnapshotService
+
+SNAPSHOT_REFERENCES = {'authors': 'author', 'categories': 'category'}
+LIKE_FIELDS = ('book_id', 'rating', 'user_id')
+
+
+async def refresh_rollups(db: AsyncIOMotorDatabase, events: list):
+    author_ids, category_ids, user_ids = set(), set(), set()
+    for event in events:
+        docs = [doc for doc in (event.document, event.previous) if doc]
+        if event.collection == 'books' and (event.operation != 'update' or set(event.changed) & set(BOOK_FIELDS)):
+            author_ids.update(doc['author_id'] for doc in docs if doc.get('author_id'))
+            category_ids.update(_category_id(doc) for doc in docs if _category_id(doc))
+        elif event.collection == 'reviews' and (event.operation != 'update' or 'user_id' in event.changed):
+            user_ids.update(doc['user_id'] for doc in docs if doc.get('user_id'))
+    if author_ids or category_ids or user_ids:
+        await RollupService(db).refresh(author_ids, category_ids, user_ids)
+
+
+async def schedule_snapshots(db: AsyncIOMotorDatabase, events: list):
+    renamed = dict.fromkeys((event.collection, event.document_id) for event in events
+                            if event.operation == 'update' and 'name' in event.changed)
+    service = SnapshotService(db)
+    for collection, ref_id in renamed:
+        await service.schedule(SNAPSHOT_REFERENCES[collection], ref_id)
+
+
+async def update_similarities(db: AsyncIOMotorDatabase, events: list):
+    book_ids, removed = set(), set()
+    for event in events:
+        if event.collection == 'books':
+            if event.operation == 'delete':
+                removed.add(event.document_id)
+        elif event.collection == 'reviews' and (event.operation != 'update' or set(event.changed) & set(LIKE_FIELDS)):
+            book_ids.update(doc['book_id'] for doc in (event.document, event.previous)
+                            if doc and doc.get('user_id') and doc.get('book_id'))
+        elif event.collection == 'users' and (event.operation != 'update' or 'favorite_books' in event.changed):
+            current = set((event.document or {}).get('favorite_books') or [])
+            before = set((event.previous or {}).get('favorite_books') or [])
+            book_ids.update(current ^ before if event.previous else current)
+    service = RecommendationService(db)
+    if removed:
+        await service.remove_books(removed)
+    if book_ids - removed:
+        await service.refresh(book_ids - removed)
+
+
+async def invalidate_caches(db: AsyncIOMotorDatabase, events: list):
+    book_ids = {event.document_id for event in events if event.collection == 'books'}
+    if book_ids:
+        keys = [f'books:{book_id}' for book_id in book_ids]
+        flights.forget(*keys)
+        await cache.invalidate(*keys)
+        await cache.invalidate_prefix('books:list:')
+    if any(event.collection == 'categories' for event in events):
+        await cache.invalidate_prefix('categories:')
+
+
+def register_consumers(bus):
+    bus.subscribe('rollups', refresh_rollups, ('books', 'reviews'))
+    bus.subscribe('snapshots', schedule_snapshots, ('authors', 'categories'))
+    bus.subscribe('similarities', update_similarities, ('books', 'reviews', 'users'))
+    bus.subscribe('cache', invalidate_caches, ('books', 'categories'), shared=False, streams_only=True)
@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_REJECTED, PASSWORD_HASH_WAITING
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_N = int(os.getenv('PASSWORD_HASH_N', 2 ** 14))
+PASSWORD_HASH_R = int(os.getenv('PASSWORD_HASH_R', 8))
+PASSWORD_HASH_P = int(os.getenv('PASSWORD_HASH_P', 1))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_WAITING = int(os.getenv('PASSWORD_HASH_MAX_WAITING', 256))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _b64(data: bytes):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _unb64(data: str):
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES)
+
+
+def hash_password(password: str, n: int = PASSWORD_HASH_N, r: int = PASSWORD_HASH_R, p: int = PASSWORD_HASH_P):
+    salt = os.urandom(SALT_BYTES)
+    return f'scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}'
+
+
+def verify_password(password: str, stored: str):
+    try:
+        scheme, n, r, p, salt, key = stored.split('$')
+        if scheme != 'scrypt':
+            return False
+        return hmac.compare_digest(_scrypt(password, _unb64(salt), int(n), int(r), int(p)), _unb64(key))
+    except (ValueError, TypeError):
+        return False
+
+
+class PasswordHasher:
+    def __init__(self, n: int = PASSWORD_HASH_N, r: int = PASSWORD_HASH_R, p: int = PASSWORD_HASH_P,
+                 workers: int = PASSWORD_HASH_WORKERS, max_waiting: int = PASSWORD_HASH_MAX_WAITING):
+        self.n, self.r, self.p = n, r, p
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self.executor = None
+        self.slots = None
+        self.decoy = None
+
+    @property
+    def parameters(self):
+        return f'scrypt${self.n}${self.r}${self.p}$'
+
+    def needs_rehash(self, stored: str):
+        return not stored or not stored.startswith(self.parameters)
+
+    async def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            self.slots = asyncio.Semaphore(self.workers)
+        if self.waiting >= self.max_waiting:
+            PASSWORD_HASH_REJECTED.inc()
+            raise HasherBusy("Too many password checks in progress")
+        self.waiting += 1
+        PASSWORD_HASH_WAITING.inc()
+        try:
+            async with self.slots:
+                started = time.perf_counter()
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+                PASSWORD_HASH_DURATION.observe(time.perf_counter() - started)
+                return result
+        finally:
+            self.waiting -= 1
+            PASSWORD_HASH_WAITING.dec()
+
+    async def hash(self, password: str):
+        return await self._run(hash_password, password, self.n, self.r, self.p)
+
+    async def verify(self, password: str, stored: str):
+        return await self._run(verify_password, password, stored)
+
+    async def verify_missing(self, password: str):
+        if self.decoy is None:
+            self.decoy = await self.hash(os.urandom(SALT_BYTES).hex())
+        await self.verify(password, self.decoy)
+        return False
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("Stopped password hashing workers")
+        self.executor = None
+        self.slots = None
+
+
+passwords = PasswordHasher()
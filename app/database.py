@@ -1,10 +1,57 @@
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from app.metrics import CommandTimer
 
+logger = logging.getLogger(__name__)
 
-async def get_database():
-    # mongo_url = os.getenv('MONGO_URL')
-    client = AsyncIOMotorClient('mongodb://localhost:27017')
-    db = client['bookshelf']
-    yield db
-    client.close()
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'bookshelf')
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+
+
+class Mongo:
+    client: AsyncIOMotorClient = None
+    db: AsyncIOMotorDatabase = None
+
+
+mongo = Mongo()
+
+
+async def connect_to_mongo():
+    mongo.client = AsyncIOMotorClient(MONGO_URL,
+                                      maxPoolSize=MONGO_MAX_POOL_SIZE,
+                                      minPoolSize=MONGO_MIN_POOL_SIZE,
+                                      maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                                      waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                                      serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                                      event_listeners=[CommandTimer()])
+    mongo.db = mongo.client[MONGO_DB_NAME]
+    logger.info(f"Connected to MongoDB database '{MONGO_DB_NAME}' (max pool size {MONGO_MAX_POOL_SIZE})")
+
+
+async def close_mongo_connection():
+    if mongo.client is not None:
+        mongo.client.close()
+        logger.info("Closed MongoDB connection")
+    mongo.client = None
+    mongo.db = None
+
+
+async def ping_database() -> bool:
+    if mongo.db is None:
+        return False
+    try:
+        await mongo.db.command('ping')
+        return True
+    except Exception as e:
+        logger.error(f"MongoDB ping failed: {str(e)}")
+        return False
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    return mongo.db
@@ -0,0 +1,41 @@
+import re
+from typing import Optional
+from fastapi import HTTPException, Response, status
+
+ENCODED_TAG = re.compile(r'^(".*)-(?:gzip|br|zstd)"$')
+
+
+def etag(*parts) -> str:
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def encoded(tag: str, encoding: str) -> str:
+    if tag.startswith('W/') or not tag.endswith('"'):
+        return tag
+    return f'{tag[:-1]}-{encoding}"'
+
+
+def identity(tag: str) -> str:
+    match = ENCODED_TAG.match(tag)
+    return f'{match.group(1)}"' if match else tag
+
+
+def matches(header: Optional[str], tag: str) -> bool:
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or any(identity(candidate.removeprefix('W/')) == tag for candidate in candidates)
+
+
+def not_modified(tag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': tag})
+
+
+def expected_version(header: Optional[str], resource_id: str) -> Optional[int]:
+    if not header or header.strip() == '*':
+        return None
+    prefix = f'"{resource_id}-'
+    tag = identity(header.strip())
+    if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+        return int(tag[len(prefix):-1])
+    raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="If-Match does not match the current version")
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from app.metrics import (EVENT_BATCH_DURATION, EVENT_CONSUMER_FAILURES, EVENT_CONSUMER_LAG, EVENT_CONSUMER_OVERFLOW,
+                         EVENT_CONSUMER_PENDING, EVENTS_PUBLISHED)
+from app.schemas.events import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_SOURCE = os.getenv('EVENT_SOURCE', 'memory')
+EVENT_BATCH_SIZE = int(os.getenv('EVENT_BATCH_SIZE', 500))
+EVENT_FLUSH_MS = int(os.getenv('EVENT_FLUSH_MS', 100))
+EVENT_MAX_ATTEMPTS = int(os.getenv('EVENT_MAX_ATTEMPTS', 5))
+EVENT_RETRY_DELAY = float(os.getenv('EVENT_RETRY_DELAY', 0.5))
+EVENT_LEASE_SECONDS = int(os.getenv('EVENT_LEASE_SECONDS', 30))
+EVENT_QUEUE_MAX = int(os.getenv('EVENT_QUEUE_MAX', 10000))
+EVENT_BLOCK_MS = int(os.getenv('EVENT_BLOCK_MS', 1000))
+
+OPERATIONS = {'insert': 'insert', 'update': 'update', 'replace': 'update', 'delete': 'delete'}
+
+
+def from_change(change: dict):
+    description = change.get('updateDescription') or {}
+    changed = list(description.get('updatedFields', {})) + list(description.get('removedFields', []))
+    if change['operationType'] != 'update':
+        changed = list(change.get('fullDocument') or {})
+    occurred_at = change.get('wallTime') or change['clusterTime'].as_datetime()
+    if occurred_at.tzinfo is None:
+        occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+    return ChangeEvent(collection=change['ns']['coll'], operation=OPERATIONS[change['operationType']],
+                       document_id=str(change['documentKey']['_id']),
+                       changed=list(dict.fromkeys(field.split('.')[0] for field in changed)),
+                       document=change.get('fullDocument'), previous=change.get('fullDocumentBeforeChange'),
+                       occurred_at=occurred_at)
+
+
+class Consumer:
+    def __init__(self, name: str, handler, collections: tuple, shared: bool = True, streams_only: bool = False,
+                 batch_size: int = EVENT_BATCH_SIZE, interval: float = EVENT_FLUSH_MS / 1000,
+                 max_pending: int = EVENT_QUEUE_MAX, block_timeout: float = EVENT_BLOCK_MS / 1000):
+        self.name = name
+        self.handler = handler
+        self.collections = collections
+        self.shared = shared
+        self.streams_only = streams_only
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self.queue = deque()
+        self.oldest = None
+        self.wakeup = asyncio.Event()
+        self.space = asyncio.Condition()
+        self.flushing = asyncio.Lock()
+        EVENT_CONSUMER_PENDING.labels(name).set_function(lambda: len(self.queue))
+        EVENT_CONSUMER_LAG.labels(name).set_function(self.lag)
+
+    def lag(self):
+        started = [self.queue[0].occurred_at] if self.queue else []
+        if self.oldest is not None:
+            started.append(self.oldest)
+        return (datetime.now(timezone.utc) - min(started)).total_seconds() if started else 0.0
+
+    async def process(self, db: AsyncIOMotorDatabase, batch: list, attempts: int = EVENT_MAX_ATTEMPTS):
+        self.oldest = min(event.occurred_at for event in batch)
+        try:
+            for attempt in range(1, attempts + 1):
+                started = time.perf_counter()
+                try:
+                    await self.handler(db, batch)
+                    return True
+                except Exception as e:
+                    EVENT_CONSUMER_FAILURES.labels(self.name).inc()
+                    logger.error(f"Event consumer '{self.name}' failed on {len(batch)} events (attempt {attempt}): {str(e)}")
+                    if attempt < attempts:
+                        await asyncio.sleep(EVENT_RETRY_DELAY * 2 ** (attempt - 1))
+                finally:
+                    EVENT_BATCH_DURATION.labels(self.name).observe(time.perf_counter() - started)
+            return False
+        finally:
+            self.oldest = None
+
+    async def enqueue(self, db: AsyncIOMotorDatabase, event: ChangeEvent):
+        if len(self.queue) >= self.max_pending:
+            self.wakeup.set()
+            try:
+                async with self.space:
+                    await asyncio.wait_for(self.space.wait_for(lambda: len(self.queue) < self.max_pending), self.block_timeout)
+            except asyncio.TimeoutError:
+                EVENT_CONSUMER_OVERFLOW.labels(self.name).inc()
+                await self.process(db, [event], attempts=1)
+                return
+        self.queue.append(event)
+        if len(self.queue) >= self.batch_size:
+            self.wakeup.set()
+
+    async def flush(self, db: AsyncIOMotorDatabase):
+        async with self.flushing:
+            while self.queue:
+                batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+                async with self.space:
+                    self.space.notify_all()
+                await self.process(db, batch)
+
+    async def run(self, db: AsyncIOMotorDatabase):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await asyncio.shield(self.flush(db))
+
+
+class ChangeStreamRelay:
+    def __init__(self, db: AsyncIOMotorDatabase, consumer: Consumer, owner: str, lease_seconds: int = EVENT_LEASE_SECONDS):
+        self.db = db
+        self.consumer = consumer
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.offsets = db['event_offsets']
+
+    async def _lease(self, token=None):
+        now = datetime.now(timezone.utc)
+        update = {'$set': {'owner': self.owner, 'lease_until': now + timedelta(seconds=self.lease_seconds)}}
+        if token is not None:
+            update['$set']['token'] = token
+        try:
+            offset = await self.offsets.find_one_and_update(
+                {'_id': self.consumer.name, '$or': [{'owner': self.owner}, {'lease_until': {'$lt': now}}]},
+                update, upsert=True, return_document=True)
+        except DuplicateKeyError:
+            return None
+        return offset
+
+    async def _watch(self, token):
+        pipeline = [{'$match': {'ns.coll': {'$in': list(self.consumer.collections)},
+                                'operationType': {'$in': list(OPERATIONS)}}}]
+        renew_at = time.monotonic() + self.lease_seconds / 3
+        async with self.db.watch(pipeline, full_document='updateLookup', full_document_before_change='whenAvailable',
+                                 resume_after=token, max_await_time_ms=int(self.consumer.interval * 1000)) as stream:
+            batch = []
+            deadline = None
+            while True:
+                change = await stream.try_next()
+                if change is not None:
+                    batch.append(from_change(change))
+                    deadline = deadline or time.monotonic() + self.consumer.interval
+                if batch and (len(batch) >= self.consumer.batch_size or change is None or time.monotonic() >= deadline):
+                    if not await self.consumer.process(self.db, batch):
+                        logger.error(f"Event consumer '{self.consumer.name}' skipped {len(batch)} events after {EVENT_MAX_ATTEMPTS} attempts")
+                    batch, deadline = [], None
+                    if self.consumer.shared:
+                        if not await self._lease(stream.resume_token):
+                            return
+                        renew_at = time.monotonic() + self.lease_seconds / 3
+                if self.consumer.shared and time.monotonic() >= renew_at:
+                    if not await self._lease():
+                        return
+                    renew_at = time.monotonic() + self.lease_seconds / 3
+
+    async def run(self):
+        while True:
+            try:
+                token = None
+                if self.consumer.shared:
+                    offset = await self._lease()
+                    if not offset:
+                        await asyncio.sleep(self.lease_seconds / 3)
+                        continue
+                    token = offset.get('token')
+                await self._watch(token)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.error(f"Change stream for '{self.consumer.name}' failed, resuming: {str(e)}")
+                await asyncio.sleep(EVENT_RETRY_DELAY)
+
+    async def release(self):
+        if self.consumer.shared:
+            await self.offsets.update_one({'_id': self.consumer.name, 'owner': self.owner}, {'$set': {'owner': None}})
+
+
+class EventBus:
+    def __init__(self, source: str = EVENT_SOURCE):
+        self.source = source
+        self.consumers = []
+        self.relays = []
+        self.tasks = []
+        self.db = None
+        self.owner = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    @property
+    def running(self):
+        return self.db is not None
+
+    def subscribe(self, name: str, handler, collections: tuple, shared: bool = True, streams_only: bool = False):
+        self.consumers.append(Consumer(name, handler, collections, shared=shared, streams_only=streams_only))
+
+    async def publish(self, event: ChangeEvent, db: AsyncIOMotorDatabase):
+        EVENTS_PUBLISHED.labels(event.collection, event.operation).inc()
+        for consumer in self.consumers:
+            if event.collection not in consumer.collections or consumer.streams_only:
+                continue
+            if not self.running:
+                await consumer.process(db, [event], attempts=1)
+            elif self.source != 'changestream':
+                await consumer.enqueue(db, event)
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        for consumer in self.consumers:
+            if self.source == 'changestream':
+                relay = ChangeStreamRelay(db, consumer, self.owner)
+                self.relays.append(relay)
+                self.tasks.append(asyncio.create_task(relay.run()))
+            elif not consumer.streams_only:
+                self.tasks.append(asyncio.create_task(consumer.run(db)))
+        logger.info(f"Started {len(self.tasks)} event consumers reading from {self.source}")
+
+    async def stop(self):
+        if not self.running:
+            return
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for consumer in self.consumers:
+            await consumer.flush(self.db)
+        for relay in self.relays:
+            try:
+                await relay.release()
+            except PyMongoError as e:
+                logger.error(f"Could not release event lease for '{relay.consumer.name}': {str(e)}")
+        self.tasks, self.relays, self.db = [], [], None
+
+
+events = EventBus()
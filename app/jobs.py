@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+from app.services.recommendations import RecommendationService
+from app.services.reviews import ReviewService
+from app.services.rollups import RollupService
+from app.services.snapshots import SNAPSHOT_LEASE_SECONDS, SnapshotService, cancel_running
+
+logger = logging.getLogger(__name__)
+
+RATING_RECONCILE_INTERVAL = int(os.getenv('RATING_RECONCILE_INTERVAL', 3600))
+ROLLUP_REBUILD_INTERVAL = int(os.getenv('ROLLUP_REBUILD_INTERVAL', 3600))
+SIMILARITY_REBUILD_INTERVAL = int(os.getenv('SIMILARITY_REBUILD_INTERVAL', 86400))
+
+owner = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+
+async def acquire_lease(db: AsyncIOMotorDatabase, name: str, seconds: int):
+    now = datetime.now(timezone.utc)
+    try:
+        await db['job_leases'].find_one_and_update({'_id': name, 'lease_until': {'$not': {'$gt': now}}},
+                                                   {'$set': {'owner': owner, 'started_at': now,
+                                                             'lease_until': now + timedelta(seconds=seconds)}},
+                                                   upsert=True)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def run_leased(db: AsyncIOMotorDatabase, name: str, lease_seconds: int, job):
+    try:
+        if not await acquire_lease(db, name, lease_seconds):
+            logger.info(f"Job '{name}' is leased by another worker, skipping")
+            return
+        result = await job()
+        logger.info(f"Job '{name}' finished: {result}")
+    except Exception as e:
+        logger.error(f"Job '{name}' failed: {str(e)}")
+
+
+async def run_periodically(db: AsyncIOMotorDatabase, name: str, interval: int, job):
+    while True:
+        await asyncio.sleep(interval)
+        await run_leased(db, name, interval, job)
+
+
+def start_jobs(db: AsyncIOMotorDatabase):
+    tasks = []
+    if RATING_RECONCILE_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_periodically(db, 'reconcile_book_ratings', RATING_RECONCILE_INTERVAL,
+                                                          ReviewService(db).reconcile_book_ratings)))
+    if ROLLUP_REBUILD_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_periodically(db, 'rebuild_rollups', ROLLUP_REBUILD_INTERVAL,
+                                                          RollupService(db).rebuild)))
+    if SIMILARITY_REBUILD_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_periodically(db, 'rebuild_similarities', SIMILARITY_REBUILD_INTERVAL,
+                                                          RecommendationService(db).rebuild)))
+    tasks.append(asyncio.create_task(run_leased(db, 'resume_snapshot_jobs', SNAPSHOT_LEASE_SECONDS,
+                                                SnapshotService(db).resume_jobs)))
+    return tasks
+
+
+async def stop_jobs(tasks: list):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await cancel_running()
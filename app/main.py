@@ -1,13 +1,94 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response, status
+from app.database import connect_to_mongo, close_mongo_connection, ping_database, mongo
+from app.services.indexes import ensure_indexes
+from app.jobs import start_jobs, stop_jobs
+from app.cache import cache
+from app.writebehind import review_activity
+from app.credentials import passwords
+from app.ratelimit import RateLimitMiddleware, rate_buckets
+from app.compression import CompressionMiddleware
+from app.events import events
+from app.consumers import register_consumers
+from app.warmup import warmup
+from app.singleflight import flights
+from app import metrics, profiling
 from app.routes.books import router as book_router
 from app.routes.users import user_router
 from app.routes.reviews import review_router
 from app.routes.categories import category_router
+from app.routes.search import search_router
+from app.routes.bookstores import router as bookstore_router
+from app.routes.authors import router as author_router
+from app.routes.snapshots import router as snapshot_router
+from app.routes.exports import router as export_router
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_to_mongo()
+    await ensure_indexes(mongo.db)
+    jobs = start_jobs(mongo.db)
+    review_activity.start(mongo.db)
+    events.start(mongo.db)
+    profiling.start_profiler()
+    await warmup.run(app, mongo.db)
+    yield
+    await warmup.stop()
+    profiling.stop_profiler()
+    await review_activity.stop()
+    await events.stop()
+    passwords.close()
+    await stop_jobs(jobs)
+    await cache.close()
+    if rate_buckets is not None:
+        await rate_buckets.close()
+    await close_mongo_connection()
+
+
+register_consumers(events)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(book_router)
 app.include_router(user_router)
 app.include_router(review_router)
-app.include_router(category_router)
\ No newline at end of file
+app.include_router(category_router)
+app.include_router(search_router)
+app.include_router(bookstore_router)
+app.include_router(author_router)
+app.include_router(snapshot_router)
+app.include_router(export_router)
+
+
+@app.get('/health/live', tags=['Health'])
+async def liveness():
+    return {"status": "alive", "warm_up": warmup.status()}
+
+
+@app.get('/health/ready', tags=['Health'])
+async def readiness():
+    if not warmup.ready:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Warming up")
+    if not await ping_database():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
+    return {"status": "ready"}
+
+
+@app.get('/health/cache', tags=['Health'])
+async def cache_stats():
+    return cache.stats()
+
+
+@app.get('/health/single_flight', tags=['Health'])
+async def single_flight_stats():
+    return flights.stats()
+
+
+@app.get('/metrics', tags=['Health'], include_in_schema=False)
+async def prometheus_metrics():
+    content, media_type = metrics.render()
+    return Response(content=content, media_type=media_type)
@@ -0,0 +1,128 @@
+import contextvars
+import functools
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+from pymongo import monitoring
+from app import profiling
+from app.cache import cache
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency by route',
+                            ['method', 'route'],
+                            buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+REQUESTS = Counter('http_requests_total', 'HTTP requests by route and status', ['method', 'route', 'status'])
+IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP requests currently being served')
+MONGO_LATENCY = Histogram('mongo_command_duration_seconds', 'MongoDB command latency',
+                          ['command', 'collection', 'service_method'],
+                          buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+MONGO_FAILURES = Counter('mongo_command_failures_total', 'Failed MongoDB commands',
+                         ['command', 'collection', 'service_method'])
+REVIEW_ACTIVITY_PENDING = Gauge('review_activity_pending', 'Review likes and comments not yet written to MongoDB')
+REVIEW_ACTIVITY_LAG = Gauge('review_activity_flush_lag_seconds', 'Age of the oldest review like or comment not yet written')
+REVIEW_ACTIVITY_FLUSH = Histogram('review_activity_flush_duration_seconds', 'Time spent writing one batch of review activity',
+                                  buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+REVIEW_ACTIVITY_WRITTEN = Counter('review_activity_written_total', 'Review activity written to MongoDB', ['kind'])
+REVIEW_ACTIVITY_REJECTED = Counter('review_activity_rejected_total', 'Review activity rejected because the buffer stayed full')
+PASSWORD_HASH_DURATION = Histogram('password_hash_duration_seconds', 'Time a password hash or check spent in a worker thread',
+                                   buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+PASSWORD_HASH_WAITING = Gauge('password_hash_waiting', 'Password hashes and checks queued or running')
+PASSWORD_HASH_REJECTED = Counter('password_hash_rejected_total', 'Password hashes rejected because the worker queue was full')
+RATE_LIMIT_DECISIONS = Counter('rate_limit_decisions_total', 'Requests allowed, throttled (429) or shed (503) by the limiter',
+                               ['route', 'decision'])
+ADMISSION_WAIT = Histogram('admission_wait_seconds', 'Time requests waited for a concurrency slot',
+                           buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+ADMISSION_IN_USE = Gauge('admission_slots_in_use', 'Weighted concurrency slots held by requests in flight')
+SINGLE_FLIGHT_CALLS = Counter('single_flight_calls_total', 'Reads that went to the database or cache themselves', ['kind'])
+SINGLE_FLIGHT_COALESCED = Counter('single_flight_coalesced_total', 'Reads that shared an identical read already in flight', ['kind'])
+COMPRESSION_BYTES = Counter('http_response_compression_bytes_total', 'Response body bytes before and after compression',
+                            ['encoding', 'stage'])
+EVENTS_PUBLISHED = Counter('change_events_published_total', 'Change events published by services', ['collection', 'operation'])
+EVENT_CONSUMER_PENDING = Gauge('change_event_consumer_pending', 'Change events queued for a consumer', ['consumer'])
+EVENT_CONSUMER_LAG = Gauge('change_event_consumer_lag_seconds', 'Age of the oldest change event a consumer has not finished', ['consumer'])
+EVENT_BATCH_DURATION = Histogram('change_event_batch_duration_seconds', 'Time a consumer spent on one batch of change events',
+                                 ['consumer'], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+EVENT_CONSUMER_FAILURES = Counter('change_event_consumer_failures_total', 'Change event batches a consumer failed to handle', ['consumer'])
+EVENT_CONSUMER_OVERFLOW = Counter('change_event_consumer_overflow_total', 'Change events handled inline because the consumer queue stayed full',
+                                  ['consumer'])
+
+service_method = contextvars.ContextVar('service_method', default='none')
+
+
+def traced(name: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        if service_method.get() != 'none':
+            return await method(*args, **kwargs)
+        token = service_method.set(name)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            service_method.reset(token)
+    return wrapper
+
+
+class CommandTimer(monitoring.CommandListener):
+    def __init__(self):
+        self.pending = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get('collection', 'none')
+        self.pending[(event.connection_id, event.request_id)] = (event.command_name, collection, service_method.get())
+
+    def succeeded(self, event):
+        labels = self.pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self.pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+            MONGO_FAILURES.labels(*labels).inc()
+
+
+class CacheCollector:
+    def collect(self):
+        stats = cache.stats()
+        for name in ('hits', 'misses', 'invalidations'):
+            family = CounterMetricFamily(f'cache_{name}', f'Read-through cache {name}', labels=['backend'])
+            family.add_metric([stats['backend']], stats[name])
+            yield family
+
+
+REGISTRY.register(CacheCollector())
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = time.perf_counter()
+            IN_FLIGHT.dec()
+            route = scope.get('route')
+            path = getattr(route, 'path', 'unmatched')
+            REQUEST_LATENCY.labels(scope['method'], path).observe(finished - started)
+            REQUESTS.labels(scope['method'], path, str(status_code)).inc()
+            await profiling.record(scope['method'], path, started, finished)
+
+
+def render():
+    return generate_latest(), CONTENT_TYPE_LATEST
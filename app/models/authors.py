@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class Author(BaseModel):
+    name: str
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    awards: List[str] = []
+    total_published: int = 0
+    rating_sum: int = 0
+    total_reviews: int = 0
+    latest_books: List[dict] = []
@@ -1,10 +1,15 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class Book(BaseModel):
     title: str
     author: str
+    author_id: Optional[str] = None
+    category: Optional[dict] = None
     isbn: str
     publisher: str
     year_published: int
     copies_available: int
+    rating_sum: int = 0
+    total_reviews: int = 0
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class Bookstore(BaseModel):
+    name: str
+    location: str
@@ -3,5 +3,6 @@ from pydantic import BaseModel
 
 class Category(BaseModel):
     name:str
+    total_books:int = 0
 
   
\ No newline at end of file
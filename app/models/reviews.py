@@ -1,6 +1,8 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class Review(BaseModel):
     book_id : str
     content : str
-    rating : int
\ No newline at end of file
+    rating : int
+    user_id : Optional[str] = None
\ No newline at end of file
@@ -1,7 +1,10 @@
 from pydantic import BaseModel
+from typing import List
 
 class User(BaseModel):
     username:str
     email:str
     full_name:str
-    password:str
\ No newline at end of file
+    password_hash:str
+    total_reviews:int = 0
+    favorite_books:List[str] = []
\ No newline at end of file
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SLOW_REQUEST_MS = float(os.getenv('PROFILE_SLOW_REQUEST_MS', 0))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+PROFILE_MAX_SAMPLES = int(os.getenv('PROFILE_MAX_SAMPLES', 50000))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float, max_samples: int):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = deque(maxlen=max_samples)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.samples.append((time.perf_counter(), ';'.join(reversed(stack))))
+
+    def folded(self, started: float, finished: float):
+        stacks = Counter(stack for taken_at, stack in list(self.samples) if started <= taken_at <= finished)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+sampler = None
+
+
+def start_profiler():
+    global sampler
+    if PROFILE_SLOW_REQUEST_MS <= 0:
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000, PROFILE_MAX_SAMPLES)
+    sampler.start()
+    logger.info(f"Profiling requests slower than {PROFILE_SLOW_REQUEST_MS} ms into '{PROFILE_DIR}'")
+
+
+def stop_profiler():
+    global sampler
+    if sampler is not None:
+        sampler.stop()
+        sampler = None
+
+
+def _write(path: str, content: str):
+    with open(path, 'w') as profile:
+        profile.write(content)
+
+
+async def record(method: str, route: str, started: float, finished: float):
+    if sampler is None or (finished - started) * 1000 < PROFILE_SLOW_REQUEST_MS:
+        return
+    content = sampler.folded(started, finished)
+    if not content:
+        return
+    name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{method}-{route.strip('/').replace('/', '_') or 'root'}.folded"
+    await asyncio.to_thread(_write, os.path.join(PROFILE_DIR, name), content)
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from starlette.routing import compile_path
+from app.metrics import ADMISSION_IN_USE, ADMISSION_WAIT, RATE_LIMIT_DECISIONS
+from app.responses import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+RATE_LIMIT_RATE = float(os.getenv('RATE_LIMIT_RATE', 100))
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', 200))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 100000))
+RATE_LIMIT_TRUST_FORWARDED = os.getenv('RATE_LIMIT_TRUST_FORWARDED', 'false').lower() == 'true'
+CONCURRENCY_LIMIT = int(os.getenv('CONCURRENCY_LIMIT', 200))
+ROUTE_CONCURRENCY_LIMIT = int(os.getenv('ROUTE_CONCURRENCY_LIMIT', CONCURRENCY_LIMIT // 2))
+ADMISSION_MAX_WAIT_MS = int(os.getenv('ADMISSION_MAX_WAIT_MS', 500))
+
+ROUTE_WEIGHTS = {'GET /books': 5, 'POST /books/bulk': 5, 'PATCH /books/bulk': 5, 'DELETE /books/bulk': 5,
+                 'GET /get_users': 5, 'GET /get_categories': 2, 'GET /get_reviews/batch': 5,
+                 'GET /authors': 5, 'GET /bookstores': 5, 'GET /bookstores/{bookstore_id}/books': 5,
+                 'POST /bookstores/moves': 5, 'GET /search/books': 5, 'GET /search/reviews': 5,
+                 'GET /get_recommendations': 2, 'GET /export/{collection}': 20}
+EXEMPT_PATHS = ('/health/', '/metrics', '/docs', '/redoc', '/openapi.json')
+
+
+class MemoryBuckets:
+    def __init__(self, rate: float, burst: float, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()
+
+    async def take(self, client: str, cost: float):
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self.buckets[client] = (tokens, now)
+        self.buckets.move_to_end(client)
+        while len(self.buckets) > self.max_clients:
+            self.buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    async def close(self):
+        self.buckets.clear()
+
+
+TAKE_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBuckets:
+    def __init__(self, rate: float, burst: float, url: str = RATE_LIMIT_REDIS_URL):
+        import redis.asyncio as redis
+        self.rate = rate
+        self.burst = burst
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+
+    async def take(self, client: str, cost: float):
+        cost = min(cost, self.burst)
+        try:
+            allowed, tokens = await self.script(keys=[f'ratelimit:{client}'], args=[self.rate, self.burst, cost, time.time()])
+        except Exception as e:
+            logger.error(f"Rate limit backend failed, allowing request: {str(e)}")
+            return True, 0.0
+        return bool(allowed), 0.0 if allowed else (cost - float(tokens)) / self.rate
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class WeightedLimiter:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.waiters = deque()
+
+    def _wake(self):
+        while self.waiters and self.in_use + self.waiters[0][0] <= self.capacity:
+            weight, future = self.waiters.popleft()
+            if not future.done():
+                self.in_use += weight
+                future.set_result(None)
+
+    async def acquire(self, weight: int, timeout: float):
+        if not self.waiters and self.in_use + weight <= self.capacity:
+            self.in_use += weight
+            return True
+        entry = (weight, asyncio.get_running_loop().create_future())
+        self.waiters.append(entry)
+        try:
+            await asyncio.wait_for(entry[1], timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if entry[1].done() and not entry[1].cancelled():
+                self.release(weight)
+            elif entry in self.waiters:
+                self.waiters.remove(entry)
+                self._wake()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self, weight: int):
+        self.in_use -= weight
+        self._wake()
+
+
+def build_buckets():
+    if RATE_LIMIT_RATE <= 0:
+        return None
+    if RATE_LIMIT_BACKEND == 'redis':
+        try:
+            return RedisBuckets(RATE_LIMIT_RATE, RATE_LIMIT_BURST)
+        except ImportError:
+            logger.error("RATE_LIMIT_BACKEND=redis requires the 'redis' package, falling back to memory")
+    return MemoryBuckets(RATE_LIMIT_RATE, RATE_LIMIT_BURST)
+
+
+rate_buckets = build_buckets()
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, buckets=None, capacity: int = CONCURRENCY_LIMIT, route_capacity: int = ROUTE_CONCURRENCY_LIMIT,
+                 max_wait: float = ADMISSION_MAX_WAIT_MS / 1000, weights: dict = None):
+        self.app = app
+        self.buckets = buckets or rate_buckets
+        self.limiter = WeightedLimiter(capacity) if capacity > 0 else None
+        self.route_capacity = route_capacity if route_capacity > 0 else capacity
+        self.route_limiters = {}
+        self.routes = None
+        self.max_wait = max_wait
+        self.weights = ROUTE_WEIGHTS if weights is None else weights
+        ADMISSION_IN_USE.set_function(lambda: self.limiter.in_use if self.limiter else 0)
+
+    def _client(self, scope):
+        headers = dict(scope['headers'])
+        api_key = headers.get(b'x-api-key')
+        if api_key:
+            return f"key:{api_key.decode('latin-1')}"
+        forwarded = headers.get(b'x-forwarded-for')
+        if RATE_LIMIT_TRUST_FORWARDED and forwarded:
+            return f"ip:{forwarded.decode('latin-1').split(',')[0].strip()}"
+        return f"ip:{scope['client'][0] if scope.get('client') else 'unknown'}"
+
+    def _route(self, scope):
+        if self.routes is None:
+            self.routes = [(compile_path(path)[0], path, {method.upper() for method in operations})
+                           for path, operations in scope['app'].openapi()['paths'].items()]
+        for regex, path, methods in self.routes:
+            if scope['method'] in methods and regex.match(scope['path']):
+                return path
+        return 'unmatched'
+
+    async def _reject(self, scope, receive, send, status_code: int, detail: str, retry_after: float):
+        response = FastJSONResponse({'detail': detail}, status_code=status_code,
+                                    headers={'Retry-After': str(max(1, math.ceil(retry_after)))})
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith(EXEMPT_PATHS):
+            return await self.app(scope, receive, send)
+        route = self._route(scope)
+        name = f"{scope['method']} {route}"
+        weight = self.weights.get(name, 1)
+
+        if self.buckets is not None:
+            allowed, retry_after = await self.buckets.take(self._client(scope), weight)
+            if not allowed:
+                RATE_LIMIT_DECISIONS.labels(route, 'throttled').inc()
+                return await self._reject(scope, receive, send, 429, "Too many requests", retry_after)
+        if self.limiter is None:
+            RATE_LIMIT_DECISIONS.labels(route, 'allowed').inc()
+            return await self.app(scope, receive, send)
+
+        route_limiter = self.route_limiters.setdefault(name, WeightedLimiter(self.route_capacity))
+        weight = min(weight, self.route_capacity, self.limiter.capacity)
+        started = time.perf_counter()
+        if not await route_limiter.acquire(weight, self.max_wait):
+            ADMISSION_WAIT.observe(time.perf_counter() - started)
+            RATE_LIMIT_DECISIONS.labels(route, 'shed').inc()
+            return await self._reject(scope, receive, send, 503, "Server is busy", self.max_wait)
+        try:
+            remaining = max(0.0, self.max_wait - (time.perf_counter() - started))
+            if not await self.limiter.acquire(weight, remaining):
+                ADMISSION_WAIT.observe(time.perf_counter() - started)
+                RATE_LIMIT_DECISIONS.labels(route, 'shed').inc()
+                return await self._reject(scope, receive, send, 503, "Server is busy", self.max_wait)
+            ADMISSION_WAIT.observe(time.perf_counter() - started)
+            RATE_LIMIT_DECISIONS.labels(route, 'allowed').inc()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.limiter.release(weight)
+        finally:
+            route_limiter.release(weight)
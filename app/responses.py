@@ -0,0 +1,20 @@
+import json
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str)
+    return json.dumps(content, default=str, separators=(',', ':')).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = 'application/json'
+
+    def render(self, content) -> bytes:
+        return dumps(content)
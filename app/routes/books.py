@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from typing import List, Optional
+import json
 import logging
-from app.schemas.books import BookCreate, BookUpdate, BookResponse
+from app.schemas.books import BookBulkUpdate, BookCopiesAdjust, BookCreate, BookUpdate, BookResponse, BulkResult, SimilarBook
 from app.services.books import BookService
+from app.services.recommendations import RECOMMEND_TOP_K, RecommendationService
+from app.services import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.database import get_database
+from app.responses import FastJSONResponse
+from app.etags import etag, expected_version, matches, not_modified
 
 router = APIRouter(prefix='/books', tags=['Books'])
 
@@ -13,13 +19,52 @@ logger = logging.getLogger(__name__)
 
 def book_service(db: AsyncIOMotorDatabase = Depends(get_database)):
     return BookService(db)
+
+
+def recommendation_service(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return RecommendationService(db)
+
+
+async def read_items(request: Request):
+    body = await request.body()
+    try:
+        if request.headers.get('content-type', '').startswith('application/x-ndjson'):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or NDJSON")
+    return items
+
+
+def bulk_body(schema: dict):
+    array = {'type': 'array', 'items': schema}
+    return {'requestBody': {'required': True, 'content': {'application/json': {'schema': array},
+                                                          'application/x-ndjson': {'schema': array}}}}
  
 
 @router.get("", response_model=List[BookResponse])
-async def get_books(request: Request, service: BookService = Depends(book_service)):
+async def get_books(request: Request,
+                    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    after: Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor"),
+                    stream: bool = Query(False, description="Stream every book as NDJSON"),
+                    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. title,author"),
+                    service: BookService = Depends(book_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
-        return await service.get_books()
+        if stream:
+            return StreamingResponse(service.stream_books(fields), media_type="application/x-ndjson")
+        version = await service.collection_version()
+        tag = etag('books', version)
+        if matches(request.headers.get('if-none-match'), tag):
+            return not_modified(tag)
+        books, next_cursor = await service.get_books(limit=limit, after=after, fields=fields, version=version)
+        headers = {'ETag': tag}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        return FastJSONResponse(books, headers=headers)
     except HTTPException as e:
         logger.error(f"HTTPException: {e.detail}")
         raise e
@@ -41,11 +86,56 @@ async def create_book(request: Request, book: BookCreate, service: BookService =
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
 
 
+@router.post("/bulk", response_model=BulkResult, openapi_extra=bulk_body(BookCreate.model_json_schema()))
+async def bulk_create_books(request: Request, service: BookService = Depends(book_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.bulk_create(await read_items(request))
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.patch("/bulk", response_model=BulkResult, openapi_extra=bulk_body(BookBulkUpdate.model_json_schema()))
+async def bulk_update_books(request: Request, service: BookService = Depends(book_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.bulk_update(await read_items(request))
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.delete("/bulk", response_model=BulkResult, openapi_extra=bulk_body({'type': 'string'}))
+async def bulk_delete_books(request: Request, service: BookService = Depends(book_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.bulk_delete(await read_items(request))
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
 @router.get("/{book_id}", response_model=BookResponse)
-async def get_book(request: Request, book_id: str, service: BookService = Depends(book_service)):
+async def get_book(request: Request, response: Response, book_id: str, service: BookService = Depends(book_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match:
+            tag = etag(book_id, await service.get_book_version(book_id))
+            if matches(if_none_match, tag):
+                return not_modified(tag)
         book = await service.get_book(book_id)
+        response.headers['ETag'] = etag(book.id, book.version)
         return book
     except HTTPException as e:
         logger.error(f"HTTPException: {e.detail}")
@@ -55,11 +145,28 @@ async def get_book(request: Request, book_id: str, service: BookService = Depend
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
 
 
+@router.get("/{book_id}/similar", response_model=List[SimilarBook])
+async def get_similar_books(request: Request, book_id: str,
+                            limit: int = Query(10, ge=1, le=RECOMMEND_TOP_K),
+                            service: RecommendationService = Depends(recommendation_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return FastJSONResponse(await service.get_similar(book_id, limit=limit))
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
 @router.put("/{book_id}", response_model=BookResponse)
-async def update_book(request: Request, book_id: str, book: BookUpdate, service: BookService = Depends(book_service)):
+async def update_book(request: Request, response: Response, book_id: str, book: BookUpdate, service: BookService = Depends(book_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
-        updated_book = await service.update_book(book_id, book)
+        version = expected_version(request.headers.get('if-match'), book_id)
+        updated_book = await service.update_book(book_id, book, version=version)
+        response.headers['ETag'] = etag(updated_book.id, updated_book.version)
         return updated_book
     except HTTPException as e:
         logger.error(f"HTTPException: {e.detail}")
@@ -69,6 +176,19 @@ async def update_book(request: Request, book_id: str, book: BookUpdate, service:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
 
 
+@router.post("/{book_id}/copies", response_model=BookResponse)
+async def adjust_copies(request: Request, book_id: str, adjust: BookCopiesAdjust, service: BookService = Depends(book_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.adjust_copies(book_id, adjust.delta)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(request: Request, book_id: str, service: BookService = Depends(book_service)):
     logger.info(f"Request path: {request.url.path}")
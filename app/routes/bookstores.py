@@ -0,0 +1,189 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List, Optional
+import logging
+from app.schemas.books import BulkResult
+from app.schemas.bookstores import BookstoreResponse, CreateBookstore, UpdateBookstore
+from app.schemas.inventory import StockCheckout, StockMove, StockQuantity, StockResponse
+from app.services.bookstores import BookstoreService
+from app.services.inventory import InventoryService
+from app.services import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.database import get_database
+from app.responses import FastJSONResponse
+from app.routes.books import bulk_body, read_items
+
+router = APIRouter(prefix='/bookstores', tags=['Bookstores'])
+
+logger = logging.getLogger(__name__)
+
+
+def bookstore_service(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return BookstoreService(db)
+
+
+def inventory_service(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return InventoryService(db)
+
+
+@router.get("", response_model=List[BookstoreResponse])
+async def get_bookstores(request: Request,
+                         limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                         after: Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor"),
+                         service: BookstoreService = Depends(bookstore_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        bookstores, next_cursor = await service.get_bookstores(limit=limit, after=after)
+        return FastJSONResponse(bookstores, headers={'X-Next-Cursor': next_cursor} if next_cursor else None)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.post("", response_model=BookstoreResponse, status_code=status.HTTP_201_CREATED)
+async def create_bookstore(request: Request, bookstore: CreateBookstore, service: BookstoreService = Depends(bookstore_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.create_bookstore(bookstore)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.post("/moves", response_model=BulkResult, openapi_extra=bulk_body(StockMove.model_json_schema()))
+async def move_stock(request: Request, inventory: InventoryService = Depends(inventory_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await inventory.move_stock(await read_items(request))
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.get("/{bookstore_id}", response_model=BookstoreResponse)
+async def get_bookstore(request: Request, bookstore_id: str, service: BookstoreService = Depends(bookstore_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.get_bookstore(bookstore_id)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.put("/{bookstore_id}", response_model=BookstoreResponse)
+async def update_bookstore(request: Request, bookstore_id: str, bookstore: UpdateBookstore, service: BookstoreService = Depends(bookstore_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.update_bookstore(bookstore_id, bookstore)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.delete("/{bookstore_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_bookstore(request: Request, bookstore_id: str, service: BookstoreService = Depends(bookstore_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        await service.delete_bookstore(bookstore_id)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.get("/{bookstore_id}/books", response_model=List[StockResponse])
+async def get_stock(request: Request, bookstore_id: str,
+                    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    after: Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor"),
+                    inventory: InventoryService = Depends(inventory_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        stock, next_cursor = await inventory.get_stock(bookstore_id, limit=limit, after=after)
+        return FastJSONResponse(stock, headers={'X-Next-Cursor': next_cursor} if next_cursor else None)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.post("/{bookstore_id}/books/{book_id}", response_model=StockResponse)
+async def receive_stock(request: Request, bookstore_id: str, book_id: str, stock: StockQuantity, inventory: InventoryService = Depends(inventory_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await inventory.receive(bookstore_id, book_id, stock.quantity)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.delete("/{bookstore_id}/books/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_stock(request: Request, bookstore_id: str, book_id: str, inventory: InventoryService = Depends(inventory_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        await inventory.remove_stock(bookstore_id, book_id)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.post("/{bookstore_id}/books/{book_id}/reserve", response_model=StockResponse)
+async def reserve_stock(request: Request, bookstore_id: str, book_id: str, stock: StockQuantity, inventory: InventoryService = Depends(inventory_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await inventory.reserve(bookstore_id, book_id, stock.quantity)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.post("/{bookstore_id}/books/{book_id}/release", response_model=StockResponse)
+async def release_stock(request: Request, bookstore_id: str, book_id: str, stock: StockQuantity, inventory: InventoryService = Depends(inventory_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await inventory.release(bookstore_id, book_id, stock.quantity)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.post("/{bookstore_id}/books/{book_id}/checkout", response_model=StockResponse)
+async def checkout_stock(request: Request, bookstore_id: str, book_id: str, stock: StockCheckout, inventory: InventoryService = Depends(inventory_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await inventory.checkout(bookstore_id, book_id, stock.quantity, stock.from_reservation)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
 import logging
 from app.schemas.categories import CreateCategory,CategoryResponse,UpdateCategory
 from app.database import get_database
+from app.responses import FastJSONResponse
+from app.etags import etag, expected_version, matches, not_modified
 from app.services.categories import CategoryService
 
 
@@ -30,8 +32,12 @@ async def create_category(request:Request, category_data:CreateCategory, service
 async def get_all_categories(request:Request, service: CategoryService = Depends(category_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
-        categories = await service.get_categories()
-        return categories
+        version = await service.collection_version()
+        tag = etag('categories', version)
+        if matches(request.headers.get('if-none-match'), tag):
+            return not_modified(tag)
+        categories = await service.get_categories(version)
+        return FastJSONResponse(categories, headers={'ETag': tag})
     except HTTPException as e:
         logger.error(f"HTTPException: {e.detail}")
         raise e
@@ -41,10 +47,12 @@ async def get_all_categories(request:Request, service: CategoryService = Depends
     
 
 @category_router.put('/update_category',response_model = CategoryResponse)
-async def update_category(request:Request, category_id:str, service: CategoryService = Depends(category_service)):
+async def update_category(request:Request, response:Response, category_id:str, category:UpdateCategory, service: CategoryService = Depends(category_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
-        update = await service.update_category(category_id=category_id)
+        version = expected_version(request.headers.get('if-match'), category_id)
+        update = await service.update_category(category_id=category_id, update_cat=category, version=version)
+        response.headers['ETag'] = etag(update.id, update.version)
         return update
     
     except HTTPException as e:
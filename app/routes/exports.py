@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Literal
+import logging
+from app.database import get_database
+
+router = APIRouter(prefix='/export', tags=['Export'])
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+@router.get("/{collection}")
+async def export_collection(request: Request, collection: str, format: Literal['ndjson', 'csv'] = Query('ndjson'),
+                            compress: bool = Query(False, description="Gzip the stream"),
+                            db: AsyncIOMotorDatabase = Depends(get_database)):
+    logger.info(f"Request path: {request.url.path}")
+    from app.services.transfer import SCHEMAS, export_stream
+    try:
+        if collection not in SCHEMAS:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cannot export '{collection}'")
+        filename = f"{collection}.{format}{'.gz' if compress else ''}"
+        return StreamingResponse(export_stream(db, collection, format, compress),
+                                 media_type='application/gzip' if compress else MEDIA_TYPES[format],
+                                 headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from typing import Dict, List, Literal, Optional
 import logging
-from app.schemas.reviews import WriteReview, ReviewResponse, UpdatReview
+from app.schemas.reviews import CommentReview, ReviewComment, ReviewDetails, WriteReview, ReviewResponse, UpdatReview
 from app.database import get_database
-from app.services.reviews import ReviewService
+from app.responses import FastJSONResponse
+from app.services.reviews import MAX_REVIEWS_PER_BOOK, ReviewService
 
 
 review_router = APIRouter()
@@ -27,11 +28,27 @@ async def write_review(request:Request, review : WriteReview, service:ReviewServ
     
 
 @review_router.get('/get_reviews',response_model = List[ReviewResponse])
-async def get_all_reviews(request:Request, book_id:str=Query(...), service: ReviewService = Depends(review_service)):
+async def get_all_reviews(request:Request, book_id:str=Query(...), fields:Optional[str]=Query(None, description="Comma separated fields to return, e.g. rating,user_id"),
+                          service: ReviewService = Depends(review_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
-        reviews = await service.get_reviews(book_id=book_id)
-        return reviews
+        reviews = await service.get_reviews(book_id=book_id, fields=fields)
+        return FastJSONResponse(reviews)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+@review_router.get('/get_reviews/batch',response_model = Dict[str, List[ReviewResponse]])
+async def get_reviews_batch(request:Request, book_ids:List[str]=Query(...), per_book:Optional[int]=Query(None, ge=1, le=MAX_REVIEWS_PER_BOOK),
+                            order:Literal['recent', 'rating']=Query('recent'), fields:Optional[str]=Query(None, description="Comma separated fields to return, e.g. rating,user_id"),
+                            service: ReviewService = Depends(review_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        reviews = await service.get_reviews_for_books(book_ids, per_book=per_book, top_rated=order == 'rating', fields=fields)
+        return FastJSONResponse(reviews)
     except HTTPException as e:
         logger.error(f"HTTPException: {e.detail}")
         raise e
@@ -65,4 +82,39 @@ async def delete_review(request:Request,review_id:str,service:ReviewService = De
         logger.error(f"Exception: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
 
+@review_router.post('/like_review',status_code = status.HTTP_202_ACCEPTED)
+async def like_review(request:Request, review_id:str=Query(...), service:ReviewService = Depends(review_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        await service.like_review(review_id=review_id)
+        return {"review_id": review_id, "status": "accepted"}
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+@review_router.post('/comment_review',response_model = ReviewComment,status_code = status.HTTP_202_ACCEPTED)
+async def comment_review(request:Request, comment:CommentReview, review_id:str=Query(...), service:ReviewService = Depends(review_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.comment_review(review_id=review_id, comment=comment)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
 
+@review_router.get('/review_details',response_model = ReviewDetails)
+async def get_review_details(request:Request, review_id:str=Query(...), service:ReviewService = Depends(review_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.get_review_details(review_id=review_id)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
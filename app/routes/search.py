@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List, Optional
+import logging
+from app.schemas.search import BookSearchResults, BookSuggestion, ReviewSearchResults
+from app.database import get_database
+from app.responses import FastJSONResponse
+from app.services import DEFAULT_SEARCH_PAGE_SIZE
+from app.services.books import BookService
+from app.services.reviews import ReviewService
+
+search_router = APIRouter(prefix='/search', tags=['Search'])
+logger = logging.getLogger(__name__)
+
+
+def book_service(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return BookService(db)
+
+
+def review_service(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return ReviewService(db)
+
+
+@search_router.get('/books', response_model=BookSearchResults)
+async def search_books(request: Request, q: str = Query(..., min_length=1, description="Words to find in title, author or publisher"),
+                       page: int = Query(1, ge=1), size: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=100),
+                       fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. title,score"),
+                       service: BookService = Depends(book_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        results, has_more = await service.search_books(q, page=page, size=size, fields=fields)
+        return FastJSONResponse({'results': results, 'page': page, 'size': size, 'has_more': has_more})
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@search_router.get('/books/suggest', response_model=List[BookSuggestion])
+async def suggest_books(request: Request, prefix: str = Query(..., min_length=1, description="Text typed so far"),
+                        limit: int = Query(10, ge=1, le=50), service: BookService = Depends(book_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return FastJSONResponse(await service.suggest_books(prefix, limit=limit))
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@search_router.get('/reviews', response_model=ReviewSearchResults)
+async def search_reviews(request: Request, q: str = Query(..., min_length=1, description="Words to find in review content"),
+                         page: int = Query(1, ge=1), size: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=100),
+                         fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. book_id,score"),
+                         service: ReviewService = Depends(review_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        results, has_more = await service.search_reviews(q, page=page, size=size, fields=fields)
+        return FastJSONResponse({'results': results, 'page': page, 'size': size, 'has_more': has_more})
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List
+import logging
+from app.schemas.snapshots import SnapshotJobResponse
+from app.services.snapshots import SnapshotService
+from app.services import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.database import get_database
+from app.responses import FastJSONResponse
+
+router = APIRouter(prefix='/snapshot_jobs', tags=['Snapshot Jobs'])
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_service(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return SnapshotService(db)
+
+
+@router.get("", response_model=List[SnapshotJobResponse])
+async def get_snapshot_jobs(request: Request, ref_id: str = Query(..., description="Author or category id"),
+                            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), service: SnapshotService = Depends(snapshot_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        jobs = await service.get_jobs(ref_id, limit=limit)
+        return FastJSONResponse(jobs)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+
+@router.get("/{job_id}", response_model=SnapshotJobResponse)
+async def get_snapshot_job(request: Request, job_id: str, service: SnapshotService = Depends(snapshot_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.get_job(job_id)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
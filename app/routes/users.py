@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from typing import List, Optional
 import logging
-from app.schemas.users import CreateUser, UserDetails, UpdateUser
+from app.schemas.users import CreateUser, LoginUser, UserDetails, UpdateUser
 from app.database import get_database
+from app.responses import FastJSONResponse
+from app.etags import etag, expected_version, matches, not_modified
+from app.schemas.books import SimilarBook
 from app.services.users import UserService
+from app.services.recommendations import RecommendationService
+from app.services import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 user_router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -12,6 +18,9 @@ logger = logging.getLogger(__name__)
 def user_service(db: AsyncIOMotorDatabase = Depends(get_database)):
     return UserService(db)
 
+def recommendation_service(db: AsyncIOMotorDatabase = Depends(get_database)):
+    return RecommendationService(db)
+
 
 @user_router.post('/create_user',response_model = UserDetails)
 async def create_user(request:Request, user : CreateUser, service:UserService=Depends(user_service)):
@@ -25,11 +34,29 @@ async def create_user(request:Request, user : CreateUser, service:UserService=De
         logger.error(f"Exception: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
     
+@user_router.post('/login',response_model = UserDetails)
+async def login(request:Request, credentials : LoginUser, service:UserService=Depends(user_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.login(credentials)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
 @user_router.get('/get_user',response_model = UserDetails)
-async def get_user_details(request:Request, user_id:str=Query(...), service: UserService = Depends(user_service)):
+async def get_user_details(request:Request, response:Response, user_id:str=Query(...), service: UserService = Depends(user_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match:
+            tag = etag(user_id, await service.get_user_version(user_id))
+            if matches(if_none_match, tag):
+                return not_modified(tag)
         user = await service.get_user(user_id=user_id)
+        response.headers['ETag'] = etag(user.id, user.version)
         return user
     except HTTPException as e:
         logger.error(f"HTTPException: {e.detail}")
@@ -38,11 +65,39 @@ async def get_user_details(request:Request, user_id:str=Query(...), service: Use
         logger.error(f"Exception: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
 
+@user_router.get('/get_users',response_model = List[UserDetails])
+async def get_users(request:Request,
+                    limit:int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    after:Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor"),
+                    stream:bool = Query(False, description="Stream every user as NDJSON"),
+                    fields:Optional[str] = Query(None, description="Comma separated fields to return, e.g. username,full_name"),
+                    service: UserService = Depends(user_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        if stream:
+            return StreamingResponse(service.stream_users(fields), media_type="application/x-ndjson")
+        tag = etag('users', await service.collection_version())
+        if matches(request.headers.get('if-none-match'), tag):
+            return not_modified(tag)
+        users, next_cursor = await service.get_users(limit=limit, after=after, fields=fields)
+        headers = {'ETag': tag}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        return FastJSONResponse(users, headers=headers)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
 @user_router.put("/update_user",response_model = UserDetails)
-async def update_user(request:Request, user_id:str, user : UpdateUser, service:UserService = Depends(user_service)):
+async def update_user(request:Request, response:Response, user_id:str, user : UpdateUser, service:UserService = Depends(user_service)):
     logger.info(f"Request path: {request.url.path}")
     try:
-        user_update = await service.update_user(user_id=user_id,update_data=user)
+        version = expected_version(request.headers.get('if-match'), user_id)
+        user_update = await service.update_user(user_id=user_id,update_data=user,version=version)
+        response.headers['ETag'] = etag(user_update.id, user_update.version)
         return user_update
     except HTTPException as e:
         logger.error(f"HTTPException: {e.detail}")
@@ -63,3 +118,41 @@ async def delete_user(request : Request, user_id : str, service : UserService =
     except Exception as e:
         logger.error(f"Exception: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+@user_router.post('/add_favorite',response_model = UserDetails)
+async def add_favorite(request:Request, user_id:str=Query(...), book_id:str=Query(...), service:UserService = Depends(user_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.add_favorite(user_id=user_id, book_id=book_id)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+@user_router.delete('/remove_favorite',response_model = UserDetails)
+async def remove_favorite(request:Request, user_id:str=Query(...), book_id:str=Query(...), service:UserService = Depends(user_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return await service.remove_favorite(user_id=user_id, book_id=book_id)
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
+
+@user_router.get('/get_recommendations',response_model = List[SimilarBook])
+async def get_recommendations(request:Request, user_id:str=Query(...),
+                              limit:int = Query(10, ge=1, le=100),
+                              service:RecommendationService = Depends(recommendation_service)):
+    logger.info(f"Request path: {request.url.path}")
+    try:
+        return FastJSONResponse(await service.recommend(user_id=user_id, limit=limit))
+    except HTTPException as e:
+        logger.error(f"HTTPException: {e.detail}")
+        raise e
+    except Exception as e:
+        logger.error(f"Exception: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class CreateAuthor(BaseModel):
+    name: str = Field(..., examples=["James"])
+    age: Optional[int] = Field(None, examples=[25])
+    gender: Optional[str] = Field(None, examples=["Male"])
+    awards: List[str] = Field([], examples=[["Best writer of the decade - 2018"]])
+
+
+class AuthorBook(BaseModel):
+    id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+    title: str = Field(..., examples=["The Great Gatsby"])
+    year_published: int = Field(..., examples=[1925])
+
+
+class AuthorResponse(BaseModel):
+    id: str = Field(..., examples=["6682cdeed4646ca7d4f37874"])
+    name: str = Field(..., examples=["James"])
+    age: Optional[int] = Field(None, examples=[25])
+    gender: Optional[str] = Field(None, examples=["Male"])
+    awards: List[str] = Field([], examples=[["Best writer of the decade - 2018"]])
+    total_published: int = Field(0, examples=[12])
+    average_rating: float = Field(0.0, examples=[4.2])
+    total_reviews: int = Field(0, examples=[310])
+    latest_books: List[AuthorBook] = []
+
+
+class UpdateAuthor(BaseModel):
+    name: Optional[str] = Field(None, examples=["James"])
+    age: Optional[int] = Field(None, examples=[25])
+    gender: Optional[str] = Field(None, examples=["Male"])
+    awards: Optional[List[str]] = Field(None, examples=[["Best writer of the decade - 2018"]])
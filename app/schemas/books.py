@@ -1,19 +1,35 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+
+class BookReference(BaseModel):
+    id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+    name: str = Field(..., examples=["Fiction"])
 
 
 class BookCreate(BaseModel):
     title: str = Field(..., examples=["The Great Gatsby"])
-    author: str = Field(..., examples=["F. Scott Fitzgerald"])
+    author: Optional[str] = Field(None, examples=["F. Scott Fitzgerald"])
+    author_id: Optional[str] = Field(None, examples=["6682cdeed4646ca7d4f37874"])
+    category_id: Optional[str] = Field(None, examples=["6769be7156ca61f944fa3f90"])
     isbn: str = Field(..., examples=["1234567890123"])
     publisher: str = Field(..., examples=["Charles Scribner's Sons"])
     year_published: int = Field(..., examples=[1925])
     copies_available: int = Field(..., examples=[5])
 
+    @model_validator(mode='after')
+    def check_author(self):
+        if self.author is None and self.author_id is None:
+            raise ValueError("author or author_id is required")
+        return self
+
 
 class BookUpdate(BaseModel):
     title: Optional[str] = Field(None, examples=["The Great Gatsby"])
     author: Optional[str] = Field(None, examples=["F. Scott Fitzgerald"])
+    author_id: Optional[str] = Field(None, examples=["6682cdeed4646ca7d4f37874"])
+    category_id: Optional[str] = Field(None, examples=["6769be7156ca61f944fa3f90"])
     isbn: Optional[str] = Field(None, examples=["1234567890123"])
     publisher: Optional[str] = Field(None, examples=["Charles Scribner's Sons"])
     year_published: Optional[int] = Field(None, examples=[1925])
@@ -24,7 +40,42 @@ class BookResponse(BaseModel):
     id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
     title: str = Field(..., examples=["The Great Gatsby"])
     author: str = Field(..., examples=["F. Scott Fitzgerald"])
+    author_id: Optional[str] = Field(None, examples=["6682cdeed4646ca7d4f37874"])
+    category: Optional[BookReference] = None
     isbn: str = Field(..., examples=["1234567890123"])
     publisher: str = Field(..., examples=["Charles Scribner's Sons"])
     year_published: int = Field(..., examples=[1925])
     copies_available: int = Field(..., examples=[5])
+    average_rating: float = Field(0.0, examples=[4.5])
+    total_reviews: int = Field(0, examples=[150])
+    version: int = Field(0, examples=[3])
+    updated_at: Optional[datetime] = Field(None, examples=["2024-07-02T12:57:42.076000"])
+
+
+class BookBulkUpdate(BookUpdate):
+    id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+
+
+class BulkItemResult(BaseModel):
+    index: int = Field(..., examples=[0])
+    id: Optional[str] = Field(None, examples=["6769be7156ca61f944fa3f90"])
+    status: str = Field(..., examples=["created"])
+    error: Optional[str] = Field(None, examples=["Duplicate value for isbn"])
+
+
+class BulkResult(BaseModel):
+    total: int = Field(..., examples=[2])
+    succeeded: int = Field(..., examples=[1])
+    failed: int = Field(..., examples=[1])
+    results: List[BulkItemResult]
+
+
+class BookCopiesAdjust(BaseModel):
+    delta: int = Field(..., examples=[-1])
+
+
+class SimilarBook(BaseModel):
+    id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+    title: str = Field(..., examples=["Tender Is the Night"])
+    author: str = Field(..., examples=["F. Scott Fitzgerald"])
+    score: float = Field(..., examples=[0.4472])
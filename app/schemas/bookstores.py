@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class CreateBookstore(BaseModel):
+    name: str = Field(..., examples=["Barnes & Noble"])
+    location: str = Field(..., examples=["New York, USA"])
+
+
+class BookstoreResponse(BaseModel):
+    id: str = Field(..., examples=["6683e1a4710824df4e5d76e9"])
+    name: str = Field(..., examples=["Barnes & Noble"])
+    location: str = Field(..., examples=["New York, USA"])
+
+
+class UpdateBookstore(BaseModel):
+    name: Optional[str] = Field(None, examples=["Barnes & Noble"])
+    location: Optional[str] = Field(None, examples=["New York, USA"])
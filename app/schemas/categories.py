@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional
 
@@ -8,6 +9,9 @@ class CreateCategory(BaseModel):
 class CategoryResponse(BaseModel):
     id : str = Field(...,examples = ['2j39sj3j4nei32k1k1l3o3j3n3h4gv4'])
     name : str = Field(...,examples = ['horror'])
+    total_books : int = Field(0,examples = [42])
+    version : int = Field(0,examples = [3])
+    updated_at : Optional[datetime] = Field(None,examples = ['2024-07-02T12:57:42.076000'])
 
 
 class UpdateCategory(BaseModel):
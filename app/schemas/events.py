@@ -0,0 +1,13 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class ChangeEvent(BaseModel):
+    collection: str = Field(..., examples=["books"])
+    operation: Literal['insert', 'update', 'delete'] = Field(..., examples=["update"])
+    document_id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+    changed: List[str] = Field([], examples=[["author_id", "title"]])
+    document: Optional[dict] = None
+    previous: Optional[dict] = None
+    occurred_at: datetime = Field(..., examples=["2024-07-02T12:57:42.076000"])
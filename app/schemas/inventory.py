@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+
+
+class StockQuantity(BaseModel):
+    quantity: int = Field(..., gt=0, examples=[2])
+
+
+class StockCheckout(StockQuantity):
+    from_reservation: bool = Field(True, examples=[True])
+
+
+class StockResponse(BaseModel):
+    id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+    bookstore_id: str = Field(..., examples=["6683e1a4710824df4e5d76e9"])
+    book_id: str = Field(..., examples=["6683f946ec61bfa6a3c2d7c7"])
+    available: int = Field(..., examples=[8])
+    reserved: int = Field(..., examples=[2])
+    checked_out: int = Field(..., examples=[15])
+
+
+class StockMove(BaseModel):
+    book_id: str = Field(..., examples=["6683f946ec61bfa6a3c2d7c7"])
+    from_bookstore_id: str = Field(..., examples=["6683e1a4710824df4e5d76e9"])
+    to_bookstore_id: str = Field(..., examples=["6683e1a4710824df4e5d76ea"])
+    quantity: int = Field(..., gt=0, examples=[3])
@@ -1,18 +1,32 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class WriteReview(BaseModel):
     book_id:  str = Field(...,examples=['6769be7156ca61f944fa3f90'])
     content: str = Field(...,examples = ['A captivating story with deep symbolism.'])
     rating: int = Field(...,examples = [4])
+    user_id: Optional[str] = Field(None,examples=['6769be7156ca61f944fa3f90'])
 
 class ReviewResponse(BaseModel):
     id: str = Field(...,examples=['6769be7156ca61f944fa3f90'])
     book_id:  str = Field(...,examples=['6769be7156ca61f944fa3f90'])
     content: str = Field(...,examples = ['A captivating story with deep symbolism.'])
     rating: int = Field(...,examples = [4])
+    user_id: Optional[str] = Field(None,examples=['6769be7156ca61f944fa3f90'])
 
 class UpdatReview(BaseModel):
     content: Optional[str] = Field(None,examples = ['A captivating story with deep symbolism.'])
-    rating: Optional[int] = Field(None,examples = [4])
\ No newline at end of file
+    rating: Optional[int] = Field(None,examples = [4])
+class CommentReview(BaseModel):
+    user: str = Field(...,examples = ['John Doe'])
+    content: str = Field(...,examples = ['Great review!'])
+
+class ReviewComment(BaseModel):
+    id: str = Field(...,examples=['6683e1a4710824df4e5d76e9'])
+    user: str = Field(...,examples = ['John Doe'])
+    content: str = Field(...,examples = ['Great review!'])
+
+class ReviewDetails(BaseModel):
+    likes: int = Field(0,examples = [120])
+    comments: List[ReviewComment] = []
@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import List
+from app.schemas.books import BookResponse
+from app.schemas.reviews import ReviewResponse
+
+
+class BookSearchHit(BookResponse):
+    score: float = Field(..., examples=[7.5])
+
+
+class ReviewSearchHit(ReviewResponse):
+    score: float = Field(..., examples=[1.1])
+
+
+class BookSearchResults(BaseModel):
+    results: List[BookSearchHit]
+    page: int = Field(..., examples=[1])
+    size: int = Field(..., examples=[20])
+    has_more: bool = Field(..., examples=[False])
+
+
+class ReviewSearchResults(BaseModel):
+    results: List[ReviewSearchHit]
+    page: int = Field(..., examples=[1])
+    size: int = Field(..., examples=[20])
+    has_more: bool = Field(..., examples=[False])
+
+
+class BookSuggestion(BaseModel):
+    id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+    title: str = Field(..., examples=["The Great Gatsby"])
@@ -0,0 +1,18 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class SnapshotJobResponse(BaseModel):
+    id: str = Field(..., examples=["6683f946ec61bfa6a3c2d7c7"])
+    kind: str = Field(..., examples=["category"])
+    ref_id: str = Field(..., examples=["6769be7156ca61f944fa3f90"])
+    status: str = Field(..., examples=["done"])
+    attempts: int = Field(..., examples=[1])
+    batches: int = Field(..., examples=[12])
+    updated: int = Field(..., examples=[11520])
+    error: Optional[str] = Field(None, examples=[None])
+    owner: Optional[str] = Field(None, examples=["web-1-4821-9f2c1a7e"])
+    heartbeat_at: Optional[datetime] = Field(None, examples=["2024-07-02T12:58:03.912000"])
+    created_at: datetime = Field(..., examples=["2024-07-02T12:57:42.076000"])
+    updated_at: datetime = Field(..., examples=["2024-07-02T12:58:03.912000"])
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 
 
@@ -13,6 +14,10 @@ class UserDetails(BaseModel):
     username : str = Field(..., examples = ['udayreddy_26'])
     email : str = Field(...,examples = ['uday@zysec.ai'])
     full_name : str = Field(...,examples = ['uday kiran reddy'])
+    total_reviews : int = Field(0,examples = [17])
+    favorite_books : List[str] = Field([],examples = [['6769be7156ca61f944fa3f90']])
+    version : int = Field(0,examples = [3])
+    updated_at : Optional[datetime] = Field(None,examples = ['2024-07-02T07:27:29.278000'])
 
 class UpdateUser(BaseModel):
     username: Optional[str] = Field(None, example='udayreddy_26')
@@ -20,6 +25,23 @@ class UpdateUser(BaseModel):
     full_name: Optional[str] = Field(None, example="uday kiran reddy")
     password: Optional[str] = Field(None, example='strongpassword123')
 
+class LoginUser(BaseModel):
+    username: str = Field(..., examples = ['udayreddy_26'])
+    password: str = Field(..., examples = ['strongpassword123'])
+
+class ImportUser(BaseModel):
+    username: str = Field(..., examples = ['udayreddy_26'])
+    email: str = Field(..., examples = ["uday@zysec.ai"])
+    full_name: str = Field(..., examples = ["uday kiran reddy"])
+    password: Optional[str] = Field(None, examples = ['strongpassword123'])
+    password_hash: Optional[str] = Field(None, examples = ['scrypt$16384$8$1$...'])
+
+    @model_validator(mode='after')
+    def check_password(self):
+        if not self.password and not self.password_hash:
+            raise ValueError("password or password_hash is required")
+        return self
+
 
 
 
@@ -0,0 +1,60 @@
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.getenv('SERVER_PORT', 8000))
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+SERVER_BACKLOG = int(os.getenv('SERVER_BACKLOG', 2048))
+SERVER_KEEPALIVE_SECONDS = int(os.getenv('SERVER_KEEPALIVE_SECONDS', 5))
+SERVER_GRACEFUL_SECONDS = int(os.getenv('SERVER_GRACEFUL_SECONDS', 30))
+SERVER_ACCESS_LOG = os.getenv('SERVER_ACCESS_LOG', 'false').lower() == 'true'
+SERVER_PROXY_HEADERS = os.getenv('SERVER_PROXY_HEADERS', 'false').lower() == 'true'
+
+
+def _installed(module: str):
+    return importlib.util.find_spec(module) is not None
+
+
+def options(args):
+    return {'host': args.host, 'port': args.port, 'workers': args.workers,
+            'loop': 'uvloop' if _installed('uvloop') else 'asyncio',
+            'http': 'httptools' if _installed('httptools') else 'h11',
+            'lifespan': 'on', 'backlog': args.backlog, 'timeout_keep_alive': SERVER_KEEPALIVE_SECONDS,
+            'timeout_graceful_shutdown': SERVER_GRACEFUL_SECONDS, 'access_log': SERVER_ACCESS_LOG,
+            'proxy_headers': SERVER_PROXY_HEADERS, 'server_header': False}
+
+
+def worker_count(workers: int, cache_backend: str, event_source: str):
+    if workers > 1 and cache_backend != 'redis' and event_source != 'changestream':
+        logger.warning(f"{workers} workers would each keep their own in-memory cache and miss each other's writes, "
+                       "starting 1 worker instead. Set CACHE_BACKEND=redis or EVENT_SOURCE=changestream to run more")
+        return 1
+    return workers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.server', description='Run the API with one uvicorn worker per core')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=WEB_CONCURRENCY, help='Worker processes, defaults to WEB_CONCURRENCY or the CPU count')
+    parser.add_argument('--backlog', type=int, default=SERVER_BACKLOG)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    from app.cache import CACHE_BACKEND
+    from app.events import EVENT_SOURCE
+    args.workers = worker_count(args.workers, CACHE_BACKEND, EVENT_SOURCE)
+    settings = options(args)
+    if settings['loop'] != 'uvloop' or settings['http'] != 'httptools':
+        logger.warning("uvloop or httptools is missing, install uvicorn[standard] for the faster event loop and HTTP parser")
+    uvicorn.run('app.main:app', **settings)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,208 @@
+import inspect
+import re
+from datetime import datetime, timezone
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import List, Optional, Tuple
+from app.cache import cache
+from app.events import events
+from app.metrics import traced
+from app.responses import dumps
+from app.schemas.books import BulkResult
+from app.schemas.events import ChangeEvent
+from app.singleflight import flights
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
 
 class BaseService:
+    collection_name: str = None
+    indexes: List[IndexModel] = []
+    retired_indexes: List[str] = []
+    query_plans: List[Tuple[str, dict, Optional[list]]] = []
+    track_changes: bool = False
+    rated: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith('_') and inspect.iscoroutinefunction(attr):
+                setattr(cls, name, traced(f'{cls.__name__}.{name}', attr))
+
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
+        self.cache = cache
+        self.events = events
+        self.flights = flights
 
     def _replace_id(self, doc):
-        doc['id'] = str(doc['_id'])
-        del doc['_id']
+        return {'id': str(doc.pop('_id')), **doc}
+
+    def _tokens(self, *texts: str):
+        return list(dict.fromkeys(token for text in texts if text for token in re.findall(r'\w+', text.lower())))
+
+    def _prepare(self, doc, fields: list = None, class_name=None):
+        if class_name is not None:
+            for name, field in class_name.model_fields.items():
+                if name not in doc and name != 'id' and not field.is_required() and (not fields or name in fields):
+                    doc[name] = field.get_default(call_default_factory=True)
+        if self.rated:
+            rating_sum = doc.pop('rating_sum', 0)
+            total_reviews = doc.get('total_reviews', 0)
+            doc['average_rating'] = round(rating_sum / total_reviews, 2) if total_reviews else 0.0
+        doc = self._replace_id(doc)
+        if fields:
+            return {name: doc[name] for name in ('id', *fields) if name in doc}
         return doc
 
+    def _fields(self, class_name, fields: str = None):
+        if not fields:
+            return None
+        wanted = list(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+        unknown = [field for field in wanted if field not in class_name.model_fields]
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown)}")
+        return wanted or None
+
+    def _projection(self, class_name, fields: list = None):
+        projection = {name: 1 for name in fields or class_name.model_fields if name != 'id'}
+        if self.rated and 'average_rating' in projection:
+            del projection['average_rating']
+            projection['rating_sum'] = 1
+            projection['total_reviews'] = 1
+        return projection or {'_id': 1}
+
     def _to_response(self, doc, class_name):
-        doc = self._replace_id(doc)
+        doc = self._prepare(doc)
         return class_name(**doc)
+
+    def _to_raw(self, docs: list, fields: list = None, class_name=None):
+        return [self._prepare(doc, fields, class_name) for doc in docs]
+
+    def _duplicate_detail(self, details: dict):
+        fields = ', '.join((details or {}).get('keyValue', {}).keys())
+        return f"Duplicate value for {fields}" if fields else "Duplicate value"
+
+    def _object_id(self, value: str):
+        try:
+            return ObjectId(value)
+        except (InvalidId, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
+
+    def _touch(self, update: dict):
+        return {**update,
+                '$set': {**update.get('$set', {}), 'updated_at': datetime.now(timezone.utc)},
+                '$inc': {**update.get('$inc', {}), 'version': 1}}
+
+    def _stamp(self, doc: dict):
+        doc['version'] = 1
+        doc['updated_at'] = datetime.now(timezone.utc)
+        return doc
+
+    async def _changed(self, collection_name: str = None):
+        if collection_name is None and not self.track_changes:
+            return
+        await self.db['collection_versions'].update_one({'_id': collection_name or self.collection_name},
+                                                        {'$inc': {'version': 1}}, upsert=True)
+
+    async def _publish(self, operation: str, doc_id, document: dict = None, previous: dict = None, changed=None,
+                       collection_name: str = None):
+        changed = list(document or {}) if changed is None else list(changed)
+        await self.events.publish(ChangeEvent(collection=collection_name or self.collection_name, operation=operation,
+                                              document_id=str(doc_id), changed=changed, document=document,
+                                              previous=previous, occurred_at=datetime.now(timezone.utc)), self.db)
+
+    async def collection_version(self):
+        doc = await self.db['collection_versions'].find_one({'_id': self.collection_name})
+        return doc['version'] if doc else 0
+
+    async def _document_version(self, doc_id: str, not_found: str):
+        doc = await self.collection.find_one({'_id': self._object_id(doc_id)}, {'version': 1})
+        if not doc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+        return doc.get('version', 0)
+
+    async def _insert(self, doc: dict, class_name):
+        self._stamp(doc)
+        try:
+            result = await self.collection.insert_one(doc)
+        except DuplicateKeyError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=self._duplicate_detail(e.details))
+        doc['_id'] = result.inserted_id
+        await self._changed()
+        await self._publish('insert', result.inserted_id, dict(doc))
+        return self._to_response(doc, class_name)
+
+    async def _update(self, doc_id: str, changes: dict, class_name, not_found: str, version: int = None, unset: dict = None,
+                      previous: dict = None):
+        query = {'_id': self._object_id(doc_id)}
+        if version is not None:
+            query['version'] = version or {'$in': [0, None]}
+        if changes:
+            try:
+                update = {'$set': changes, '$unset': unset} if unset else {'$set': changes}
+                doc = await self.collection.find_one_and_update(query, self._touch(update),
+                                                                return_document=ReturnDocument.AFTER)
+            except DuplicateKeyError as e:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=self._duplicate_detail(e.details))
+        else:
+            doc = await self.collection.find_one(query)
+        if not doc:
+            if version is not None and await self.collection.count_documents({'_id': query['_id']}, limit=1):
+                raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Resource was modified")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+        if changes:
+            await self._changed()
+            await self._publish('update', doc['_id'], dict(doc), previous, list(changes) + list(unset or {}))
+        return self._to_response(doc, class_name)
+
+    def _validation_detail(self, error: ValidationError):
+        return '; '.join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+    def _write_error(self, error: dict):
+        if error.get('code') == 11000:
+            return 'conflict', self._duplicate_detail(error)
+        return 'error', error.get('errmsg')
+
+    def _bulk_result(self, results: list, succeeded: str):
+        ok = sum(1 for result in results if result.status == succeeded)
+        return BulkResult(total=len(results), succeeded=ok, failed=len(results) - ok, results=results)
+
+    async def _bulk_write(self, operations: list):
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            return {error['index']: error for error in e.details['writeErrors']}
+        return {}
+
+    async def _paginate(self, query: dict, limit: int, after: str, class_name, fields: list = None):
+        if after:
+            query = {**query, '_id': {'$gt': self._object_id(after)}}
+        docs = await self.collection.find(query, self._projection(class_name, fields)).sort('_id', 1).limit(limit + 1).to_list(limit + 1)
+        next_cursor = str(docs[limit - 1]['_id']) if len(docs) > limit else None
+        return self._to_raw(docs[:limit], fields, class_name), next_cursor
+
+    async def _text_search(self, text: str, page: int, size: int, class_name, fields: list = None):
+        projection = {**self._projection(class_name, fields), 'score': {'$meta': 'textScore'}}
+        cursor = self.collection.find({'$text': {'$search': text}}, projection)
+        docs = await cursor.sort([('score', {'$meta': 'textScore'})]).skip((page - 1) * size).limit(size + 1).to_list(size + 1)
+        return self._to_raw(docs[:size], fields, class_name), len(docs) > size
+
+    async def _stream(self, query: dict, class_name, batch_size: int = STREAM_BATCH_SIZE, fields: list = None):
+        cursor = self.collection.find(query, self._projection(class_name, fields)).sort('_id', 1).batch_size(batch_size)
+        lines = []
+        async for doc in cursor:
+            lines.append(dumps(self._prepare(doc, fields, class_name)))
+            if len(lines) >= batch_size:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
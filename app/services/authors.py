@@ -0,0 +1,42 @@
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel
+from fastapi import HTTPException, status
+from app.models.authors import Author
+from app.schemas.authors import AuthorResponse, CreateAuthor, UpdateAuthor
+from app.services import BaseService, DEFAULT_PAGE_SIZE
+
+
+class AuthorService(BaseService):
+    collection_name = 'authors'
+    indexes = [IndexModel([('name', ASCENDING)], name='name')]
+    query_plans = [('get_author', {'_id': ObjectId()}, None),
+                   ('get_authors', {'_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)])]
+    rated = True
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(db)
+        self.collection = db[self.collection_name]
+
+    async def create_author(self, author_data: CreateAuthor):
+        author = Author(**author_data.dict())
+        return await self._insert(author.dict(), AuthorResponse)
+
+    async def get_author(self, author_id: str):
+        author = await self.collection.find_one({'_id': self._object_id(author_id)})
+        if not author:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
+        return self._to_response(author, AuthorResponse)
+
+    async def get_authors(self, limit: int = DEFAULT_PAGE_SIZE, after: str = None):
+        return await self._paginate({}, limit, after, AuthorResponse)
+
+    async def update_author(self, author_id: str, update_data: UpdateAuthor):
+        changes = update_data.dict(exclude_unset=True)
+        return await self._update(author_id, changes, AuthorResponse, "Author not found")
+
+    async def delete_author(self, author_id: str):
+        result = await self.collection.delete_one({'_id': self._object_id(author_id)})
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
+        await self._publish('delete', author_id)
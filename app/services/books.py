@@ -1,25 +1,107 @@
+import re
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import ASCENDING, DESCENDING, TEXT, DeleteOne, IndexModel, InsertOne, ReturnDocument, UpdateOne
 
 from fastapi import HTTPException, status
 from app.models.books import Book
-from app.schemas.books import BookCreate, BookResponse, BookUpdate
-from app.services import BaseService
+from app.schemas.books import BookBulkUpdate, BookCreate, BookResponse, BookUpdate, BulkItemResult
+from app.schemas.search import BookSearchHit
+from app.services import BaseService, DEFAULT_PAGE_SIZE, DEFAULT_SEARCH_PAGE_SIZE
+from app.services.rollups import BOOK_FIELDS, BOOK_TRIGGERS
+
+BULK_CHUNK_SIZE = 1000
+
+
+def _chunks(items: list, size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
 class BookService(BaseService):
+    collection_name = 'books'
+    indexes = [IndexModel([('isbn', ASCENDING)], name='isbn_unique', unique=True),
+               IndexModel([('title', TEXT), ('author', TEXT), ('publisher', TEXT), ('category.name', TEXT)], name='books_search_text',
+                          weights={'title': 10, 'author': 5, 'category.name': 3, 'publisher': 2}),
+               IndexModel([('search_terms', ASCENDING)], name='search_terms'),
+               IndexModel([('author_id', ASCENDING), ('year_published', DESCENDING), ('_id', DESCENDING)], name='author_id_year', sparse=True),
+               IndexModel([('category.id', ASCENDING)], name='category_id', sparse=True)]
+    query_plans = [('get_book', {'_id': ObjectId()}, None),
+                   ('get_books', {'_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)]),
+                   ('search_books', {'$text': {'$search': 'gatsby'}}, None),
+                   ('suggest_books', {'search_terms': {'$regex': '^gat'}}, None),
+                   ('refresh_author', {'author_id': '', 'author': {'$ne': ''}}, None),
+                   ('refresh_category', {'category.id': '', 'category.name': {'$ne': ''}}, None),
+                   ('latest_books', {'author_id': ''}, [('year_published', DESCENDING), ('_id', DESCENDING)])]
+    retired_indexes = ['books_text']
+    search_fields = ('title', 'author', 'publisher', 'category')
+    text_paths = ('title', 'author', 'publisher', 'category.name')
+    track_changes = True
+    rated = True
+    references = (('author_id', 'authors'), ('category_id', 'categories'))
+
     def __init__(self, db: AsyncIOMotorDatabase):
         super().__init__(db)
-        self.collection = db['books']
+        self.collection = db[self.collection_name]
+
+    def _with_search_terms(self, doc: dict):
+        values = (doc.get(field) for field in self.search_fields)
+        doc['search_terms'] = self._tokens(*(value.get('name') if isinstance(value, dict) else value for value in values))
+        return doc
+
+    async def _resolve_references(self, docs: list):
+        errors = {}
+        wanted = {field: set() for field, _ in self.references}
+        for position, doc in enumerate(docs):
+            for field in wanted:
+                if doc.get(field) is None:
+                    continue
+                try:
+                    ObjectId(doc[field])
+                    wanted[field].add(doc[field])
+                except (InvalidId, TypeError):
+                    errors[position] = ('invalid', f"Invalid ObjectId for {field}")
+        names = {}
+        for field, source in self.references:
+            object_ids = [ObjectId(value) for value in wanted[field]]
+            names[field] = {str(doc['_id']): doc['name'] async for doc in self.db[source].find({'_id': {'$in': object_ids}}, {'name': 1})} if object_ids else {}
+        for position, doc in enumerate(docs):
+            if position in errors:
+                continue
+            if doc.get('author_id') is not None:
+                if doc['author_id'] not in names['author_id']:
+                    errors[position] = ('not_found', "Author not found")
+                    continue
+                doc['author'] = names['author_id'][doc['author_id']]
+            if 'category_id' in doc:
+                category_id = doc.pop('category_id')
+                if category_id is not None and category_id not in names['category_id']:
+                    errors[position] = ('not_found', "Category not found")
+                    continue
+                doc['category'] = {'id': category_id, 'name': names['category_id'][category_id]} if category_id else None
+        return errors
+
+    async def _resolve_reference(self, doc: dict):
+        errors = await self._resolve_references([doc])
+        if errors:
+            outcome, message = errors[0]
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND if outcome == 'not_found' else status.HTTP_400_BAD_REQUEST,
+                                detail=message)
+        return doc
 
     async def create_book(self, book_data: BookCreate):
-        book = Book(**book_data.dict())
-        result = await self.collection.insert_one(book.dict())
-        book = await self.collection.find_one({'_id': result.inserted_id})
-        return self._to_response(book, BookResponse)
+        book = self._with_search_terms(Book(**await self._resolve_reference(book_data.dict())).dict())
+        created = await self._insert(book, BookResponse)
+        await self.cache.invalidate_prefix('books:list:')
+        return created
 
     async def get_book(self, book_id: str):
+        key = f'books:{book_id}'
+        return await self.flights.do(key, lambda: self.cache.get_or_load(key, lambda: self._load_book(book_id)))
+
+    async def _load_book(self, book_id: str):
         try:
             book = await self.collection.find_one({'_id': ObjectId(book_id)})
         except InvalidId:
@@ -28,25 +110,203 @@ class BookService(BaseService):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
         return self._to_response(book, BookResponse)
 
-    async def update_book(self, book_id: str, update_data: BookUpdate):
-        try:
-            result = await self.collection.update_one({'_id': ObjectId(book_id)},
-                                                      {'$set': update_data.dict(exclude_unset=True)})
-        except InvalidId:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
-        if result.matched_count == 0:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-        book = await self.collection.find_one({'_id': ObjectId(book_id)})
+    async def get_book_version(self, book_id: str):
+        return await self._document_version(book_id, "Book not found")
+
+    async def update_book(self, book_id: str, update_data: BookUpdate, version: int = None):
+        changes = await self._resolve_reference(update_data.dict(exclude_unset=True))
+        before = None
+        if any(field in changes for field in self.search_fields + BOOK_TRIGGERS):
+            before = await self.collection.find_one({'_id': self._object_id(book_id)}, list(self.search_fields + BOOK_FIELDS)) or {}
+            before.pop('_id', None)
+        if any(field in changes for field in self.search_fields):
+            changes['search_terms'] = self._with_search_terms({**before, **changes})['search_terms']
+        updated = await self._update(book_id, changes, BookResponse, "Book not found", version, previous=before)
+        await self._invalidate(book_id)
+        return updated
+
+    async def adjust_copies(self, book_id: str, delta: int):
+        query = {'_id': self._object_id(book_id)}
+        if delta < 0:
+            query['copies_available'] = {'$gte': -delta}
+        book = await self.collection.find_one_and_update(query, self._touch({'$inc': {'copies_available': delta}}),
+                                                         return_document=ReturnDocument.AFTER)
+        if not book:
+            if not await self.collection.count_documents({'_id': query['_id']}, limit=1):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Not enough copies available")
+        await self._invalidate(book_id)
+        await self._changed()
+        await self._publish('update', book['_id'], dict(book), changed=['copies_available'])
         return self._to_response(book, BookResponse)
 
     async def delete_book(self, book_id: str):
         try:
-            result = await self.collection.delete_one({'_id': ObjectId(book_id)})
-            if result.deleted_count == 0:
+            book = await self.collection.find_one_and_delete({'_id': ObjectId(book_id)}, list(BOOK_FIELDS))
+            if not book:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
         except InvalidId:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
+        await self._invalidate(book_id)
+        await self._changed()
+        await self._publish('delete', book_id, previous=book)
+
+    async def _invalidate(self, *book_ids: str):
+        keys = [f'books:{book_id}' for book_id in book_ids]
+        self.flights.forget(*keys)
+        await self.cache.invalidate(*keys)
+        await self.cache.invalidate_prefix('books:list:')
+
+    async def get_books(self, limit: int = DEFAULT_PAGE_SIZE, after: str = None, fields: str = None, version: int = None):
+        fields = self._fields(BookResponse, fields)
+        if version is None:
+            version = await self.collection_version()
+        key = f'books:list:{version}:{limit}:{after}' + (f":{','.join(fields)}" if fields else '')
+        return await self.cache.get_or_load(key, lambda: self._paginate({}, limit, after, BookResponse, fields))
+
+    def stream_books(self, fields: str = None):
+        return self._stream({}, BookResponse, fields=self._fields(BookResponse, fields))
+
+    async def search_books(self, text: str, page: int = 1, size: int = DEFAULT_SEARCH_PAGE_SIZE, fields: str = None):
+        return await self._text_search(text, page, size, BookSearchHit, self._fields(BookSearchHit, fields))
+
+    async def suggest_books(self, prefix: str, limit: int = 10):
+        tokens = self._tokens(prefix)
+        if not tokens:
+            return []
+        query = {'$and': [{'search_terms': token} for token in tokens[:-1]] +
+                         [{'search_terms': {'$regex': '^' + re.escape(tokens[-1])}}]}
+        docs = await self.collection.find(query, {'title': 1}).sort('total_reviews', DESCENDING).limit(limit).to_list(limit)
+        return [self._replace_id(doc) for doc in docs]
+
+    async def backfill_search_terms(self, batch_size: int = BULK_CHUNK_SIZE, refresh: bool = False):
+        updated = 0
+        after = None
+        while True:
+            if refresh:
+                query = {'_id': {'$gt': after}} if after else {}
+            else:
+                query = {'search_terms': {'$exists': False}}
+            docs = await self.collection.find(query, {field: 1 for field in self.search_fields}).sort('_id', ASCENDING).limit(batch_size).to_list(batch_size)
+            if not docs:
+                return updated
+            after = docs[-1]['_id']
+            await self.collection.bulk_write([UpdateOne({'_id': doc['_id']}, {'$set': {'search_terms': self._with_search_terms(doc)['search_terms']}})
+                                              for doc in docs], ordered=False)
+            updated += len(docs)
+
+    async def bulk_create(self, items: list):
+        results = [None] * len(items)
+        pending = []
+        created = []
+        for index, item in enumerate(items):
+            try:
+                book = BookCreate(**item).dict()
+            except ValidationError as e:
+                results[index] = BulkItemResult(index=index, status='invalid', error=self._validation_detail(e))
+                continue
+            except TypeError:
+                results[index] = BulkItemResult(index=index, status='invalid', error="Item must be an object")
+                continue
+            pending.append((index, book))
+        for chunk in _chunks(pending):
+            invalid = await self._resolve_references([book for _, book in chunk])
+            for position, (outcome, message) in invalid.items():
+                results[chunk[position][0]] = BulkItemResult(index=chunk[position][0], status=outcome, error=message)
+            chunk = [(index, {'_id': ObjectId(), **self._stamp(self._with_search_terms(Book(**book).dict()))})
+                     for position, (index, book) in enumerate(chunk) if position not in invalid]
+            errors = await self._bulk_write([InsertOne(book) for _, book in chunk]) if chunk else {}
+            for position, (index, book) in enumerate(chunk):
+                if position in errors:
+                    outcome, message = self._write_error(errors[position])
+                    results[index] = BulkItemResult(index=index, status=outcome, error=message)
+                else:
+                    results[index] = BulkItemResult(index=index, id=str(book['_id']), status='created')
+                    created.append(book)
+        await self._invalidate()
+        await self._changed()
+        for book in created:
+            await self._publish('insert', book['_id'], book)
+        return self._bulk_result(results, 'created')
+
+    async def bulk_update(self, items: list):
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            try:
+                update = BookBulkUpdate(**item)
+                book_id = ObjectId(update.id)
+            except ValidationError as e:
+                results[index] = BulkItemResult(index=index, status='invalid', error=self._validation_detail(e))
+                continue
+            except TypeError:
+                results[index] = BulkItemResult(index=index, status='invalid', error="Item must be an object")
+                continue
+            except InvalidId:
+                results[index] = BulkItemResult(index=index, id=update.id, status='invalid', error="Invalid ObjectId")
+                continue
+            pending.append((index, book_id, update.dict(exclude_unset=True, exclude={'id'})))
+        updated = []
+        for chunk in _chunks(pending):
+            existing = await self._existing([book_id for _, book_id, _ in chunk], self.search_fields + BOOK_TRIGGERS)
+            invalid = await self._resolve_references([changes for _, _, changes in chunk])
+            writes = []
+            for position, (index, book_id, changes) in enumerate(chunk):
+                if position in invalid:
+                    outcome, message = invalid[position]
+                    results[index] = BulkItemResult(index=index, id=str(book_id), status=outcome, error=message)
+                elif book_id not in existing:
+                    results[index] = BulkItemResult(index=index, id=str(book_id), status='not_found', error="Book not found")
+                elif not changes:
+                    results[index] = BulkItemResult(index=index, id=str(book_id), status='updated')
+                else:
+                    if any(field in changes for field in self.search_fields):
+                        changes['search_terms'] = self._with_search_terms({**existing[book_id], **changes})['search_terms']
+                    writes.append((index, book_id, changes))
+            errors = await self._bulk_write([UpdateOne({'_id': book_id}, self._touch({'$set': changes})) for _, book_id, changes in writes]) if writes else {}
+            for position, (index, book_id, _) in enumerate(writes):
+                if position in errors:
+                    outcome, message = self._write_error(errors[position])
+                    results[index] = BulkItemResult(index=index, id=str(book_id), status=outcome, error=message)
+                else:
+                    results[index] = BulkItemResult(index=index, id=str(book_id), status='updated')
+                    updated.append((book_id, existing[book_id], changes))
+        await self._invalidate(*[result.id for result in results if result.status == 'updated'])
+        await self._changed()
+        for book_id, before, changes in updated:
+            await self._publish('update', book_id, {'_id': book_id, **before, **changes}, before, changes)
+        return self._bulk_result(results, 'updated')
+
+    async def bulk_delete(self, book_ids: list):
+        results = [None] * len(book_ids)
+        positions = {}
+        for index, book_id in enumerate(book_ids):
+            try:
+                positions.setdefault(ObjectId(book_id), []).append(index)
+            except (InvalidId, TypeError):
+                results[index] = BulkItemResult(index=index, status='invalid', error="Invalid ObjectId")
+        deleted = {}
+        for chunk in _chunks(list(positions)):
+            existing = await self._existing(chunk, BOOK_FIELDS)
+            writes = [book_id for book_id in chunk if book_id in existing]
+            errors = await self._bulk_write([DeleteOne({'_id': book_id}) for book_id in writes]) if writes else {}
+            outcomes = {book_id: ('not_found', "Book not found") for book_id in chunk if book_id not in existing}
+            for position, book_id in enumerate(writes):
+                if position in errors:
+                    outcomes[book_id] = self._write_error(errors[position])
+                else:
+                    outcomes[book_id] = ('deleted', None)
+                    deleted[book_id] = existing[book_id]
+            for book_id, (outcome, message) in outcomes.items():
+                for index in positions[book_id]:
+                    results[index] = BulkItemResult(index=index, id=str(book_id), status=outcome, error=message)
+        if deleted:
+            await self._invalidate(*[str(book_id) for book_id in deleted])
+            await self._changed()
+        for book_id, book in deleted.items():
+            await self._publish('delete', book_id, previous=book)
+        return self._bulk_result(results, 'deleted')
 
-    async def get_books(self):
-        books = await self.collection.find().to_list(None)
-        return [self._to_response(book, BookResponse) for book in books]
+    async def _existing(self, book_ids: list, fields: tuple = ()):
+        docs = await self.collection.find({'_id': {'$in': book_ids}}, list(fields) or ['_id']).to_list(None)
+        return {doc.pop('_id'): doc for doc in docs}
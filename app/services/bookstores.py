@@ -0,0 +1,41 @@
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel
+from fastapi import HTTPException, status
+from app.models.bookstores import Bookstore
+from app.schemas.bookstores import BookstoreResponse, CreateBookstore, UpdateBookstore
+from app.services import BaseService, DEFAULT_PAGE_SIZE
+
+
+class BookstoreService(BaseService):
+    collection_name = 'bookstores'
+    indexes = [IndexModel([('name', ASCENDING), ('location', ASCENDING)], name='name_location_unique', unique=True)]
+    query_plans = [('get_bookstore', {'_id': ObjectId()}, None),
+                   ('get_bookstores', {'_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)])]
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(db)
+        self.collection = db[self.collection_name]
+        self.stock = db['stock']
+
+    async def create_bookstore(self, bookstore_data: CreateBookstore):
+        bookstore = Bookstore(**bookstore_data.dict())
+        return await self._insert(bookstore.dict(), BookstoreResponse)
+
+    async def get_bookstore(self, bookstore_id: str):
+        bookstore = await self.collection.find_one({'_id': self._object_id(bookstore_id)})
+        if not bookstore:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookstore not found")
+        return self._to_response(bookstore, BookstoreResponse)
+
+    async def get_bookstores(self, limit: int = DEFAULT_PAGE_SIZE, after: str = None):
+        return await self._paginate({}, limit, after, BookstoreResponse)
+
+    async def update_bookstore(self, bookstore_id: str, update_data: UpdateBookstore):
+        return await self._update(bookstore_id, update_data.dict(exclude_unset=True), BookstoreResponse, "Bookstore not found")
+
+    async def delete_bookstore(self, bookstore_id: str):
+        result = await self.collection.delete_one({'_id': self._object_id(bookstore_id)})
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookstore not found")
+        await self.stock.delete_many({'bookstore_id': bookstore_id})
@@ -1,6 +1,7 @@
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel
 from fastapi import HTTPException, status
 from app.models.categories import Category
 from app.schemas.categories import CategoryResponse, CreateCategory, UpdateCategory
@@ -8,45 +9,50 @@ from app.services import BaseService
 
 
 class CategoryService(BaseService):
+    collection_name = 'categories'
+    indexes = [IndexModel([('name', ASCENDING)], name='name_unique', unique=True)]
+    query_plans = [('get_categories', {}, [('name', ASCENDING)])]
+    track_changes = True
+
     def __init__(self, db:AsyncIOMotorDatabase):
         super().__init__(db)
-        self.collection = db['categories']
+        self.collection = db[self.collection_name]
     
     async def create_category(self,category_data:CreateCategory):
         category = Category(**category_data.dict())
-        result = await self.collection.insert_one(category.dict())
-        cat = await self.collection.find_one({"_id":result.inserted_id})
-        return self._to_response(cat,CategoryResponse)
+        created = await self._insert(category.dict(), CategoryResponse)
+        await self.cache.invalidate_prefix('categories:')
+        return created
     
-    async def get_categories(self):
+    async def get_categories(self, version: int = None):
+        if version is None:
+            version = await self.collection_version()
+        return await self.cache.get_or_load(f'categories:list:{version}', self._load_categories)
+
+    async def _load_categories(self):
         try:
-            categories = await self.collection.find().to_list(length=None)
+            categories = await self.collection.find({}, self._projection(CategoryResponse)).sort('name', ASCENDING).to_list(length=None)
         except InvalidId:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
         if not categories:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-        return [self._to_response(category, CategoryResponse) for category in categories]
+        return self._to_raw(categories, class_name=CategoryResponse)
     
-    async def update_category(self,category_id:str,update_cat:UpdateCategory):
-        try:
-            update  = await self.collection.update_one({"_id":category_id},
-                                                       {"$set":update_cat.dict(exclude_unset = True)})
-        except InvalidId:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
-        
-        if update.matched_count == 0:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-        
-        updated = await self.collection.find_one({'_id':ObjectId(category_id)})
-        return self._to_response(updated,CategoryResponse)
+    async def update_category(self,category_id:str,update_cat:UpdateCategory,version:int = None):
+        changes = update_cat.dict(exclude_unset = True)
+        updated = await self._update(category_id, changes, CategoryResponse, "Category not found", version)
+        await self.cache.invalidate_prefix('categories:')
+        return updated
     
     async def delete_category(self,category_id:str):
         try:
             result = await self.collection.delete_one({"_id":ObjectId(category_id)})
             if result.deleted_count == 0:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-            else:
-                return f"Review with id {category_id} deleted successfully!!!!"
+            await self.cache.invalidate_prefix('categories:')
+            await self._changed()
+            await self._publish('delete', category_id)
+            return f"Review with id {category_id} deleted successfully!!!!"
         except InvalidId:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ReviewID")   
     
@@ -0,0 +1,60 @@
+import logging
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+from app.services.authors import AuthorService
+from app.services.books import BookService
+from app.services.bookstores import BookstoreService
+from app.services.categories import CategoryService
+from app.services.inventory import InventoryService
+from app.services.recommendations import RecommendationService
+from app.services.reviews import ReviewService
+from app.services.snapshots import SnapshotService
+from app.services.users import UserService
+
+logger = logging.getLogger(__name__)
+
+SERVICES = [BookService, UserService, ReviewService, CategoryService, BookstoreService, InventoryService,
+            AuthorService, SnapshotService, RecommendationService]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    for service in SERVICES:
+        if not service.indexes:
+            continue
+        try:
+            existing = await db[service.collection_name].index_information()
+            for name in service.retired_indexes:
+                if name in existing:
+                    await db[service.collection_name].drop_index(name)
+                    logger.info(f"Dropped retired index '{name}' on '{service.collection_name}'")
+            names = await db[service.collection_name].create_indexes(service.indexes)
+            logger.info(f"Indexes on '{service.collection_name}': {', '.join(names)}")
+        except PyMongoError as e:
+            logger.error(f"Failed to create indexes on '{service.collection_name}': {str(e)}")
+
+
+def _plan_stages(plan: dict):
+    stages = [plan['stage']] if 'stage' in plan else []
+    for key in ('queryPlan', 'inputStage'):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def check_query_plans(db: AsyncIOMotorDatabase):
+    report = []
+    for service in SERVICES:
+        for method, query, sort in service.query_plans:
+            cursor = db[service.collection_name].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+            stages = _plan_stages(explain['queryPlanner']['winningPlan'])
+            report.append({'service': service.__name__,
+                           'method': method,
+                           'collection': service.collection_name,
+                           'stages': stages,
+                           'collscan': 'COLLSCAN' in stages})
+    return report
@@ -0,0 +1,139 @@
+import asyncio
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from fastapi import HTTPException, status
+from app.schemas.books import BulkItemResult
+from app.schemas.inventory import StockMove, StockResponse
+from app.services import BaseService, DEFAULT_PAGE_SIZE
+
+MAX_STOCK_MOVES = 1000
+MOVE_CONCURRENCY = 50
+NEW_STOCK = {'reserved': 0, 'checked_out': 0}
+
+
+class InventoryService(BaseService):
+    collection_name = 'stock'
+    indexes = [IndexModel([('bookstore_id', ASCENDING), ('book_id', ASCENDING)], name='bookstore_book_unique', unique=True),
+               IndexModel([('book_id', ASCENDING)], name='book_id')]
+    query_plans = [('reserve', {'bookstore_id': '', 'book_id': '', 'available': {'$gte': 1}}, None),
+                   ('get_stock', {'bookstore_id': '', '_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)])]
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(db)
+        self.collection = db[self.collection_name]
+        self.books = db['books']
+        self.bookstores = db['bookstores']
+
+    def _key(self, bookstore_id: str, book_id: str):
+        self._object_id(bookstore_id)
+        self._object_id(book_id)
+        return {'bookstore_id': bookstore_id, 'book_id': book_id}
+
+    async def _shift(self, bookstore_id: str, book_id: str, quantity: int, source: str, target: str):
+        key = self._key(bookstore_id, book_id)
+        stock = await self.collection.find_one_and_update({**key, source: {'$gte': quantity}},
+                                                          {'$inc': {source: -quantity, target: quantity}},
+                                                          return_document=ReturnDocument.AFTER)
+        if stock:
+            return self._to_response(stock, StockResponse)
+        if not await self.collection.count_documents(key, limit=1):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book is not stocked in this bookstore")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Not enough {source} copies")
+
+    async def receive(self, bookstore_id: str, book_id: str, quantity: int):
+        key = self._key(bookstore_id, book_id)
+        if not await self.bookstores.count_documents({'_id': ObjectId(bookstore_id)}, limit=1):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookstore not found")
+        if not await self.books.count_documents({'_id': ObjectId(book_id)}, limit=1):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+        stock = await self.collection.find_one_and_update(key, {'$inc': {'available': quantity}, '$setOnInsert': NEW_STOCK},
+                                                          upsert=True, return_document=ReturnDocument.AFTER)
+        return self._to_response(stock, StockResponse)
+
+    async def reserve(self, bookstore_id: str, book_id: str, quantity: int):
+        return await self._shift(bookstore_id, book_id, quantity, 'available', 'reserved')
+
+    async def release(self, bookstore_id: str, book_id: str, quantity: int):
+        return await self._shift(bookstore_id, book_id, quantity, 'reserved', 'available')
+
+    async def checkout(self, bookstore_id: str, book_id: str, quantity: int, from_reservation: bool = True):
+        return await self._shift(bookstore_id, book_id, quantity, 'reserved' if from_reservation else 'available', 'checked_out')
+
+    async def remove_stock(self, bookstore_id: str, book_id: str):
+        key = self._key(bookstore_id, book_id)
+        result = await self.collection.delete_one({**key, 'reserved': 0})
+        if result.deleted_count:
+            return
+        if not await self.collection.count_documents(key, limit=1):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book is not stocked in this bookstore")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Copies of this book are still reserved")
+
+    async def get_stock(self, bookstore_id: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None):
+        self._object_id(bookstore_id)
+        return await self._paginate({'bookstore_id': bookstore_id}, limit, after, StockResponse)
+
+    async def move_stock(self, items: list):
+        if len(items) > MAX_STOCK_MOVES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_STOCK_MOVES} moves per request")
+        results = [None] * len(items)
+        moves = {}
+        for index, item in enumerate(items):
+            try:
+                move = StockMove(**item)
+                self._key(move.from_bookstore_id, move.book_id)
+                self._key(move.to_bookstore_id, move.book_id)
+            except ValidationError as e:
+                results[index] = BulkItemResult(index=index, status='invalid', error=self._validation_detail(e))
+                continue
+            except TypeError:
+                results[index] = BulkItemResult(index=index, status='invalid', error="Item must be an object")
+                continue
+            except HTTPException as e:
+                results[index] = BulkItemResult(index=index, id=item.get('book_id'), status='invalid', error=e.detail)
+                continue
+            if move.from_bookstore_id == move.to_bookstore_id:
+                results[index] = BulkItemResult(index=index, id=move.book_id, status='invalid', error="Source and target bookstore are the same")
+                continue
+            moves[index] = move
+
+        targets = {move.to_bookstore_id for move in moves.values()}
+        existing = {str(doc['_id']) async for doc in self.bookstores.find({'_id': {'$in': [ObjectId(t) for t in targets]}}, {'_id': 1})}
+        for index, move in list(moves.items()):
+            if move.to_bookstore_id not in existing:
+                results[index] = BulkItemResult(index=index, id=move.book_id, status='not_found', error="Target bookstore not found")
+                del moves[index]
+
+        limit = asyncio.Semaphore(MOVE_CONCURRENCY)
+
+        async def take(move: StockMove):
+            async with limit:
+                result = await self.collection.update_one({'bookstore_id': move.from_bookstore_id, 'book_id': move.book_id,
+                                                           'available': {'$gte': move.quantity}},
+                                                          {'$inc': {'available': -move.quantity}})
+                return result.modified_count == 1
+
+        taken = dict(zip(moves, await asyncio.gather(*[take(move) for move in moves.values()])))
+        deliveries = []
+        for index, move in moves.items():
+            if taken[index]:
+                deliveries.append(index)
+            else:
+                results[index] = BulkItemResult(index=index, id=move.book_id, status='insufficient', error="Not enough available copies")
+
+        errors = await self._bulk_write([UpdateOne({'bookstore_id': moves[index].to_bookstore_id, 'book_id': moves[index].book_id},
+                                                   {'$inc': {'available': moves[index].quantity}, '$setOnInsert': NEW_STOCK}, upsert=True)
+                                         for index in deliveries]) if deliveries else {}
+        refunds = []
+        for position, index in enumerate(deliveries):
+            move = moves[index]
+            if position in errors:
+                refunds.append(UpdateOne({'bookstore_id': move.from_bookstore_id, 'book_id': move.book_id},
+                                         {'$inc': {'available': move.quantity}}))
+                results[index] = BulkItemResult(index=index, id=move.book_id, status='error', error=self._write_error(errors[position])[1])
+            else:
+                results[index] = BulkItemResult(index=index, id=move.book_id, status='moved')
+        if refunds:
+            await self.collection.bulk_write(refunds, ordered=False)
+        return self._bulk_result(results, 'moved')
@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import math
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from bson.objectid import ObjectId
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DeleteOne, IndexModel, ReplaceOne, UpdateOne
+from app.services import BaseService
+
+RECOMMEND_TOP_K = int(os.getenv('RECOMMEND_TOP_K', 20))
+RECOMMEND_MIN_RATING = int(os.getenv('RECOMMEND_MIN_RATING', 4))
+RECOMMEND_MAX_USER_BOOKS = int(os.getenv('RECOMMEND_MAX_USER_BOOKS', 500))
+RECOMMEND_BATCH_SIZE = int(os.getenv('RECOMMEND_BATCH_SIZE', 1000))
+
+
+def _cosine(shared: float, likes: int, other_likes: int):
+    return shared / (math.sqrt(likes) * math.sqrt(other_likes))
+
+
+def _top(scores, top_k: int):
+    best = heapq.nsmallest(top_k, ((book_id, round(score, 4)) for book_id, score in scores), key=lambda item: (-item[1], item[0]))
+    return [{'book_id': book_id, 'score': score} for book_id, score in best]
+
+
+def _object_ids(book_ids):
+    return [ObjectId(book_id) for book_id in book_ids if ObjectId.is_valid(book_id)]
+
+
+def cosine_python(baskets: dict, top_k: int, max_books: int):
+    likes = Counter()
+    together = defaultdict(Counter)
+    for books in baskets.values():
+        likes.update(books)
+        if len(books) > max_books:
+            continue
+        for book_id in books:
+            together[book_id].update(books)
+    rows = {}
+    for book_id, count in likes.items():
+        row = together.get(book_id, {})
+        rows[book_id] = _top(((other, _cosine(shared, count, likes[other])) for other, shared in row.items() if other != book_id),
+                             top_k)
+    return dict(likes), rows
+
+
+def cosine_scipy(baskets: dict, top_k: int, max_books: int):
+    import numpy as np
+    from scipy import sparse
+
+    books = sorted({book_id for basket in baskets.values() for book_id in basket})
+    index = {book_id: column for column, book_id in enumerate(books)}
+    rows, columns = [], []
+    for row, basket in enumerate(baskets.values()):
+        rows.extend([row] * len(basket))
+        columns.extend(index[book_id] for book_id in basket)
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(len(baskets), len(books)))
+    likes = np.asarray(matrix.sum(axis=0)).ravel()
+    paired = (sparse.diags((np.diff(matrix.indptr) <= max_books).astype(float)) @ matrix).tocsr()
+    paired.eliminate_zeros()
+    together = (paired.T @ paired).tocsr()
+    norms = np.sqrt(likes)
+    similar = {}
+    for column, book_id in enumerate(books):
+        start, end = together.indptr[column], together.indptr[column + 1]
+        others, shared = together.indices[start:end], together.data[start:end]
+        keep = (others != column) & (shared > 0)
+        others, scores = others[keep], shared[keep] / (norms[column] * norms[others[keep]])
+        if len(scores) > top_k:
+            rounded = np.round(scores, 4)
+            best = rounded >= np.partition(rounded, -top_k)[-top_k]
+            others, scores = others[best], scores[best]
+        similar[book_id] = _top(((books[other], float(score)) for other, score in zip(others, scores)), top_k)
+    return {book_id: int(likes[column]) for column, book_id in enumerate(books)}, similar
+
+
+def similarity_engine():
+    try:
+        import scipy.sparse
+    except ImportError:
+        return 'python', cosine_python
+    return 'scipy', cosine_scipy
+
+
+class RecommendationService(BaseService):
+    collection_name = 'book_similarities'
+    indexes = [IndexModel([('similar.book_id', ASCENDING)], name='similar_book_id')]
+    query_plans = [('get_similar', {'_id': ObjectId()}, None),
+                   ('refresh', {'similar.book_id': {'$in': [str(ObjectId())]}}, None)]
+
+    def __init__(self, db: AsyncIOMotorDatabase, top_k: int = RECOMMEND_TOP_K, batch_size: int = RECOMMEND_BATCH_SIZE):
+        super().__init__(db)
+        self.collection = db[self.collection_name]
+        self.books = db['books']
+        self.users = db['users']
+        self.reviews = db['reviews']
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.min_rating = RECOMMEND_MIN_RATING
+        self.max_user_books = RECOMMEND_MAX_USER_BOOKS
+
+    def _liked_reviews(self, query: dict):
+        return {**query, 'user_id': query.get('user_id', {'$ne': None}), 'rating': {'$gte': self.min_rating}}
+
+    async def _baskets(self, user_ids: set = None):
+        baskets = defaultdict(set)
+        users = {'favorite_books.0': {'$exists': True}} if user_ids is None else {'_id': {'$in': _object_ids(user_ids)}}
+        async for user in self.users.find(users, {'favorite_books': 1}).batch_size(self.batch_size):
+            baskets[str(user['_id'])].update(user.get('favorite_books') or [])
+        reviews = self._liked_reviews({} if user_ids is None else {'user_id': {'$in': list(user_ids)}})
+        async for review in self.reviews.find(reviews, {'user_id': 1, 'book_id': 1}).batch_size(self.batch_size):
+            baskets[review['user_id']].add(review['book_id'])
+        return {user_id: books for user_id, books in baskets.items() if books}
+
+    async def _likers(self, book_ids: set):
+        likers = defaultdict(set)
+        async for user in self.users.find({'favorite_books': {'$in': list(book_ids)}}, {'favorite_books': 1}):
+            for book_id in book_ids.intersection(user['favorite_books']):
+                likers[book_id].add(str(user['_id']))
+        reviews = self._liked_reviews({'book_id': {'$in': list(book_ids)}})
+        async for review in self.reviews.find(reviews, {'user_id': 1, 'book_id': 1}).batch_size(self.batch_size):
+            likers[review['book_id']].add(review['user_id'])
+        return likers
+
+    async def _write(self, operations: list):
+        for start in range(0, len(operations), self.batch_size):
+            await self.collection.bulk_write(operations[start:start + self.batch_size], ordered=False)
+        return len(operations)
+
+    async def _hydrate(self, scored: list, limit: int):
+        books = {str(book['_id']): book async for book in
+                 self.books.find({'_id': {'$in': _object_ids(entry['book_id'] for entry in scored)}}, {'title': 1, 'author': 1})}
+        similar = [{'id': entry['book_id'], 'title': books[entry['book_id']]['title'],
+                    'author': books[entry['book_id']]['author'], 'score': entry['score']}
+                   for entry in scored if entry['book_id'] in books]
+        return similar[:limit]
+
+    async def get_similar(self, book_id: str, limit: int = 10):
+        doc = await self.collection.find_one({'_id': self._object_id(book_id)}, {'similar': 1})
+        if not doc:
+            if not await self.books.count_documents({'_id': ObjectId(book_id)}, limit=1):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+            return []
+        return await self._hydrate(doc['similar'], limit)
+
+    async def recommend(self, user_id: str, limit: int = 10):
+        if not await self.users.count_documents({'_id': self._object_id(user_id)}, limit=1):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        liked = (await self._baskets({user_id})).get(user_id, set())
+        scores = defaultdict(float)
+        async for doc in self.collection.find({'_id': {'$in': _object_ids(liked)}}, {'similar': 1}):
+            for entry in doc['similar']:
+                if entry['book_id'] not in liked:
+                    scores[entry['book_id']] += entry['score']
+        return await self._hydrate(_top(scores.items(), limit), limit)
+
+    async def refresh(self, book_ids):
+        book_ids = {book_id for book_id in book_ids if ObjectId.is_valid(book_id)}
+        if not book_ids:
+            return 0
+        likers = await self._likers(book_ids)
+        baskets = await self._baskets(set().union(*likers.values())) if likers else {}
+        likes = {book_id: len(likers.get(book_id, ())) for book_id in book_ids}
+        together = {}
+        for book_id in book_ids:
+            row = Counter()
+            for user_id in likers.get(book_id, ()):
+                basket = baskets.get(user_id, ())
+                if len(basket) <= self.max_user_books:
+                    row.update(basket)
+            row.pop(book_id, None)
+            together[book_id] = row
+        neighbours = {other for row in together.values() for other in row if ObjectId.is_valid(other)} - book_ids
+        query = {'$or': [{'_id': {'$in': _object_ids(neighbours)}}, {'similar.book_id': {'$in': list(book_ids)}}]}
+        stored = {str(doc['_id']): doc async for doc in self.collection.find(query, {'likes': 1, 'similar': 1})}
+        stored = {other: doc for other, doc in stored.items() if other not in book_ids}
+        missing = neighbours - stored.keys()
+        counted = await self._likers(missing) if missing else {}
+        likes.update({other: len(counted.get(other, ())) for other in missing})
+        likes.update({other: doc.get('likes', 0) for other, doc in stored.items()})
+
+        def score(book_id: str, other: str):
+            return _cosine(together[book_id][other], likes[book_id], likes[other])
+
+        now = datetime.now(timezone.utc)
+        operations = []
+        for book_id in book_ids:
+            if not likes[book_id]:
+                operations.append(DeleteOne({'_id': ObjectId(book_id)}))
+                continue
+            similar = _top(((other, score(book_id, other)) for other in together[book_id] if likes.get(other)), self.top_k)
+            operations.append(ReplaceOne({'_id': ObjectId(book_id)}, {'likes': likes[book_id], 'similar': similar, 'updated_at': now},
+                                         upsert=True))
+        for other in neighbours | stored.keys():
+            doc = stored.get(other, {})
+            scores = {entry['book_id']: entry['score'] for entry in doc.get('similar', [])}
+            for book_id in book_ids:
+                if likes[book_id] and likes[other] and together[book_id].get(other):
+                    scores[book_id] = score(book_id, other)
+                else:
+                    scores.pop(book_id, None)
+            similar = _top(scores.items(), self.top_k)
+            if similar != doc.get('similar') or likes[other] != doc.get('likes'):
+                operations.append(UpdateOne({'_id': ObjectId(other)},
+                                            {'$set': {'likes': likes[other], 'similar': similar, 'updated_at': now}}, upsert=True))
+        return await self._write(operations)
+
+    async def remove_books(self, book_ids):
+        book_ids = [book_id for book_id in book_ids if ObjectId.is_valid(book_id)]
+        if not book_ids:
+            return
+        await self.collection.delete_many({'_id': {'$in': _object_ids(book_ids)}})
+        await self.collection.update_many({'similar.book_id': {'$in': book_ids}},
+                                          {'$pull': {'similar': {'book_id': {'$in': book_ids}}}})
+
+    async def rebuild(self):
+        started = datetime.now(timezone.utc)
+        baskets = await self._baskets()
+        engine, cosine = similarity_engine()
+        likes, rows = await asyncio.to_thread(cosine, baskets, self.top_k, self.max_user_books)
+        written = await self._write([ReplaceOne({'_id': ObjectId(book_id)},
+                                                {'likes': likes[book_id], 'similar': similar, 'updated_at': started}, upsert=True)
+                                     for book_id, similar in rows.items() if ObjectId.is_valid(book_id)])
+        removed = await self.collection.delete_many({'updated_at': {'$lt': started}})
+        return {'books': written, 'removed': removed.deleted_count, 'users': len(baskets), 'engine': engine}
@@ -1,58 +1,194 @@
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, UpdateOne
 from fastapi import HTTPException, status
-from app.services import BaseService
+from app.services import BaseService, DEFAULT_SEARCH_PAGE_SIZE
+from app.writebehind import BufferFull, activity_update, review_activity
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.models.reviews import Review
-from app.schemas.reviews import ReviewResponse, WriteReview, UpdatReview
-from typing import List
+from app.schemas.reviews import CommentReview, ReviewDetails, ReviewResponse, WriteReview, UpdatReview
+from app.schemas.search import ReviewSearchHit
+from typing import List, Optional
+
+RECONCILE_BATCH_SIZE = 1000
+MAX_BATCH_BOOK_IDS = 200
+MAX_REVIEWS_PER_BOOK = 100
 
 
 class ReviewService(BaseService):
+    collection_name = 'reviews'
+    indexes = [IndexModel([('book_id', ASCENDING), ('rating', DESCENDING)], name='book_id_rating'),
+               IndexModel([('content', TEXT)], name='reviews_text'),
+               IndexModel([('user_id', ASCENDING)], name='user_id', sparse=True)]
+    query_plans = [('get_reviews', {'book_id': {'$in': ['']}}, None),
+                   ('search_reviews', {'$text': {'$search': 'symbolism'}}, None)]
+
     def __init__(self, db:AsyncIOMotorDatabase):
         super().__init__(db)
-        self.collection = db['reviews']
+        self.collection = db[self.collection_name]
+        self.books = db['books']
+        self.activity = review_activity
+
+    async def _adjust_book_rating(self, book_id: str, rating_delta: int, count_delta: int = 0):
+        try:
+            book_id = ObjectId(book_id)
+        except (InvalidId, TypeError):
+            return False
+        changes = {'rating_sum': rating_delta}
+        if count_delta:
+            changes['total_reviews'] = count_delta
+        book = await self.books.find_one_and_update({'_id': book_id}, self._touch({'$inc': changes}), {'author_id': 1})
+        self.flights.forget(f'books:{book_id}')
+        await self.cache.invalidate(f'books:{book_id}')
+        await self.cache.invalidate_prefix('books:list:')
+        await self._changed('books')
+        if book:
+            await self._publish('update', book_id, book, changed=changes, collection_name='books')
+        return book is not None
     
     async def write_review(self,user_review:WriteReview):
         review = Review(**user_review.dict())
-        result = await self.collection.insert_one(review.dict())
-        review = await self.collection.find_one({'_id':result.inserted_id})
-        return self._to_response(review,ReviewResponse)
-    
-    async def get_reviews(self, book_id: str):
+        self._object_id(review.book_id)
+        if review.user_id is not None:
+            if not await self.db['users'].count_documents({'_id': self._object_id(review.user_id)}, limit=1):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        if not await self._adjust_book_rating(review.book_id, review.rating, 1):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
         try:
-            reviews = await self.collection.find({'book_id': book_id}).to_list(length=None)
-        except InvalidId:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
+            created = await self._insert(review.dict(), ReviewResponse)
+        except BaseException:
+            await self._adjust_book_rating(review.book_id, -review.rating, -1)
+            raise
+        self.flights.forget(f'reviews:{review.book_id}')
+        return created
+    
+    async def _load_reviews(self, book_ids: List[str], fields: list = None):
+        grouped = {}
+        projection = {**self._projection(ReviewResponse, fields), 'book_id': 1}
+        async for review in self.collection.find({'book_id': {'$in': book_ids}}, projection):
+            grouped.setdefault(review['book_id'], []).append(self._prepare(review, fields, ReviewResponse))
+        return grouped
+
+    async def get_reviews(self, book_id: str, fields: str = None):
+        fields = self._fields(ReviewResponse, fields)
+        if fields:
+            reviews = self._to_raw(await self.collection.find({'book_id': book_id}, self._projection(ReviewResponse, fields)).to_list(None), fields, ReviewResponse)
+        else:
+            grouped = await self.flights.do(f'reviews:{book_id}', lambda: self._load_reviews([book_id]))
+            reviews = grouped.get(book_id)
         if not reviews:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No reviews for the selected book.")
-        return [self._to_response(review, ReviewResponse) for review in reviews]
+        return reviews
+
+    async def get_reviews_for_books(self, book_ids: List[str], per_book: Optional[int] = None, top_rated: bool = False, fields: str = None):
+        book_ids = list(dict.fromkeys(book_id for value in book_ids for book_id in value.split(',') if book_id))
+        if not book_ids:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one book_id is required")
+        if len(book_ids) > MAX_BATCH_BOOK_IDS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BATCH_BOOK_IDS} book_ids per request")
+        fields = self._fields(ReviewResponse, fields)
+        if per_book is None and not top_rated:
+            grouped = await self._load_reviews(book_ids, fields)
+        else:
+            pushed = {field: f'${field}' for field in self._projection(ReviewResponse, fields)}
+            order = {'book_id': ASCENDING, 'rating': DESCENDING, '_id': ASCENDING} if top_rated else {'book_id': ASCENDING, '_id': ASCENDING}
+            pipeline = [{'$match': {'book_id': {'$in': book_ids}}},
+                        {'$sort': order},
+                        {'$group': {'_id': '$book_id', 'reviews': {'$push': {**pushed, '_id': '$_id'}}}},
+                        {'$project': {'reviews': {'$slice': ['$reviews', per_book or MAX_REVIEWS_PER_BOOK]}}}]
+            grouped = {row['_id']: self._to_raw(row['reviews'], fields, ReviewResponse) async for row in self.collection.aggregate(pipeline)}
+        return {book_id: grouped.get(book_id, []) for book_id in book_ids}
     
+    async def search_reviews(self, text: str, page: int = 1, size: int = DEFAULT_SEARCH_PAGE_SIZE, fields: str = None):
+        return await self._text_search(text, page, size, ReviewSearchHit, self._fields(ReviewSearchHit, fields))
+
     async def update_review(self,review_id:str,update_review:UpdatReview):
-        try:
-            review = await self.collection.update_one({'_id':ObjectId(review_id)},
-                                                      {"$set":update_review.dict(exclude_unset = True)})
-        
-        except InvalidId:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
-        
-        if review.matched_count == 0:
+        changes = {field: value for field, value in update_review.dict(exclude_unset = True).items() if value is not None}
+        if 'rating' not in changes:
+            updated = await self._update(review_id, changes, ReviewResponse, "Review not found")
+            self.flights.forget(f'reviews:{updated.book_id}')
+            return updated
+        update = self._touch({'$set': changes})
+        before = await self.collection.find_one_and_update({'_id': self._object_id(review_id)}, update)
+        if not before:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
-        
-        review_ = await self.collection.find_one({'_id': ObjectId(review_id)})
-
-        return self._to_response(review_,ReviewResponse)
+        if changes['rating'] != before['rating']:
+            await self._adjust_book_rating(before['book_id'], changes['rating'] - before['rating'])
+        self.flights.forget(f"reviews:{before['book_id']}")
+        review = {**before, **changes, 'version': before.get('version', 0) + 1, 'updated_at': update['$set']['updated_at']}
+        await self._publish('update', before['_id'], dict(review), before, changes)
+        return self._to_response(review, ReviewResponse)
     
     async def delete_review(self, review_id: str):
         try:
-            result = await self.collection.delete_one({'_id': ObjectId(review_id)})
-            if result.deleted_count == 0:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-            else:
-                return f"Review with id {review_id} is successfully deleted!!"
+            review = await self.collection.find_one_and_delete({'_id': ObjectId(review_id)}, {'book_id': 1, 'rating': 1, 'user_id': 1})
+            if not review:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
+            await self._adjust_book_rating(review['book_id'], -review['rating'], -1)
+            self.flights.forget(f"reviews:{review['book_id']}")
+            await self._publish('delete', review['_id'], previous=review)
+            return f"Review with id {review_id} is successfully deleted!!"
         except InvalidId:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid UserID")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ReviewID")
+
+    async def _record_activity(self, review_id: str, likes: int = 0, comments: list = ()):
+        review_oid = self._object_id(review_id)
+        if not await self.collection.find_one({'_id': review_oid}, {'_id': 1}):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
+        try:
+            if await self.activity.add(review_id, likes, list(comments)):
+                return
+        except BufferFull as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={'Retry-After': '1'})
+        await self.collection.update_one({'_id': review_oid}, activity_update(likes, list(comments)))
+
+    async def like_review(self, review_id: str):
+        await self._record_activity(review_id, likes=1)
+
+    async def comment_review(self, review_id: str, comment: CommentReview):
+        comment = {'id': str(ObjectId()), **comment.dict()}
+        await self._record_activity(review_id, comments=[comment])
+        return comment
+
+    async def get_review_details(self, review_id: str):
+        review = await self.collection.find_one({'_id': self._object_id(review_id)}, {'review_details': 1})
+        if not review:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
+        details = review.get('review_details', {})
+        likes, comments = self.activity.pending_for(review_id)
+        return ReviewDetails(likes=details.get('likes', 0) + likes, comments=details.get('comments', []) + comments)
+
+    async def reconcile_book_ratings(self, batch_size: int = RECONCILE_BATCH_SIZE):
+        repaired = 0
+        after = None
+        while True:
+            query = {'_id': {'$gt': after}} if after else {}
+            books = await self.books.find(query, {'rating_sum': 1, 'total_reviews': 1}).sort('_id', ASCENDING).limit(batch_size).to_list(batch_size)
+            if not books:
+                return repaired
+            after = books[-1]['_id']
+            totals = {}
+            pipeline = [{'$match': {'book_id': {'$in': [str(book['_id']) for book in books]}}},
+                        {'$group': {'_id': '$book_id', 'rating_sum': {'$sum': '$rating'}, 'total_reviews': {'$sum': 1}}}]
+            async for row in self.collection.aggregate(pipeline):
+                totals[row['_id']] = row
+            updates = []
+            repaired_ids = []
+            for book in books:
+                row = totals.get(str(book['_id']), {})
+                expected = {'rating_sum': row.get('rating_sum', 0), 'total_reviews': row.get('total_reviews', 0)}
+                if book.get('rating_sum') != expected['rating_sum'] or book.get('total_reviews') != expected['total_reviews']:
+                    current = {'_id': book['_id'], 'rating_sum': book.get('rating_sum'), 'total_reviews': book.get('total_reviews')}
+                    updates.append(UpdateOne(current, self._touch({'$set': expected})))
+                    repaired_ids.append(book['_id'])
+            if updates:
+                result = await self.books.bulk_write(updates, ordered=False)
+                self.flights.forget(*[f'books:{book_id}' for book_id in repaired_ids])
+                await self.cache.invalidate(*[f'books:{book_id}' for book_id in repaired_ids])
+                await self.cache.invalidate_prefix('books:list:')
+                await self._changed('books')
+                repaired += result.modified_count
         
     
 
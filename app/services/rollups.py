@@ -0,0 +1,116 @@
+import os
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from app.services import BaseService
+
+ROLLUP_BATCH_SIZE = int(os.getenv('ROLLUP_BATCH_SIZE', 1000))
+LATEST_BOOKS = 5
+BOOK_TRIGGERS = ('author_id', 'category', 'title', 'year_published')
+BOOK_FIELDS = BOOK_TRIGGERS + ('rating_sum', 'total_reviews')
+AUTHOR_DEFAULTS = {'total_published': 0, 'rating_sum': 0, 'total_reviews': 0, 'latest_books': []}
+CATEGORY_DEFAULTS = {'total_books': 0}
+USER_DEFAULTS = {'total_reviews': 0}
+
+
+def _ids(values):
+    object_ids = []
+    for value in values:
+        try:
+            object_ids.append(ObjectId(value))
+        except (InvalidId, TypeError):
+            continue
+    return object_ids
+
+
+def _category_id(book: dict):
+    return (book.get('category') or {}).get('id')
+
+
+class RollupService(BaseService):
+    def __init__(self, db: AsyncIOMotorDatabase, batch_size: int = ROLLUP_BATCH_SIZE):
+        super().__init__(db)
+        self.authors = db['authors']
+        self.categories = db['categories']
+        self.users = db['users']
+        self.books = db['books']
+        self.reviews = db['reviews']
+        self.batch_size = batch_size
+
+    async def _categories_changed(self):
+        await self.cache.invalidate_prefix('categories:')
+        await self._changed('categories')
+
+    async def _author_rollups(self, author_ids: list):
+        pipeline = [{'$match': {'author_id': {'$in': author_ids}}},
+                    {'$sort': {'author_id': ASCENDING, 'year_published': DESCENDING, '_id': DESCENDING}},
+                    {'$group': {'_id': '$author_id', 'total_published': {'$sum': 1}, 'rating_sum': {'$sum': '$rating_sum'},
+                                'total_reviews': {'$sum': '$total_reviews'},
+                                'latest_books': {'$push': {'_id': '$_id', 'title': '$title', 'year_published': '$year_published'}}}},
+                    {'$project': {'total_published': 1, 'rating_sum': 1, 'total_reviews': 1,
+                                  'latest_books': {'$slice': ['$latest_books', LATEST_BOOKS]}}}]
+        rollups = {}
+        async for row in self.books.aggregate(pipeline):
+            row['latest_books'] = [self._replace_id(book) for book in row['latest_books']]
+            rollups[row.pop('_id')] = row
+        return rollups
+
+    async def _category_rollups(self, category_ids: list):
+        pipeline = [{'$match': {'category.id': {'$in': category_ids}}},
+                    {'$group': {'_id': '$category.id', 'total_books': {'$sum': 1}}}]
+        return {row.pop('_id'): row async for row in self.books.aggregate(pipeline)}
+
+    async def _user_rollups(self, user_ids: list):
+        pipeline = [{'$match': {'user_id': {'$in': user_ids}}},
+                    {'$group': {'_id': '$user_id', 'total_reviews': {'$sum': 1}}}]
+        return {row.pop('_id'): row async for row in self.reviews.aggregate(pipeline)}
+
+    async def _apply(self, collection, docs: list, load, defaults: dict):
+        rollups = await load([str(doc['_id']) for doc in docs])
+        updates = []
+        for doc in docs:
+            expected = {**defaults, **rollups.get(str(doc['_id']), {})}
+            if any(doc.get(field) != value for field, value in expected.items()):
+                updates.append(UpdateOne({'_id': doc['_id']}, self._touch({'$set': expected})))
+        if updates:
+            await collection.bulk_write(updates, ordered=False)
+        return len(updates)
+
+    async def _rebuild(self, collection, load, defaults: dict, ids: list = None):
+        repaired = 0
+        if ids is not None:
+            for start in range(0, len(ids), self.batch_size):
+                docs = await collection.find({'_id': {'$in': ids[start:start + self.batch_size]}}, list(defaults)).to_list(None)
+                repaired += await self._apply(collection, docs, load, defaults)
+            return repaired
+        after = None
+        while True:
+            query = {'_id': {'$gt': after}} if after else {}
+            docs = await collection.find(query, list(defaults)).sort('_id', ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                return repaired
+            after = docs[-1]['_id']
+            repaired += await self._apply(collection, docs, load, defaults)
+
+    async def _repair(self, ids: dict = None):
+        targets = {'authors': (self.authors, self._author_rollups, AUTHOR_DEFAULTS),
+                   'categories': (self.categories, self._category_rollups, CATEGORY_DEFAULTS),
+                   'users': (self.users, self._user_rollups, USER_DEFAULTS)}
+        repaired = {}
+        for name, (collection, load, defaults) in targets.items():
+            if ids is None:
+                repaired[name] = await self._rebuild(collection, load, defaults)
+            else:
+                repaired[name] = await self._rebuild(collection, load, defaults, _ids(set(ids[name]))) if ids[name] else 0
+        if repaired['categories']:
+            await self._categories_changed()
+        if repaired['users']:
+            await self._changed('users')
+        return repaired
+
+    async def refresh(self, author_ids=(), category_ids=(), user_ids=()):
+        return await self._repair({'authors': author_ids, 'categories': category_ids, 'users': user_ids})
+
+    async def rebuild(self):
+        return await self._repair()
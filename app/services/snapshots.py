@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+from fastapi import HTTPException, status
+from app.schemas.snapshots import SnapshotJobResponse
+from app.services import BaseService, DEFAULT_PAGE_SIZE
+from app.services.books import BookService
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_BATCH_SIZE = int(os.getenv('SNAPSHOT_BATCH_SIZE', 1000))
+SNAPSHOT_MAX_ATTEMPTS = int(os.getenv('SNAPSHOT_MAX_ATTEMPTS', 5))
+SNAPSHOT_RETRY_DELAY = float(os.getenv('SNAPSHOT_RETRY_DELAY', 1))
+SNAPSHOT_LEASE_SECONDS = int(os.getenv('SNAPSHOT_LEASE_SECONDS', 60))
+
+REFERENCES = {'author': ('authors', 'author_id', 'author'),
+              'category': ('categories', 'category.id', 'category.name')}
+ACTIVE = ['pending', 'running', 'retrying']
+
+running = set()
+owner = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+
+def _expired():
+    return {'status': {'$in': ['running', 'retrying']},
+            'heartbeat_at': {'$not': {'$gte': datetime.now(timezone.utc) - timedelta(seconds=SNAPSHOT_LEASE_SECONDS)}}}
+
+
+class SnapshotService(BaseService):
+    collection_name = 'snapshot_jobs'
+    indexes = [IndexModel([('status', ASCENDING)], name='status'),
+               IndexModel([('ref_id', ASCENDING), ('_id', DESCENDING)], name='ref_id')]
+    query_plans = [('resume_jobs', {'status': {'$in': ACTIVE}}, None),
+                   ('get_jobs', {'ref_id': ''}, [('_id', DESCENDING)])]
+
+    def __init__(self, db: AsyncIOMotorDatabase, batch_size: int = SNAPSHOT_BATCH_SIZE):
+        super().__init__(db)
+        self.collection = db[self.collection_name]
+        self.books = BookService(db)
+        self.batch_size = batch_size
+
+    async def schedule(self, kind: str, ref_id: str):
+        now = datetime.now(timezone.utc)
+        result = await self.collection.insert_one({'kind': kind, 'ref_id': ref_id, 'status': 'pending', 'attempts': 0,
+                                                   'batches': 0, 'updated': 0, 'error': None,
+                                                   'created_at': now, 'updated_at': now})
+        self._spawn(result.inserted_id)
+        return str(result.inserted_id)
+
+    def _spawn(self, job_id: ObjectId):
+        task = asyncio.create_task(self.run_job(job_id))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    async def run_job(self, job_id: ObjectId):
+        while True:
+            now = datetime.now(timezone.utc)
+            claimable = [{'status': 'pending'}, {'status': 'retrying', 'owner': owner}, _expired()]
+            job = await self.collection.find_one_and_update({'_id': job_id, '$or': claimable},
+                                                            {'$set': {'status': 'running', 'owner': owner, 'heartbeat_at': now,
+                                                                      'updated_at': now},
+                                                             '$inc': {'attempts': 1}},
+                                                            return_document=ReturnDocument.AFTER)
+            if not job:
+                return
+            try:
+                if await self._propagate(job):
+                    await self._finish(job_id, 'done', None)
+                else:
+                    logger.error(f"Snapshot job {job_id} was reclaimed by another worker, stopping")
+                return
+            except PyMongoError as e:
+                retry = job['attempts'] < SNAPSHOT_MAX_ATTEMPTS
+                logger.error(f"Snapshot job {job_id} ({job['kind']} {job['ref_id']}) attempt {job['attempts']} failed: {str(e)}")
+                if not await self._finish(job_id, 'retrying' if retry else 'failed', str(e)) or not retry:
+                    return
+                await asyncio.sleep(SNAPSHOT_RETRY_DELAY * 2 ** (job['attempts'] - 1))
+
+    async def _finish(self, job_id: ObjectId, state: str, error: str):
+        try:
+            now = datetime.now(timezone.utc)
+            result = await self.collection.update_one({'_id': job_id, 'owner': owner},
+                                                      {'$set': {'status': state, 'error': error, 'heartbeat_at': now, 'updated_at': now}})
+            return result.matched_count > 0
+        except PyMongoError as e:
+            logger.error(f"Could not record snapshot job {job_id} as {state}, it resumes on restart: {str(e)}")
+            return False
+
+    async def _propagate(self, job: dict):
+        source, id_field, name_field = REFERENCES[job['kind']]
+        while True:
+            ref = await self.db[source].find_one({'_id': ObjectId(job['ref_id'])}, {'name': 1})
+            if not ref:
+                return True
+            query = {id_field: job['ref_id'], name_field: {'$ne': ref['name']}}
+            docs = await self.books.collection.find(query, list(self.books.search_fields)).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                return True
+            book_ids = [doc['_id'] for doc in docs]
+            updates = []
+            for doc in docs:
+                if job['kind'] == 'author':
+                    renamed = {**doc, 'author': ref['name']}
+                else:
+                    renamed = {**doc, 'category': {**doc['category'], 'name': ref['name']}}
+                search_terms = self.books._with_search_terms(renamed)['search_terms']
+                updates.append(UpdateOne({'_id': doc['_id'], **query},
+                                         self._touch({'$set': {name_field: ref['name'], 'search_terms': search_terms}})))
+            result = await self.books.collection.bulk_write(updates, ordered=False)
+            await self.books._invalidate(*[str(book_id) for book_id in book_ids])
+            await self._changed('books')
+            now = datetime.now(timezone.utc)
+            progress = await self.collection.update_one({'_id': job['_id'], 'owner': owner},
+                                                        {'$inc': {'batches': 1, 'updated': result.modified_count},
+                                                         '$set': {'heartbeat_at': now, 'updated_at': now}})
+            if not progress.matched_count:
+                return False
+
+    async def resume_jobs(self, include_failed: bool = False):
+        claimable = [{'status': 'pending'}, _expired()]
+        if include_failed:
+            claimable.append({'status': 'failed'})
+        job_ids = [doc['_id'] async for doc in self.collection.find({'$or': claimable}, {'_id': 1})]
+        if job_ids:
+            await self.collection.update_many({'_id': {'$in': job_ids}, 'status': 'failed'}, {'$set': {'status': 'pending', 'attempts': 0}})
+            await asyncio.gather(*[self.run_job(job_id) for job_id in job_ids])
+        return len(job_ids)
+
+    async def get_job(self, job_id: str):
+        job = await self.collection.find_one({'_id': self._object_id(job_id)})
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot job not found")
+        return self._to_response(job, SnapshotJobResponse)
+
+    async def get_jobs(self, ref_id: str, limit: int = DEFAULT_PAGE_SIZE):
+        jobs = await self.collection.find({'ref_id': ref_id}, self._projection(SnapshotJobResponse)).sort('_id', DESCENDING).limit(limit).to_list(limit)
+        return self._to_raw(jobs, class_name=SnapshotJobResponse)
+
+
+async def cancel_running():
+    for task in list(running):
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
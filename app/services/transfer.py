@@ -0,0 +1,273 @@
+import asyncio
+import csv
+import gzip
+import io
+import itertools
+import json
+import logging
+import os
+import time
+import zlib
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from app.models.authors import Author
+from app.models.books import Book
+from app.models.categories import Category
+from app.models.reviews import Review
+from app.models.users import User
+from app.responses import dumps
+from app.schemas.authors import CreateAuthor
+from app.schemas.books import BookCreate
+from app.schemas.categories import CreateCategory
+from app.schemas.reviews import WriteReview
+from app.schemas.users import ImportUser
+from app.credentials import passwords
+from app.services import BaseService, STREAM_BATCH_SIZE
+from app.services.books import BookService
+from app.services.recommendations import RecommendationService
+from app.services.reviews import ReviewService
+from app.services.rollups import RollupService
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+FORMATS = ('ndjson', 'csv')
+RESTORE_ORDER = ('authors', 'categories', 'users', 'books', 'reviews')
+SCHEMAS = {'authors': CreateAuthor, 'categories': CreateCategory, 'users': ImportUser, 'books': BookCreate,
+           'reviews': WriteReview}
+MODELS = {'authors': Author, 'categories': Category, 'users': User, 'books': Book, 'reviews': Review}
+SECRETS = {'users': ('password', 'password_hash')}
+LIST_FIELDS = {'authors': ('awards',)}
+
+
+def export_fields(collection: str, include_secrets: bool = False):
+    secrets = () if include_secrets else SECRETS.get(collection, ())
+    return ['id'] + [field for field in SCHEMAS[collection].model_fields if field not in secrets]
+
+
+def _export_row(collection: str, doc: dict, fields: list):
+    if collection == 'books':
+        doc['category_id'] = (doc.pop('category', None) or {}).get('id')
+    return {'id': str(doc.pop('_id')), **{field: doc.get(field) for field in fields[1:]}}
+
+
+async def export_rows(db: AsyncIOMotorDatabase, collection: str, include_secrets: bool = False,
+                      batch_size: int = STREAM_BATCH_SIZE):
+    fields = export_fields(collection, include_secrets)
+    projection = {field: 1 for field in fields[1:]}
+    if collection == 'books':
+        projection['category'] = 1
+    cursor = db[collection].find({}, projection).sort('_id', 1).batch_size(batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(_export_row(collection, doc, fields))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def encode(batches, fmt: str, fields: list):
+    if fmt == 'ndjson':
+        async for batch in batches:
+            yield b'\n'.join(dumps(row) for row in batch) + b'\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows({key: json.dumps(value) if isinstance(value, list) else value for key, value in row.items()}
+                         for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(db: AsyncIOMotorDatabase, collection: str, fmt: str, compress: bool, include_secrets: bool = False):
+    fields = export_fields(collection, include_secrets)
+    chunks = encode(export_rows(db, collection, include_secrets), fmt, fields)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def _open(path: str):
+    with open(path, 'rb') as probe:
+        compressed = probe.read(2) == b'\x1f\x8b'
+    return gzip.open(path, 'rt', newline='') if compressed else open(path, 'r', newline='')
+
+
+def _records(handle, fmt: str):
+    if fmt == 'csv':
+        for row in csv.DictReader(handle):
+            yield {key: value if value != '' else None for key, value in row.items()}
+        return
+    for line in handle:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _next_chunk(records, size: int):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            break
+    return chunk
+
+
+def _skip(records, count: int):
+    for _ in itertools.islice(records, count):
+        pass
+
+
+async def _hash_passwords(documents: list):
+    plain = [document for document in documents if not document['password_hash']]
+    for start in range(0, len(plain), passwords.max_waiting):
+        batch = plain[start:start + passwords.max_waiting]
+        hashes = await asyncio.gather(*(passwords.hash(document['password']) for document in batch))
+        for document, password_hash in zip(batch, hashes):
+            document['password_hash'] = password_hash
+
+
+def _list_field(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+async def _prepare(db: AsyncIOMotorDatabase, collection: str, chunk: list, first_line: int):
+    documents, rejected = [], []
+    for offset, item in enumerate(chunk):
+        try:
+            if not isinstance(item, dict):
+                raise TypeError
+            for field in LIST_FIELDS.get(collection, ()):
+                if item.get(field) is None:
+                    item.pop(field, None)
+                elif isinstance(item[field], str):
+                    item[field] = _list_field(item[field])
+            document = SCHEMAS[collection](**item).dict()
+            document['_id'] = ObjectId(item['id']) if item.get('id') else ObjectId()
+        except ValidationError as e:
+            rejected.append((first_line + offset, '; '.join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())))
+            continue
+        except (InvalidId, TypeError):
+            rejected.append((first_line + offset, "Record must be an object with a valid id"))
+            continue
+        documents.append((first_line + offset, document))
+    service = BookService(db) if collection == 'books' else BaseService(db)
+    if collection == 'books' and documents:
+        invalid = await service._resolve_references([document for _, document in documents])
+        rejected += [(documents[position][0], message) for position, (_, message) in invalid.items()]
+        documents = [(line, document) for position, (line, document) in enumerate(documents) if position not in invalid]
+    if collection == 'users':
+        await _hash_passwords([document for _, document in documents])
+    prepared = []
+    for _, document in documents:
+        record = MODELS[collection](**document).dict()
+        if collection == 'books':
+            record = service._with_search_terms(record)
+        prepared.append({'_id': document['_id'], **service._stamp(record)})
+    return prepared, rejected
+
+
+async def _insert(db: AsyncIOMotorDatabase, collection: str, documents: list):
+    if not documents:
+        return 0, 0
+    try:
+        result = await db[collection].insert_many(documents, ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as e:
+        errors = e.details['writeErrors']
+        duplicates = sum(1 for error in errors if error.get('code') == 11000)
+        for error in errors:
+            if error.get('code') != 11000:
+                logger.error(f"Import write error: {error.get('errmsg')}")
+            return e.details['nInserted'], duplicates
+
+
+async def _committed(service: BaseService, collection: str):
+    await service._changed(collection)
+    await service.cache.invalidate_prefix(f'{collection}:')
+
+
+def _load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as checkpoint:
+        return json.load(checkpoint)
+
+
+def _save_checkpoint(path: str, state: dict):
+    with open(f'{path}.tmp', 'w') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(f'{path}.tmp', path)
+
+
+async def import_file(db: AsyncIOMotorDatabase, collection: str, path: str, fmt: str = None,
+                      chunk_size: int = IMPORT_CHUNK_SIZE, checkpoint_path: str = None, restart: bool = False, report=print):
+    fmt = fmt or ('csv' if '.csv' in os.path.basename(path) else 'ndjson')
+    checkpoint_path = checkpoint_path or f'{path}.checkpoint'
+    state = {} if restart else _load_checkpoint(checkpoint_path)
+    if state and (state.get('collection') != collection or state.get('path') != os.path.abspath(path)):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to another import, pass --restart to ignore it")
+    state = state or {'collection': collection, 'path': os.path.abspath(path), 'records': 0,
+                      'inserted': 0, 'duplicates': 0, 'rejected': 0}
+    resumed_at = state['records']
+    started = time.perf_counter()
+    last_report = started
+    pending = None
+    service = BaseService(db)
+    with _open(path) as handle:
+        records = _records(handle, fmt)
+        if resumed_at:
+            await asyncio.to_thread(_skip, records, resumed_at)
+            report(f"Resuming {collection} import after record {resumed_at}")
+        while True:
+            chunk = await asyncio.to_thread(_next_chunk, records, chunk_size)
+            if pending:
+                size, task = pending
+                inserted, duplicates = await task
+                state['records'] += size
+                state['inserted'] += inserted
+                state['duplicates'] += duplicates
+                _save_checkpoint(checkpoint_path, state)
+                if inserted:
+                    await _committed(service, collection)
+                if time.perf_counter() - last_report >= 5:
+                    last_report = time.perf_counter()
+                    rate = (state['records'] - resumed_at) / (last_report - started)
+                    report(f"{state['records']} records, {state['inserted']} inserted, {rate:.0f} records/s")
+            if not chunk:
+                break
+            documents, rejected = await _prepare(db, collection, chunk, state['records'] + 1)
+            for line, error in rejected[:max(0, 10 - state['rejected'])]:
+                report(f"Record {line} rejected: {error}")
+            state['rejected'] += len(rejected)
+            pending = (len(chunk), asyncio.create_task(_insert(db, collection, documents)))
+    if collection == 'reviews' and state['inserted']:
+        await ReviewService(db).reconcile_book_ratings()
+    if state['inserted']:
+        await RollupService(db).rebuild()
+    if collection in ('reviews', 'users') and state['inserted']:
+        await RecommendationService(db).rebuild()
+    elapsed = time.perf_counter() - started
+    state['seconds'] = round(elapsed, 2)
+    state['records_per_second'] = round((state['records'] - resumed_at) / elapsed, 1) if elapsed else 0.0
+    _save_checkpoint(checkpoint_path, state)
+    return state
@@ -1,23 +1,67 @@
+import hmac
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel, ReturnDocument
 from fastapi import HTTPException, status
+from app.credentials import HasherBusy, passwords
 from app.models.users import User
-from app.schemas.users import CreateUser, UpdateUser, UserDetails
-from app.services import BaseService
+from app.schemas.users import CreateUser, LoginUser, UpdateUser, UserDetails
+from app.services import BaseService, DEFAULT_PAGE_SIZE
 
 
 class UserService(BaseService):
+    collection_name = 'users'
+    indexes = [IndexModel([('username', ASCENDING)], name='username_unique', unique=True),
+               IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+               IndexModel([('favorite_books', ASCENDING)], name='favorite_books')]
+    query_plans = [('get_user', {'_id': ObjectId()}, None),
+                   ('get_users', {'_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)])]
+    track_changes = True
     
     def __init__(self, db:AsyncIOMotorDatabase):
         super().__init__(db)
-        self.collection = db['users']
-    
+        self.collection = db[self.collection_name]
+        self.passwords = passwords
+
+    async def _hash(self, password: str):
+        try:
+            return await self.passwords.hash(password)
+        except HasherBusy as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={'Retry-After': '1'})
+
+    async def _check_password(self, user: dict, password: str):
+        try:
+            if not user:
+                return await self.passwords.verify_missing(password)
+            if user.get('password_hash'):
+                return await self.passwords.verify(password, user['password_hash'])
+        except HasherBusy as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={'Retry-After': '1'})
+        legacy = user.get('password')
+        return legacy is not None and hmac.compare_digest(legacy.encode(), password.encode())
+
+    async def _rehash(self, user: dict, password: str):
+        try:
+            password_hash = await self.passwords.hash(password)
+        except HasherBusy:
+            return
+        current = {'password_hash': user['password_hash']} if user.get('password_hash') else {'password': user.get('password')}
+        await self.collection.update_one({'_id': user['_id'], **current},
+                                         {'$set': {'password_hash': password_hash}, '$unset': {'password': ''}})
+
     async def create_user(self, user_data:CreateUser):
-        user = User(**user_data.dict())
-        result = await self.collection.insert_one(user.dict())
-        user = await self.collection.find_one({'_id':result.inserted_id})
-        return self._to_response(user,UserDetails)
+        data = user_data.dict()
+        user = User(password_hash=await self._hash(data.pop('password')), **data)
+        return await self._insert(user.dict(), UserDetails)
+
+    async def login(self, credentials: LoginUser):
+        user = await self.collection.find_one({'username': credentials.username})
+        if not await self._check_password(user, credentials.password):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid username or password")
+        if self.passwords.needs_rehash(user.get('password_hash')):
+            await self._rehash(user, credentials.password)
+        return self._to_response(user, UserDetails)
     
     async def get_user(self, user_id: str):
         try:
@@ -28,16 +72,16 @@ class UserService(BaseService):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         return self._to_response(user, UserDetails)
     
-    async def update_user(self, user_id: str, update_data: UpdateUser):
-        try:
-            result = await self.collection.update_one({'_id': ObjectId(user_id)},
-                                                      {'$set': update_data.dict(exclude_unset=True)})
-        except InvalidId:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ObjectId")
-        if result.matched_count == 0:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        user = await self.collection.find_one({'_id': ObjectId(user_id)})
-        return self._to_response(user, UserDetails)
+    async def get_user_version(self, user_id: str):
+        return await self._document_version(user_id, "User not found")
+
+    async def update_user(self, user_id: str, update_data: UpdateUser, version: int = None):
+        changes = update_data.dict(exclude_unset=True)
+        if changes.get('password') is None:
+            changes.pop('password', None)
+            return await self._update(user_id, changes, UserDetails, "User not found", version)
+        changes['password_hash'] = await self._hash(changes.pop('password'))
+        return await self._update(user_id, changes, UserDetails, "User not found", version, unset={'password': ''})
     
     async def delete_user(self, user_id: str):
         try:
@@ -46,7 +90,38 @@ class UserService(BaseService):
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         except InvalidId:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid UserID")
+        await self._changed()
+        await self._publish('delete', user_id)
         
-    async def get_users(self):
-        users = await self.collection.find().to_list(None)
-        return [self._to_response(user, UserDetails) for user in users]
+    async def _set_favorite(self, user_id: str, book_id: str, favorite: bool):
+        update = self._touch({'$addToSet' if favorite else '$pull': {'favorite_books': book_id}})
+        before = await self.collection.find_one_and_update({'_id': self._object_id(user_id)}, update,
+                                                           return_document=ReturnDocument.BEFORE)
+        if not before:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        favorites = before.get('favorite_books', [])
+        if favorite:
+            after = favorites if book_id in favorites else favorites + [book_id]
+        else:
+            after = [favorite_id for favorite_id in favorites if favorite_id != book_id]
+        doc = {**before, 'favorite_books': after, 'version': before.get('version', 0) + 1,
+               'updated_at': update['$set']['updated_at']}
+        if after != favorites:
+            await self._changed()
+            await self._publish('update', before['_id'], dict(doc), before, ['favorite_books'])
+        return self._to_response(doc, UserDetails)
+
+    async def add_favorite(self, user_id: str, book_id: str):
+        if not await self.db['books'].count_documents({'_id': self._object_id(book_id)}, limit=1):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+        return await self._set_favorite(user_id, book_id, True)
+
+    async def remove_favorite(self, user_id: str, book_id: str):
+        return await self._set_favorite(user_id, book_id, False)
+
+    async def get_users(self, limit: int = DEFAULT_PAGE_SIZE, after: str = None, fields: str = None):
+        return await self._paginate({}, limit, after, UserDetails, self._fields(UserDetails, fields))
+
+    def stream_users(self, fields: str = None):
+        return self._stream({}, UserDetails, fields=self._fields(UserDetails, fields))
+
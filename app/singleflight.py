@@ -0,0 +1,56 @@
+import asyncio
+import os
+from app.metrics import SINGLE_FLIGHT_CALLS, SINGLE_FLIGHT_COALESCED
+
+SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+
+
+def _kind(key: str):
+    return key.split(':', 1)[0]
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        self.enabled = enabled
+        self.flights = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.broken = 0
+
+    def _land(self, key: str, flight: asyncio.Future):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if not flight.cancelled():
+            flight.exception()
+
+    async def do(self, key: str, loader):
+        flight = self.flights.get(key) if self.enabled else None
+        if flight is None:
+            self.calls += 1
+            SINGLE_FLIGHT_CALLS.labels(_kind(key)).inc()
+            if not self.enabled:
+                return await loader()
+            flight = asyncio.ensure_future(loader())
+            self.flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.coalesced += 1
+            SINGLE_FLIGHT_COALESCED.labels(_kind(key)).inc()
+        return await asyncio.shield(flight)
+
+    def forget(self, *keys: str):
+        for key in keys:
+            if self.flights.pop(key, None) is not None:
+                self.broken += 1
+
+    def stats(self):
+        requests = self.calls + self.coalesced
+        return {'enabled': self.enabled,
+                'in_flight': len(self.flights),
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'coalesced_ratio': round(self.coalesced / requests, 4) if requests else 0.0,
+                'broken': self.broken}
+
+
+flights = SingleFlight()
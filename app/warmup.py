@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+import time
+from fastapi import FastAPI, HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.services.books import BookService
+from app.services.categories import CategoryService
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', 30))
+WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', 10))
+WARMUP_CACHE = os.getenv('WARMUP_CACHE', 'true').lower() == 'true'
+
+
+async def open_pool(db: AsyncIOMotorDatabase, connections: int = WARMUP_CONNECTIONS):
+    await asyncio.gather(*[db.command('ping') for _ in range(max(1, connections))])
+
+
+async def compile_schemas(app: FastAPI):
+    app.openapi()
+
+
+async def prime_caches(db: AsyncIOMotorDatabase):
+    await BookService(db).get_books()
+    try:
+        await CategoryService(db).get_categories()
+    except HTTPException:
+        pass
+
+
+class WarmUp:
+    def __init__(self, timeout: float = WARMUP_TIMEOUT):
+        self.timeout = timeout
+        self.started_at = None
+        self.finished_at = None
+        self.steps = {}
+        self.task = None
+
+    @property
+    def ready(self):
+        return self.finished_at is not None
+
+    async def _step(self, name: str, step):
+        started = time.perf_counter()
+        try:
+            await step()
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+        except Exception as e:
+            logger.error(f"Warm-up step '{name}' failed: {str(e)}")
+            self.steps[name] = 'failed'
+
+    async def _run(self, app: FastAPI, db: AsyncIOMotorDatabase):
+        await self._step('database', lambda: open_pool(db))
+        await self._step('schemas', lambda: compile_schemas(app))
+        if WARMUP_CACHE:
+            await self._step('cache', lambda: prime_caches(db))
+        self.finished_at = time.time()
+        logger.info(f"Worker {os.getpid()} warmed up in {self.finished_at - self.started_at:.2f}s: {self.steps}")
+
+    async def run(self, app: FastAPI, db: AsyncIOMotorDatabase):
+        self.started_at = time.time()
+        self.task = asyncio.create_task(self._run(app, db))
+        try:
+            await asyncio.wait_for(asyncio.shield(self.task), self.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Warm-up did not finish within {self.timeout}s, serving traffic while it completes")
+
+    async def stop(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+    def status(self):
+        return {'ready': self.ready, 'pid': os.getpid(), 'steps': self.steps,
+                'seconds': round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None}
+
+
+warmup = WarmUp()
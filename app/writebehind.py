@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import time
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.metrics import (REVIEW_ACTIVITY_FLUSH, REVIEW_ACTIVITY_LAG, REVIEW_ACTIVITY_PENDING,
+                         REVIEW_ACTIVITY_REJECTED, REVIEW_ACTIVITY_WRITTEN)
+
+logger = logging.getLogger(__name__)
+
+REVIEW_ACTIVITY_BATCH_SIZE = int(os.getenv('REVIEW_ACTIVITY_BATCH_SIZE', 500))
+REVIEW_ACTIVITY_FLUSH_MS = int(os.getenv('REVIEW_ACTIVITY_FLUSH_MS', 250))
+REVIEW_ACTIVITY_MAX_PENDING = int(os.getenv('REVIEW_ACTIVITY_MAX_PENDING', 50000))
+REVIEW_ACTIVITY_BLOCK_MS = int(os.getenv('REVIEW_ACTIVITY_BLOCK_MS', 1000))
+
+
+class BufferFull(Exception):
+    pass
+
+
+def activity_update(likes: int, comments: list):
+    update = {}
+    if likes:
+        update['$inc'] = {'review_details.likes': likes}
+    if comments:
+        update['$push'] = {'review_details.comments': {'$each': comments}}
+    return update
+
+
+class ReviewActivityBuffer:
+    def __init__(self, batch_size: int = REVIEW_ACTIVITY_BATCH_SIZE, interval: float = REVIEW_ACTIVITY_FLUSH_MS / 1000,
+                 max_pending: int = REVIEW_ACTIVITY_MAX_PENDING, block_timeout: float = REVIEW_ACTIVITY_BLOCK_MS / 1000):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self.pending = {}
+        self.size = 0
+        self.inflight_since = None
+        self.collection = None
+        self.task = None
+        self.wakeup = asyncio.Event()
+        self.space = asyncio.Condition()
+        self.flushing = asyncio.Lock()
+
+    @property
+    def running(self):
+        return self.task is not None
+
+    def _weight(self, entry: dict):
+        return bool(entry['likes']) + len(entry['comments'])
+
+    def lag(self):
+        started = [entry['since'] for entry in self.pending.values()]
+        if self.inflight_since is not None:
+            started.append(self.inflight_since)
+        return time.monotonic() - min(started) if started else 0.0
+
+    def pending_for(self, review_id: str):
+        entry = self.pending.get(review_id)
+        return (entry['likes'], list(entry['comments'])) if entry else (0, [])
+
+    async def add(self, review_id: str, likes: int = 0, comments: list = ()):
+        if not self.running:
+            return False
+        entry = self.pending.get(review_id)
+        grows = len(comments) + (bool(likes) and not (entry and entry['likes']))
+        if self.size + grows > self.max_pending:
+            self.wakeup.set()
+            try:
+                async with self.space:
+                    await asyncio.wait_for(self.space.wait_for(lambda: self.size + grows <= self.max_pending), self.block_timeout)
+            except asyncio.TimeoutError:
+                REVIEW_ACTIVITY_REJECTED.inc()
+                raise BufferFull(f"{self.size} review updates are waiting to be written")
+            entry = self.pending.get(review_id)
+        if entry is None:
+            entry = self.pending[review_id] = {'likes': 0, 'comments': [], 'since': time.monotonic()}
+        before = self._weight(entry)
+        entry['likes'] += likes
+        entry['comments'].extend(comments)
+        self.size += self._weight(entry) - before
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+        return True
+
+    async def flush(self):
+        async with self.flushing:
+            if not self.pending:
+                return 0
+            batch, self.pending = self.pending, {}
+            self.inflight_since = min(entry['since'] for entry in batch.values())
+            review_ids = list(batch)
+            operations = [UpdateOne({'_id': ObjectId(review_id)}, activity_update(batch[review_id]['likes'], batch[review_id]['comments']))
+                          for review_id in review_ids]
+            started = time.perf_counter()
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details['writeErrors']:
+                    logger.error(f"Dropped review activity for {review_ids[error['index']]}: {error.get('errmsg')}")
+            except PyMongoError as e:
+                logger.error(f"Review activity flush failed, retrying {len(batch)} reviews: {str(e)}")
+                self._requeue(batch)
+                return 0
+            finally:
+                self.inflight_since = None
+                REVIEW_ACTIVITY_FLUSH.observe(time.perf_counter() - started)
+            REVIEW_ACTIVITY_WRITTEN.labels('likes').inc(sum(entry['likes'] for entry in batch.values()))
+            REVIEW_ACTIVITY_WRITTEN.labels('comments').inc(sum(len(entry['comments']) for entry in batch.values()))
+            self.size -= sum(self._weight(entry) for entry in batch.values())
+            async with self.space:
+                self.space.notify_all()
+            return len(batch)
+
+    def _requeue(self, batch: dict):
+        for review_id, entry in batch.items():
+            newer = self.pending.get(review_id)
+            if newer:
+                entry['likes'] += newer['likes']
+                entry['comments'].extend(newer['comments'])
+            self.pending[review_id] = entry
+        self.size = sum(self._weight(entry) for entry in self.pending.values())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                logger.error(f"Review activity flush failed: {str(e)}")
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self.collection = db['reviews']
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        await self.flush()
+        if self.pending:
+            logger.error(f"Review activity for {len(self.pending)} reviews could not be written on shutdown")
+
+
+review_activity = ReviewActivityBuffer()
+REVIEW_ACTIVITY_PENDING.set_function(lambda: review_activity.size)
+REVIEW_ACTIVITY_LAG.set_function(review_activity.lag)
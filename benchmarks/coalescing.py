@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+os.environ.setdefault('RATE_LIMIT_RATE', '0')
+os.environ.setdefault('CONCURRENCY_LIMIT', '0')
+
+from app.cache import cache
+from app.database import connect_to_mongo, close_mongo_connection, mongo
+from app.main import app
+from app.metrics import MONGO_LATENCY
+from app.services.books import BookService
+from app.services.indexes import ensure_indexes
+from app.services.reviews import ReviewService
+from app.singleflight import flights
+
+
+def find_commands(collection: str):
+    return sum(sample.value for metric in MONGO_LATENCY.collect() for sample in metric.samples
+               if sample.name.endswith('_count') and sample.labels['command'] == 'find' and sample.labels['collection'] == collection)
+
+
+async def setup(db, reviews: int):
+    stamp = f'{time.time_ns()}'
+    book = await db['books'].insert_one({'title': 'Hot Book', 'author': 'Hot Author', 'isbn': f'coalescing-{stamp}',
+                                         'publisher': 'Bench House', 'year_published': 2000, 'copies_available': 1,
+                                         'rating_sum': 4 * reviews, 'total_reviews': reviews, 'version': 1})
+    book_id = str(book.inserted_id)
+    await db['reviews'].insert_many([{'book_id': book_id, 'content': f'Review {n}', 'rating': 4} for n in range(reviews)])
+    return book_id
+
+
+async def measure(name: str, collection: str, fake: bool, requests):
+    await cache.invalidate_prefix('books:')
+    calls, coalesced, commands = flights.calls, flights.coalesced, find_commands(collection)
+    started = time.perf_counter()
+    results = await asyncio.gather(*requests, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    queries = flights.calls - calls if fake else find_commands(collection) - commands
+    failed = sum(1 for result in results if isinstance(result, Exception) or getattr(result, 'status_code', 200) != 200)
+    print(f"{len(results)} x {name}: {queries:.0f} {'loads' if fake else collection + ' queries'}, "
+          f"{flights.coalesced - coalesced} coalesced, {failed} failed in {elapsed * 1000:.1f} ms")
+    return queries
+
+
+async def coalescing(args):
+    flights.enabled = not args.disabled
+    if args.fake:
+        from benchmarks.fake import fake_database
+        mongo.db = fake_database('bookshelf_benchmark')
+        mongo.client = mongo.db.client
+    else:
+        await connect_to_mongo()
+        await ensure_indexes(mongo.db)
+    try:
+        book_id = await setup(mongo.db, args.reviews)
+        queries = [await measure('BookService.get_book', 'books', args.fake,
+                                 [BookService(mongo.db).get_book(book_id) for _ in range(args.concurrency)]),
+                   await measure('ReviewService.get_reviews', 'reviews', args.fake,
+                                 [ReviewService(mongo.db).get_reviews(book_id) for _ in range(args.concurrency)])]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as client:
+            await measure(f'GET /books/{book_id}', 'books', args.fake,
+                          [client.get(f'/books/{book_id}') for _ in range(args.concurrency)])
+            await measure('GET /get_reviews', 'reviews', args.fake,
+                          [client.get('/get_reviews', params={'book_id': book_id}) for _ in range(args.concurrency)])
+    finally:
+        if args.fake:
+            mongo.client, mongo.db = None, None
+        else:
+            await close_mongo_connection()
+    print(f"single flight {'disabled' if args.disabled else 'enabled'}: {flights.stats()}")
+    return 1 if not args.disabled and max(queries) > 1 else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.coalescing',
+                                     description='Fire identical concurrent reads and count the queries that reach MongoDB')
+    parser.add_argument('--fake', action='store_true', help='Use an in-memory fake and count loads instead of MongoDB commands')
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--reviews', type=int, default=50)
+    parser.add_argument('--disabled', action='store_true', help='Turn single flight off to compare against the baseline')
+    args = parser.parse_args(argv)
+    return asyncio.run(coalescing(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
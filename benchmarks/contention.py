@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+
+from app.database import connect_to_mongo, close_mongo_connection, mongo
+from app.services.books import BookService
+from app.services.indexes import ensure_indexes
+from app.services.inventory import InventoryService
+
+
+async def setup(db, copies: int):
+    stamp = f'{time.time_ns()}'
+    book = await db['books'].insert_one({'title': 'Contended Book', 'author': 'Hot Author', 'isbn': f'contention-{stamp}',
+                                         'publisher': 'Bench House', 'year_published': 2000, 'copies_available': copies,
+                                         'rating_sum': 0, 'total_reviews': 0})
+    stores = await db['bookstores'].insert_many([{'name': f'Contention Store {n}', 'location': stamp} for n in range(2)])
+    book_id, store_ids = str(book.inserted_id), [str(store_id) for store_id in stores.inserted_ids]
+    await InventoryService(db).receive(store_ids[0], book_id, copies)
+    return book_id, store_ids
+
+
+async def hammer_stock(db, book_id: str, store_id: str, workers: int, operations: int, seed: int):
+    counts = {'reserved': 0, 'released': 0, 'checked_out': 0, 'rejected': 0}
+
+    async def worker(rng: random.Random):
+        service = InventoryService(db)
+        for _ in range(operations):
+            try:
+                await service.reserve(store_id, book_id, 1)
+                counts['reserved'] += 1
+            except HTTPException:
+                counts['rejected'] += 1
+                continue
+            await asyncio.sleep(0)
+            if rng.random() < 0.5:
+                await service.release(store_id, book_id, 1)
+                counts['released'] += 1
+            else:
+                await service.checkout(store_id, book_id, 1)
+                counts['checked_out'] += 1
+
+    await asyncio.gather(*[worker(random.Random(seed + n)) for n in range(workers)])
+    return counts
+
+
+async def hammer_copies(db, book_id: str, workers: int, operations: int):
+    taken = 0
+
+    async def worker():
+        nonlocal taken
+        service = BookService(db)
+        for _ in range(operations):
+            try:
+                await service.adjust_copies(book_id, -1)
+                taken += 1
+            except HTTPException:
+                pass
+
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    return taken
+
+
+async def hammer_moves(db, book_id: str, store_ids: list, workers: int, operations: int):
+    moved = 0
+
+    async def worker(n: int):
+        nonlocal moved
+        service = InventoryService(db)
+        source, target = store_ids if n % 2 == 0 else reversed(store_ids)
+        for _ in range(operations):
+            result = await service.move_stock([{'book_id': book_id, 'from_bookstore_id': source,
+                                                'to_bookstore_id': target, 'quantity': 1}])
+            moved += result.succeeded
+
+    await asyncio.gather(*[worker(n) for n in range(workers)])
+    return moved
+
+
+async def contention(args):
+    if args.fake:
+        from benchmarks.fake import fake_database
+        mongo.db = fake_database('bookshelf_contention')
+        mongo.client = mongo.db.client
+    else:
+        await connect_to_mongo()
+        await ensure_indexes(mongo.db)
+    failures = []
+    try:
+        book_id, store_ids = await setup(mongo.db, args.copies)
+        started = time.perf_counter()
+        counts = await hammer_stock(mongo.db, book_id, store_ids[0], args.workers, args.operations, args.seed)
+        stock = await mongo.db['stock'].find_one({'bookstore_id': store_ids[0], 'book_id': book_id})
+        print(f"stock:  {counts} in {time.perf_counter() - started:.2f}s -> "
+              f"available {stock['available']}, reserved {stock['reserved']}, checked out {stock['checked_out']}")
+        if stock['checked_out'] != counts['checked_out'] or stock['reserved'] != 0:
+            failures.append('stock counters drifted from the operations that succeeded')
+        if stock['available'] + stock['checked_out'] != args.copies:
+            failures.append('stock copies were created or lost')
+
+        await InventoryService(mongo.db).receive(store_ids[0], book_id, args.copies)
+        before = stock['available'] + args.copies
+        started = time.perf_counter()
+        moved = await hammer_moves(mongo.db, book_id, store_ids, args.workers, args.operations)
+        totals = [doc['available'] async for doc in mongo.db['stock'].find({'book_id': book_id})]
+        print(f"moves:  {moved} moved in {time.perf_counter() - started:.2f}s -> available per store {totals}")
+        if sum(totals) != before or min(totals) < 0:
+            failures.append('stock moves created, lost or overdrew copies')
+
+        started = time.perf_counter()
+        taken = await hammer_copies(mongo.db, book_id, args.workers, args.operations)
+        book = await mongo.db['books'].find_one({'_id': ObjectId(book_id)})
+        print(f"copies: {taken} taken in {time.perf_counter() - started:.2f}s -> copies_available {book['copies_available']}")
+        if book['copies_available'] != args.copies - taken or book['copies_available'] < 0:
+            failures.append('copies_available drifted from the decrements that succeeded')
+    finally:
+        if args.fake:
+            mongo.client, mongo.db = None, None
+        else:
+            await close_mongo_connection()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.contention',
+                                     description='Hammer one hot title from many coroutines and check the inventory counts stay exact')
+    parser.add_argument('--fake', action='store_true', help='Use an in-memory Motor-compatible fake instead of MONGO_URL')
+    parser.add_argument('--copies', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=200)
+    parser.add_argument('--operations', type=int, default=20, help='Operations per worker')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+    return asyncio.run(contention(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
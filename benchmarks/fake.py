@@ -0,0 +1,40 @@
+import contextlib
+import inspect
+import mongomock.collection
+from mongomock_motor import AsyncMongoMockClient
+from app import main
+from app.database import mongo
+
+
+def _without_sort(method):
+    def call(self, *args, sort=None, **kwargs):
+        return method(self, *args, **kwargs)
+    return call
+
+
+# pymongo 4.9+ hands sort= to bulk update and replace operations, which mongomock does not accept yet
+for _name in ('add_update', 'add_replace'):
+    _method = getattr(mongomock.collection.BulkOperationBuilder, _name)
+    if 'sort' not in inspect.signature(_method).parameters:
+        setattr(mongomock.collection.BulkOperationBuilder, _name, _without_sort(_method))
+
+
+def fake_database(name: str):
+    return AsyncMongoMockClient()[name]
+
+
+@contextlib.asynccontextmanager
+async def fake_lifespan(app, db):
+    async def connect():
+        mongo.client, mongo.db = db.client, db
+
+    async def close():
+        mongo.client, mongo.db = None, None
+
+    connect_to_mongo, close_mongo_connection = main.connect_to_mongo, main.close_mongo_connection
+    main.connect_to_mongo, main.close_mongo_connection = connect, close
+    try:
+        async with app.router.lifespan_context(app):
+            yield
+    finally:
+        main.connect_to_mongo, main.close_mongo_connection = connect_to_mongo, close_mongo_connection
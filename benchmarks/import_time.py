@@ -0,0 +1,47 @@
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$')
+
+
+def cold_import(module: str):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)) / 1000, int(match.group(2)) / 1000)
+    return modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.import_time',
+                                     description='Measure how long a fresh worker takes to import the app')
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Show the slowest application modules')
+    parser.add_argument('--budget-ms', type=float, default=1500.0, help='Exit non-zero if the median import exceeds this')
+    args = parser.parse_args(argv)
+
+    runs = [cold_import(args.module) for _ in range(args.runs)]
+    totals = [modules[args.module][1] for modules in runs]
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.1f} ms, min {min(totals):.1f} ms, max {max(totals):.1f} ms over {args.runs} runs")
+
+    own = {name: statistics.median(modules[name][0] for modules in runs if name in modules)
+           for name in runs[0] if name.split('.')[0] in ('app', args.module.split('.')[0])}
+    print(f"{'self ms':>9}  module")
+    for name, self_ms in sorted(own.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_ms:>9.1f}  {name}")
+    if median > args.budget_ms:
+        print(f"import time {median:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import httpx
+
+os.environ.setdefault('RATE_LIMIT_RATE', '0')
+os.environ.setdefault('CONCURRENCY_LIMIT', '0')
+
+from app.database import connect_to_mongo, close_mongo_connection, mongo
+from app.main import app
+from benchmarks.seed import seed
+
+TEXT_SEARCH_SCENARIOS = ('GET /search/books',)
+
+ALLOC_SAMPLES = 50
+
+
+def scenarios(ids: dict):
+    rng = random.Random(7)
+    book = lambda: rng.choice(ids['books'])
+    return {
+        'GET /books': lambda: ('GET', '/books', {'params': {'limit': 100}}),
+        'GET /books/{book_id}': lambda: ('GET', f'/books/{book()}', {}),
+        'PUT /books/{book_id}': lambda: ('PUT', f'/books/{book()}', {'json': {'copies_available': rng.randint(0, 20)}}),
+        'POST /books': lambda: ('POST', '/books', {'json': {'title': 'Benchmark Book', 'author': 'Bench Author',
+                                                            'isbn': f'bench-{rng.getrandbits(64)}', 'publisher': 'Bench House',
+                                                            'year_published': 2000, 'copies_available': 1}}),
+        'GET /get_users': lambda: ('GET', '/get_users', {'params': {'limit': 100}}),
+        'GET /get_user': lambda: ('GET', '/get_user', {'params': {'user_id': rng.choice(ids['users'])}}),
+        'GET /get_reviews': lambda: ('GET', '/get_reviews', {'params': {'book_id': rng.choice(ids['reviewed_books'])}}),
+        'GET /get_reviews/batch': lambda: ('GET', '/get_reviews/batch', {'params': {'book_ids': rng.choices(ids['reviewed_books'], k=20),
+                                                                                     'per_book': 5, 'order': 'rating'}}),
+        'POST /write_review': lambda: ('POST', '/write_review', {'json': {'book_id': book(), 'content': 'benchmark review',
+                                                                          'rating': rng.randint(1, 5)}}),
+        'GET /get_categories': lambda: ('GET', '/get_categories', {}),
+        'GET /bookstores': lambda: ('GET', '/bookstores', {'params': {'limit': 100}}),
+        'GET /search/books': lambda: ('GET', '/search/books', {'params': {'q': rng.choice(['shadow', 'river', 'golden crown'])}}),
+        'GET /search/books/suggest': lambda: ('GET', '/search/books/suggest', {'params': {'prefix': rng.choice(['sha', 'river g', 'golden c'])}}),
+    }
+
+
+async def drive(client: httpx.AsyncClient, make_request, requests: int, concurrency: int):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, url, kwargs = make_request()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+async def allocations(client: httpx.AsyncClient, make_request):
+    peaks = []
+    tracemalloc.start()
+    for _ in range(ALLOC_SAMPLES):
+        method, url, kwargs = make_request()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await client.request(method, url, **kwargs)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return statistics.mean(peaks) / 1024
+
+
+def percentile(values: list, fraction: float):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def sample_ids(db):
+    books = [str(doc['_id']) async for doc in db['books'].find({}, {'_id': 1}).limit(10000)]
+    users = [str(doc['_id']) async for doc in db['users'].find({}, {'_id': 1}).limit(10000)]
+    reviewed = [doc['book_id'] async for doc in db['reviews'].find({}, {'book_id': 1}).limit(10000)]
+    return {'books': books, 'users': users, 'reviewed_books': reviewed or books}
+
+
+async def benchmark(args):
+    if args.fake:
+        from benchmarks.fake import fake_database, fake_lifespan
+        db = fake_database('bookshelf_benchmark')
+        serving = fake_lifespan(app, db)
+    else:
+        await connect_to_mongo()
+        db = mongo.db
+        serving = app.router.lifespan_context(app)
+    try:
+        if args.seed:
+            await seed(db, args.books, args.reviews, args.users, args.categories)
+        ids = await sample_ids(db)
+    finally:
+        if not args.fake:
+            await close_mongo_connection()
+    selected = scenarios(ids)
+    if args.endpoints:
+        selected = {name: selected[name] for name in args.endpoints}
+    if args.fake:
+        skipped = [name for name in TEXT_SEARCH_SCENARIOS if name in selected]
+        selected = {name: make_request for name, make_request in selected.items() if name not in skipped}
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: the in-memory fake has no $text support")
+    results = {}
+    async with serving:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            for name, make_request in selected.items():
+                for _ in range(args.warmup):
+                    method, url, kwargs = make_request()
+                    await client.request(method, url, **kwargs)
+                latencies, errors, elapsed = await drive(client, make_request, args.requests, args.concurrency)
+                latencies.sort()
+                results[name] = {'requests': len(latencies),
+                                 'errors': errors,
+                                 'rps': round(len(latencies) / elapsed, 1),
+                                 'p50_ms': round(percentile(latencies, 0.50), 3),
+                                 'p95_ms': round(percentile(latencies, 0.95), 3),
+                                 'p99_ms': round(percentile(latencies, 0.99), 3),
+                                 'alloc_peak_kb': round(await allocations(client, make_request), 1)}
+                print(f"{name:<24} {results[name]['rps']:>9} req/s  p50 {results[name]['p50_ms']:>8} ms  "
+                      f"p95 {results[name]['p95_ms']:>8} ms  p99 {results[name]['p99_ms']:>8} ms  "
+                      f"alloc {results[name]['alloc_peak_kb']:>8} KiB  errors {errors}")
+    return {'meta': {'started_at': datetime.now(timezone.utc).isoformat(),
+                     'python': platform.python_version(),
+                     'backend': 'fake' if args.fake else 'mongod',
+                     'dataset': {'books': args.books, 'reviews': args.reviews, 'users': args.users,
+                                 'categories': args.categories, 'seeded': args.seed},
+                     'concurrency': args.concurrency,
+                     'requests': args.requests},
+            'endpoints': results}
+
+
+def compare(baseline_path: str, current_path: str, threshold: float):
+    with open(baseline_path) as baseline_file, open(current_path) as current_file:
+        baseline = json.load(baseline_file)['endpoints']
+        current = json.load(current_file)['endpoints']
+    regressions = 0
+    print(f"{'endpoint':<24} {'rps':>18} {'p95 ms':>20} {'p99 ms':>20}")
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name], current[name]
+        change = (after['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        flag = '  REGRESSION' if change > threshold else ''
+        regressions += bool(flag)
+        print(f"{name:<24} {before['rps']:>8} -> {after['rps']:<8} {before['p95_ms']:>8} -> {after['p95_ms']:<9}"
+              f" {before['p99_ms']:>8} -> {after['p99_ms']:<9}{flag}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Benchmark every router against a seeded database')
+    parser.add_argument('--fake', action='store_true', help='Use an in-memory Motor-compatible fake instead of MONGO_URL')
+    parser.add_argument('--no-seed', dest='seed', action='store_false', help='Reuse the data already in the database')
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--endpoints', nargs='*', help='Only run these scenarios, e.g. "GET /books"')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='Diff two result files and exit')
+    parser.add_argument('--threshold', type=float, default=10.0, help='p95 increase in percent that counts as a regression')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+    report = asyncio.run(benchmark(args))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import random
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.credentials import hash_password
+from app.services.books import BookService
+
+SEED_BATCH_SIZE = 10000
+WORDS = ['shadow', 'river', 'garden', 'silent', 'empire', 'winter', 'stone', 'glass', 'night', 'crown',
+         'ocean', 'forest', 'golden', 'broken', 'last', 'secret', 'city', 'fire', 'dream', 'storm']
+
+
+async def _insert(collection, docs):
+    for start in range(0, len(docs), SEED_BATCH_SIZE):
+        await collection.insert_many(docs[start:start + SEED_BATCH_SIZE], ordered=False)
+
+
+async def seed(db: AsyncIOMotorDatabase, books: int, reviews: int, users: int, categories: int, seed_value: int = 42):
+    rng = random.Random(seed_value)
+    for name in ('books', 'reviews', 'users', 'categories'):
+        await db[name].drop()
+
+    book_ids = [ObjectId() for _ in range(books)]
+    rating_sum = [0] * books
+    total_reviews = [0] * books
+    batch = []
+    for _ in range(reviews):
+        index = min(int(rng.paretovariate(1.2)) - 1, books - 1)
+        rating = rng.randint(1, 5)
+        rating_sum[index] += rating
+        total_reviews[index] += 1
+        batch.append({'book_id': str(book_ids[index]), 'rating': rating,
+                      'content': ' '.join(rng.choices(WORDS, k=rng.randint(20, 120)))})
+        if len(batch) >= SEED_BATCH_SIZE:
+            await _insert(db['reviews'], batch)
+            batch = []
+    await _insert(db['reviews'], batch)
+
+    books_service = BookService(db)
+    batch = []
+    for index, book_id in enumerate(book_ids):
+        title = ' '.join(rng.choices(WORDS, k=3)).title()
+        author = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}"
+        batch.append({'_id': book_id, 'title': title, 'author': author, 'isbn': f'{index:013d}',
+                      'publisher': f"{rng.choice(WORDS).title()} House", 'year_published': rng.randint(1800, 2024),
+                      'copies_available': rng.randint(0, 20), 'rating_sum': rating_sum[index],
+                      'total_reviews': total_reviews[index]})
+        books_service._with_search_terms(batch[-1])
+        if len(batch) >= SEED_BATCH_SIZE:
+            await _insert(db['books'], batch)
+            batch = []
+    await _insert(db['books'], batch)
+
+    password_hash = hash_password('benchmark')
+    await _insert(db['users'], [{'username': f'user{index}', 'email': f'user{index}@example.com',
+                                 'full_name': f'User {index}', 'password_hash': password_hash} for index in range(users)])
+    await _insert(db['categories'], [{'name': f'category-{index}'} for index in range(categories)])
+    return book_ids
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+os.environ.setdefault('RATE_LIMIT_RATE', '0')
+os.environ.setdefault('CONCURRENCY_LIMIT', '0')
+
+from app.credentials import passwords
+from app.database import connect_to_mongo, close_mongo_connection, mongo
+from app.main import app
+from app.services.indexes import ensure_indexes
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(lags: list, stopped: asyncio.Event):
+    while not stopped.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def burst(client: httpx.AsyncClient, signups: int, stamp: str):
+    statuses = {}
+
+    async def signup(index: int):
+        response = await client.post('/create_user', json={'username': f'signup-{stamp}-{index}', 'email': f'signup-{stamp}-{index}@example.com',
+                                                           'full_name': f'Signup {index}', 'password': f'password-{index}'})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*[signup(index) for index in range(signups)])
+    return statuses
+
+
+def summary(lags: list):
+    lags = sorted(lags)
+    return {'p50': statistics.median(lags), 'p99': lags[min(len(lags) - 1, int(len(lags) * 0.99))], 'max': lags[-1]}
+
+
+async def signups(args):
+    if args.inline:
+        passwords.workers = 0
+    if args.fake:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo.client = AsyncMongoMockClient()
+        mongo.db = mongo.client['bookshelf_benchmark']
+    else:
+        await connect_to_mongo()
+        await ensure_indexes(mongo.db)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as client:
+            idle, stopped = [], asyncio.Event()
+            prober = asyncio.create_task(probe(idle, stopped))
+            await asyncio.sleep(args.idle)
+            stopped.set()
+            await prober
+
+            loaded, stopped = [], asyncio.Event()
+            prober = asyncio.create_task(probe(loaded, stopped))
+            started = time.perf_counter()
+            statuses = await burst(client, args.signups, f'{time.time_ns()}')
+            elapsed = time.perf_counter() - started
+            stopped.set()
+            await prober
+    finally:
+        passwords.close()
+        if args.fake:
+            mongo.client, mongo.db = None, None
+        else:
+            await close_mongo_connection()
+
+    mode = 'inline' if args.inline else f'{passwords.workers} workers'
+    print(f"{args.signups} sign-ups ({mode}, scrypt n={passwords.n}) in {elapsed:.2f}s -> "
+          f"{args.signups / elapsed:.1f}/s, statuses {statuses}")
+    for name, lags in (('idle', idle), ('burst', loaded)):
+        lag = summary(lags)
+        print(f"event loop lag {name:<6} p50 {lag['p50']:>8.2f} ms  p99 {lag['p99']:>8.2f} ms  max {lag['max']:>8.2f} ms")
+    return 1 if summary(loaded)['p99'] > args.max_lag_ms else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.signups',
+                                     description='Measure event loop lag while a burst of sign-ups hashes passwords')
+    parser.add_argument('--fake', action='store_true', help='Use an in-memory Motor-compatible fake instead of MONGO_URL')
+    parser.add_argument('--signups', type=int, default=200)
+    parser.add_argument('--idle', type=float, default=1.0, help='Seconds of idle probing for the baseline')
+    parser.add_argument('--inline', action='store_true', help='Hash on the event loop to compare against the worker pool')
+    parser.add_argument('--max-lag-ms', type=float, default=50.0, help='Exit non-zero if p99 lag during the burst exceeds this')
+    args = parser.parse_args(argv)
+    return asyncio.run(signups(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
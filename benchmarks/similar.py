@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+os.environ.setdefault('RATE_LIMIT_RATE', '0')
+os.environ.setdefault('CONCURRENCY_LIMIT', '0')
+
+from app.database import connect_to_mongo, close_mongo_connection, mongo
+from app.main import app
+from app.services.indexes import ensure_indexes
+from app.services.recommendations import RecommendationService, cosine_python, similarity_engine
+
+
+async def setup(db, args):
+    stamp = f'{time.time_ns()}'
+    books = await db['books'].insert_many([{'title': f'Similar {n}', 'author': f'Author {n % 50}', 'isbn': f'similar-{stamp}-{n}',
+                                            'publisher': 'Bench House', 'year_published': 2000, 'copies_available': 1,
+                                            'rating_sum': 0, 'total_reviews': 0, 'version': 1} for n in range(args.books)])
+    book_ids = [str(book_id) for book_id in books.inserted_ids]
+    popularity = [1 / (rank + 1) for rank in range(len(book_ids))]
+    users, reviews = [], []
+    for n in range(args.users):
+        liked = {*random.choices(book_ids, weights=popularity, k=args.likes)}
+        favorites = list(liked)[:len(liked) // 2]
+        users.append({'username': f'similar-{stamp}-{n}', 'email': f'similar-{stamp}-{n}@example.com', 'full_name': f'Reader {n}',
+                      'password_hash': 'x', 'favorite_books': favorites, 'total_reviews': 0, 'version': 1})
+        reviews.extend({'book_id': book_id, 'content': 'Liked it', 'rating': 5, 'index': n} for book_id in liked - set(favorites))
+    user_ids = [str(user_id) for user_id in (await db['users'].insert_many(users)).inserted_ids]
+    for review in reviews:
+        review['user_id'] = user_ids[review.pop('index')]
+    if reviews:
+        await db['reviews'].insert_many(reviews)
+    return book_ids, user_ids
+
+
+def timed(name: str, cosine, baskets: dict, args):
+    started = time.perf_counter()
+    likes, rows = cosine(baskets, args.top_k, args.max_user_books)
+    print(f"{name:<7} cosine over {len(baskets)} users and {len(likes)} books in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return rows
+
+
+def percentiles(timings: list):
+    timings = sorted(timings)
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+async def similar(args):
+    random.seed(args.seed)
+    if args.fake:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo.client = AsyncMongoMockClient()
+        mongo.db = mongo.client['bookshelf_benchmark']
+    else:
+        await connect_to_mongo()
+        await ensure_indexes(mongo.db)
+    try:
+        book_ids, user_ids = await setup(mongo.db, args)
+        service = RecommendationService(mongo.db, top_k=args.top_k)
+        service.max_user_books = args.max_user_books
+        baskets = await service._baskets()
+        engine, cosine = similarity_engine()
+        rows = timed('python', cosine_python, baskets, args)
+        if engine != 'python' and timed(engine, cosine, baskets, args) != rows:
+            print(f"{engine} and python rows differ")
+        started = time.perf_counter()
+        result = await service.rebuild()
+        print(f"rebuild {result} in {time.perf_counter() - started:.2f}s")
+
+        timings = {'similar': [], 'recommendations': []}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as client:
+            for _ in range(args.requests):
+                for name, path, params in (('similar', f'/books/{random.choice(book_ids)}/similar', {}),
+                                           ('recommendations', '/get_recommendations', {'user_id': random.choice(user_ids)})):
+                    started = time.perf_counter()
+                    response = await client.get(path, params=params)
+                    timings[name].append((time.perf_counter() - started) * 1000)
+                    response.raise_for_status()
+    finally:
+        if args.fake:
+            mongo.client, mongo.db = None, None
+        else:
+            await close_mongo_connection()
+
+    for name, values in timings.items():
+        p50, p95 = percentiles(values)
+        print(f"GET {name:<16} p50 {p50:>7.2f} ms  p95 {p95:>7.2f} ms over {len(values)} requests")
+    return 1 if percentiles(timings['similar'])[1] > args.budget_ms else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.similar',
+                                     description='Build book similarities from synthetic likes and time the read endpoints')
+    parser.add_argument('--fake', action='store_true', help='Use an in-memory Motor-compatible fake instead of MONGO_URL')
+    parser.add_argument('--books', type=int, default=500)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--likes', type=int, default=10, help='Books liked per user, drawn with a long-tail popularity')
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--max-user-books', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=25.0, help='Exit non-zero if the similar books p95 exceeds this')
+    args = parser.parse_args(argv)
+    return asyncio.run(similar(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
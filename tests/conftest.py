@@ -0,0 +1,58 @@
+import os
+import httpx
+import pytest
+from app.cache import Cache, MemoryBackend
+
+TEST_MONGO_URL = os.getenv('TEST_MONGO_URL')
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+def db():
+    pytest.importorskip('mongomock_motor')
+    from benchmarks.fake import fake_database
+    return fake_database('bookshelf_test')
+
+
+@pytest.fixture
+async def mongod_db():
+    if not TEST_MONGO_URL:
+        pytest.skip('TEST_MONGO_URL is not set')
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.metrics import CommandTimer
+    from app.services.indexes import ensure_indexes
+    client = AsyncIOMotorClient(TEST_MONGO_URL, event_listeners=[CommandTimer()])
+    await client.drop_database('bookshelf_test')
+    await ensure_indexes(client['bookshelf_test'])
+    yield client['bookshelf_test']
+    await client.drop_database('bookshelf_test')
+    client.close()
+
+
+@pytest.fixture(params=['db', 'mongod_db'])
+def any_db(request):
+    return request.getfixturevalue(request.param)
+
+
+def app_client(monkeypatch, database):
+    from app.database import mongo
+    from app.main import app
+    monkeypatch.setattr(mongo, 'db', database)
+    monkeypatch.setattr('app.services.cache', Cache(MemoryBackend()))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+@pytest.fixture
+async def client(monkeypatch, db):
+    async with app_client(monkeypatch, db) as client:
+        yield client
+
+
+@pytest.fixture
+async def mongod_client(monkeypatch, mongod_db):
+    async with app_client(monkeypatch, mongod_db) as client:
+        yield client
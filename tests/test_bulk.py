@@ -0,0 +1,26 @@
+import pytest
+from bson import ObjectId
+from app.services.books import BookService
+
+pytestmark = pytest.mark.anyio
+
+BOOK = {'author': 'F. Scott Fitzgerald', 'publisher': "Charles Scribner's Sons", 'year_published': 1925,
+        'copies_available': 5, 'total_reviews': 0, 'rating_sum': 0, 'version': 1}
+
+
+async def test_bulk_delete_reports_each_id_once_removed(db):
+    result = await db['books'].insert_many([{**BOOK, 'title': f'Book {n}', 'isbn': f'{n:013d}'} for n in range(2)])
+    first, second = (str(book_id) for book_id in result.inserted_ids)
+    missing = str(ObjectId())
+    service = BookService(db)
+    published = []
+
+    async def publish(operation, doc_id, **kwargs):
+        published.append((operation, str(doc_id)))
+    service._publish = publish
+
+    outcome = await service.bulk_delete([first, first, missing, 'nope', second])
+    assert [item.status for item in outcome.results] == ['deleted', 'deleted', 'not_found', 'invalid', 'deleted']
+    assert outcome.succeeded == 3 and outcome.failed == 2
+    assert sorted(published) == sorted([('delete', first), ('delete', second)])
+    assert await db['books'].count_documents({}) == 0
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from app.cache import MISSING, Cache, MemoryBackend, RedisBackend
+
+pytestmark = pytest.mark.anyio
+
+
+async def slow_load(started: asyncio.Event, release: asyncio.Event, value):
+    started.set()
+    await release.wait()
+    return value
+
+
+async def load_while(cache: Cache, key: str, invalidate):
+    started, release = asyncio.Event(), asyncio.Event()
+    load = asyncio.create_task(cache.get_or_load(key, lambda: slow_load(started, release, 'loaded')))
+    await started.wait()
+    await invalidate()
+    release.set()
+    assert await load == 'loaded'
+    return await cache.backend.get(key)
+
+
+async def test_unrelated_invalidation_keeps_in_flight_load():
+    cache = Cache(MemoryBackend())
+    assert await load_while(cache, 'books:1', lambda: cache.invalidate('books:2')) == 'loaded'
+    assert await load_while(cache, 'categories:all', lambda: cache.invalidate_prefix('books:')) == 'loaded'
+
+
+async def test_invalidation_discards_in_flight_load():
+    cache = Cache(MemoryBackend())
+    assert await load_while(cache, 'books:1', lambda: cache.invalidate('books:1')) is MISSING
+    assert await load_while(cache, 'books:list:10', lambda: cache.invalidate_prefix('books:list:')) is MISSING
+    assert cache.loading == {}
+
+
+async def test_redis_backend():
+    fakeredis = pytest.importorskip('fakeredis')
+    cache = Cache(RedisBackend(client=fakeredis.FakeAsyncRedis()), ttl=30)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {'id': '1', 'title': 'Dune'}
+
+    assert await cache.get_or_load('books:1', loader) == {'id': '1', 'title': 'Dune'}
+    assert await cache.get_or_load('books:1', loader) == {'id': '1', 'title': 'Dune'}
+    assert len(calls) == 1 and cache.hits == 1 and cache.misses == 1
+    assert 0 < await cache.backend.client.ttl('books:1') <= 30
+
+    await cache.backend.set('books:list:10', [1], 30)
+    await cache.backend.set('categories:all', [2], 30)
+    await cache.invalidate_prefix('books:')
+    assert await cache.backend.get('books:1') is MISSING
+    assert await cache.backend.get('books:list:10') is MISSING
+    assert await cache.backend.get('categories:all') == [2]
+    await cache.invalidate('categories:all')
+    assert await cache.backend.get('categories:all') is MISSING
+    await cache.close()
+
+
+async def test_list_cache_follows_collection_version(db, monkeypatch):
+    from app.schemas.books import BookResponse
+    from app.services.books import BookService
+    monkeypatch.setattr('app.services.cache', Cache(MemoryBackend()))
+    books = BookService(db)
+    book = {'title': 'Dune', 'author': 'Frank Herbert', 'isbn': '9780441013593', 'publisher': 'Ace',
+            'year_published': 1965, 'copies_available': 3}
+    await books._insert(dict(book), BookResponse)
+    assert [item['title'] for item in (await books.get_books())[0]] == ['Dune']
+    await books._insert({**book, 'title': 'Dune Messiah', 'isbn': '9780441172696'}, BookResponse)
+    assert [item['title'] for item in (await books.get_books())[0]] == ['Dune', 'Dune Messiah']
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from mongomock.collection import Collection
+from mongomock_motor import AsyncMongoMockDatabase
+from benchmarks.coalescing import find_commands, setup
+from app.cache import Cache, MemoryBackend
+from app.services.books import BookService
+from app.services.reviews import ReviewService
+from app.singleflight import flights
+
+pytestmark = pytest.mark.anyio
+
+CONCURRENCY = 500
+
+
+def reads(db, monkeypatch, collection: str, method: str):
+    if not isinstance(db, AsyncMongoMockDatabase):
+        before = find_commands(collection)
+        return lambda: find_commands(collection) - before
+    calls = []
+    original = getattr(Collection, method)
+
+    def counted(self, *args, **kwargs):
+        if self.name == collection:
+            calls.append(args)
+        return original(self, *args, **kwargs)
+    monkeypatch.setattr(Collection, method, counted)
+    return lambda: len(calls)
+
+
+async def test_concurrent_get_book_runs_one_query(any_db, monkeypatch):
+    monkeypatch.setattr('app.services.cache', Cache(MemoryBackend()))
+    book_id = await setup(any_db, reviews=5)
+    queries, coalesced = reads(any_db, monkeypatch, 'books', 'find_one'), flights.coalesced
+    books = await asyncio.gather(*[BookService(any_db).get_book(book_id) for _ in range(CONCURRENCY)])
+    assert {book.id for book in books} == {book_id}
+    assert queries() == 1
+    assert flights.coalesced - coalesced == CONCURRENCY - 1
+
+
+async def test_concurrent_get_reviews_runs_one_query(any_db, monkeypatch):
+    book_id = await setup(any_db, reviews=5)
+    queries = reads(any_db, monkeypatch, 'reviews', 'find')
+    reviews = await asyncio.gather(*[ReviewService(any_db).get_reviews(book_id) for _ in range(CONCURRENCY)])
+    assert {len(result) for result in reviews} == {5}
+    assert queries() == 1
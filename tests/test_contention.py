@@ -0,0 +1,36 @@
+import pytest
+from bson.objectid import ObjectId
+from benchmarks.contention import hammer_copies, hammer_moves, hammer_stock, setup
+from app.services.inventory import InventoryService
+
+pytestmark = pytest.mark.anyio
+
+COPIES = 100
+WORKERS = 50
+OPERATIONS = 10
+
+
+async def test_stock_counts_stay_exact_on_one_title(any_db):
+    book_id, store_ids = await setup(any_db, COPIES)
+    counts = await hammer_stock(any_db, book_id, store_ids[0], WORKERS, OPERATIONS, seed=7)
+    stock = await any_db['stock'].find_one({'bookstore_id': store_ids[0], 'book_id': book_id})
+    assert counts['reserved'] == counts['released'] + counts['checked_out']
+    assert counts['reserved'] + counts['rejected'] == WORKERS * OPERATIONS
+    assert (stock['available'], stock['reserved'], stock['checked_out']) == (COPIES - counts['checked_out'], 0, counts['checked_out'])
+
+
+async def test_stock_moves_keep_every_copy(any_db):
+    book_id, store_ids = await setup(any_db, COPIES)
+    await InventoryService(any_db).receive(store_ids[1], book_id, COPIES)
+    moved = await hammer_moves(any_db, book_id, store_ids, WORKERS, OPERATIONS)
+    totals = [doc['available'] async for doc in any_db['stock'].find({'book_id': book_id})]
+    assert moved > 0
+    assert sum(totals) == 2 * COPIES and min(totals) >= 0
+
+
+async def test_copies_are_never_oversold(any_db):
+    book_id, _ = await setup(any_db, COPIES)
+    sold = await hammer_copies(any_db, book_id, WORKERS, OPERATIONS)
+    book = await any_db['books'].find_one({'_id': ObjectId(book_id)})
+    assert sold == COPIES
+    assert book['copies_available'] == 0
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import HTTPException
+from app.etags import encoded, expected_version, identity, matches
+
+pytestmark = pytest.mark.anyio
+
+BOOK = {'author': 'F. Scott Fitzgerald', 'publisher': "Charles Scribner's Sons", 'year_published': 1925,
+        'copies_available': 5, 'total_reviews': 0, 'rating_sum': 0, 'version': 1}
+
+
+def test_encoded_tags_match_their_identity():
+    tag = '"books-42"'
+    assert encoded(tag, 'gzip') == '"books-42-gzip"'
+    assert identity('"books-42-br"') == tag and identity(tag) == tag
+    assert matches('"books-41", W/"books-42-zstd"', tag)
+    assert not matches('"books-41-gzip"', tag)
+    assert expected_version('"6769be7156ca61f944fa3f90-3-gzip"', '6769be7156ca61f944fa3f90') == 3
+    with pytest.raises(HTTPException):
+        expected_version('"6769be7156ca61f944fa3f90-3-deflate"', '6769be7156ca61f944fa3f90')
+
+
+async def test_compressed_responses_get_their_own_etag(client, db):
+    result = await db['books'].insert_many([{**BOOK, 'title': f'Book {n}', 'isbn': f'{n:013d}'} for n in range(20)])
+    book_id = str(result.inserted_ids[0])
+
+    plain = await client.get('/books', headers={'Accept-Encoding': 'identity'})
+    gzipped = await client.get('/books', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['content-encoding'] == 'gzip'
+    assert gzipped.headers['etag'] == encoded(plain.headers['etag'], 'gzip')
+    cached = await client.get('/books', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['etag']})
+    assert cached.status_code == 304 and cached.headers['etag'] == gzipped.headers['etag']
+    revalidated = await client.get('/books', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['etag']})
+    assert revalidated.status_code == 304 and revalidated.headers['etag'] == plain.headers['etag']
+
+    book = await client.get(f'/books/{book_id}', headers={'Accept-Encoding': 'gzip'})
+    updated = await client.put(f'/books/{book_id}', json={'copies_available': 4}, headers={'If-Match': encoded(book.headers['etag'], 'gzip')})
+    assert updated.status_code == 200 and updated.json()['version'] == 2
@@ -0,0 +1,44 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from app.events import Consumer
+from app.metrics import EVENT_CONSUMER_OVERFLOW
+from app.schemas.events import ChangeEvent
+
+pytestmark = pytest.mark.anyio
+
+
+def event(number: int):
+    return ChangeEvent(collection='books', operation='update', document_id=str(number), changed=['title'],
+                       occurred_at=datetime.now(timezone.utc))
+
+
+def consumer(name: str, handled: list):
+    async def handler(db, batch):
+        handled.append([item.document_id for item in batch])
+    return Consumer(name, handler, ('books',), batch_size=10, max_pending=2, block_timeout=0.01)
+
+
+async def test_full_queue_handles_events_inline():
+    handled = []
+    books = consumer('test_overflow', handled)
+    for number in range(3):
+        await books.enqueue(None, event(number))
+    assert [item.document_id for item in books.queue] == ['0', '1']
+    assert handled == [['2']]
+    assert EVENT_CONSUMER_OVERFLOW.labels('test_overflow')._value.get() == 1
+
+
+async def test_full_queue_waits_for_a_flush():
+    handled = []
+    books = consumer('test_backpressure', handled)
+    books.block_timeout = 1
+    for number in range(2):
+        await books.enqueue(None, event(number))
+    waiting = asyncio.create_task(books.enqueue(None, event(2)))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+    await books.flush(None)
+    await waiting
+    assert [document_id for batch in handled for document_id in batch] + [item.document_id for item in books.queue] == ['0', '1', '2']
+    assert EVENT_CONSUMER_OVERFLOW.labels('test_backpressure')._value.get() == 0
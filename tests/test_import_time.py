@@ -0,0 +1,16 @@
+import os
+import statistics
+from benchmarks.import_time import cold_import
+
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 1500))
+LAZY_MODULES = ('app.services.transfer', 'app.server', 'numpy', 'scipy', 'redis', 'uvicorn')
+
+
+def test_cold_import_stays_within_budget():
+    median = statistics.median(cold_import('app.main')['app.main'][1] for _ in range(3))
+    assert median <= IMPORT_BUDGET_MS, f"importing app.main took {median:.0f} ms"
+
+
+def test_rarely_used_modules_are_imported_on_first_use():
+    modules = cold_import('app.main')
+    assert [name for name in LAZY_MODULES if name in modules] == []
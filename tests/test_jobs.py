@@ -0,0 +1,32 @@
+import pytest
+from app import jobs
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_only_one_worker_runs_a_leased_job(db, monkeypatch):
+    runs = []
+
+    async def rebuild():
+        runs.append(jobs.owner)
+        return len(runs)
+
+    await jobs.run_leased(db, 'rebuild_rollups', 3600, rebuild)
+    monkeypatch.setattr(jobs, 'owner', 'other-worker')
+    await jobs.run_leased(db, 'rebuild_rollups', 3600, rebuild)
+    await jobs.run_leased(db, 'rebuild_similarities', 3600, rebuild)
+    assert runs == [runs[0], 'other-worker']
+    assert runs[0] != 'other-worker'
+
+
+async def test_expired_lease_is_taken_over(db, monkeypatch):
+    runs = []
+
+    async def reconcile():
+        runs.append(jobs.owner)
+
+    await jobs.run_leased(db, 'reconcile_book_ratings', 0, reconcile)
+    monkeypatch.setattr(jobs, 'owner', 'other-worker')
+    await jobs.run_leased(db, 'reconcile_book_ratings', 3600, reconcile)
+    lease = await db['job_leases'].find_one({'_id': 'reconcile_book_ratings'})
+    assert runs[1:] == ['other-worker'] and lease['owner'] == 'other-worker'
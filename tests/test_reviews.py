@@ -0,0 +1,50 @@
+import pytest
+from app.services.reviews import MAX_REVIEWS_PER_BOOK, ReviewService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_batch_reviews_are_capped_per_book(db):
+    await db['reviews'].insert_many([{'book_id': 'a', 'content': f'review {index}', 'rating': index % 5 + 1, 'user_id': None}
+                                     for index in range(MAX_REVIEWS_PER_BOOK + 20)] +
+                                    [{'book_id': 'b', 'content': 'only review', 'rating': 3, 'user_id': None}])
+    reviews = await ReviewService(db).get_reviews_for_books(['a,b', 'missing'], top_rated=True)
+    assert [len(reviews[book_id]) for book_id in ('a', 'b', 'missing')] == [MAX_REVIEWS_PER_BOOK, 1, 0]
+    ratings = [review['rating'] for review in reviews['a']]
+    assert ratings == sorted(ratings, reverse=True) and ratings.count(1) == 4
+
+
+async def test_get_reviews_loads_one_book(db):
+    await db['reviews'].insert_many([{'book_id': 'a', 'content': 'first', 'rating': 4},
+                                     {'book_id': 'b', 'content': 'second', 'rating': 2}])
+    reviews = await ReviewService(db).get_reviews('a')
+    assert [review['content'] for review in reviews] == ['first']
+
+
+async def test_activity_on_missing_review_is_not_found(client, db):
+    missing = '6769be7156ca61f944fa3f90'
+    assert (await client.post(f'/like_review?review_id={missing}')).status_code == 404
+    assert (await client.post(f'/comment_review?review_id={missing}', json={'user': 'John Doe', 'content': 'Great review!'})).status_code == 404
+    review = await db['reviews'].insert_one({'book_id': 'a', 'content': 'first', 'rating': 4, 'user_id': None})
+    assert (await client.post(f'/like_review?review_id={review.inserted_id}')).status_code == 202
+
+
+async def test_reconcile_skips_books_changed_since_read(db):
+    books = await db['books'].insert_many([{'title': 'Stale', 'rating_sum': 0, 'total_reviews': 0},
+                                           {'title': 'Busy', 'rating_sum': 0, 'total_reviews': 0}])
+    stale, busy = books.inserted_ids
+    await db['reviews'].insert_many([{'book_id': str(stale), 'content': 'first', 'rating': 4, 'user_id': None},
+                                     {'book_id': str(busy), 'content': 'second', 'rating': 5, 'user_id': None}])
+    service = ReviewService(db)
+    aggregate = service.collection.aggregate
+
+    async def racing(pipeline):
+        await db['reviews'].insert_one({'book_id': str(busy), 'content': 'third', 'rating': 3, 'user_id': None})
+        await db['books'].update_one({'_id': busy}, {'$inc': {'rating_sum': 3, 'total_reviews': 1}})
+        async for row in aggregate(pipeline):
+            yield row
+    service.collection.aggregate = racing
+
+    assert await service.reconcile_book_ratings() == 1
+    assert await db['books'].find_one({'_id': stale}, {'_id': 0, 'rating_sum': 1, 'total_reviews': 1}) == {'rating_sum': 4, 'total_reviews': 1}
+    assert await db['books'].find_one({'_id': busy}, {'_id': 0, 'rating_sum': 1, 'total_reviews': 1}) == {'rating_sum': 3, 'total_reviews': 1}
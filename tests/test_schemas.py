@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+import pytest
+from pydantic import TypeAdapter
+from app.schemas.books import BookResponse
+from app.schemas.reviews import ReviewResponse
+from app.schemas.search import BookSearchResults, BookSuggestion, ReviewSearchResults
+from app.schemas.users import UserDetails
+
+pytestmark = pytest.mark.anyio
+
+LEGACY_BOOK = {'title': 'The Great Gatsby', 'author': 'F. Scott Fitzgerald', 'isbn': '9780743273565',
+               'publisher': "Charles Scribner's Sons", 'year_published': 1925, 'copies_available': 5}
+CURRENT_BOOK = {**LEGACY_BOOK, 'title': 'Tender Is the Night', 'isbn': '9780684801544', 'year_published': 1934,
+                'rating_sum': 9, 'total_reviews': 2, 'search_terms': ['tender', 'is', 'the', 'night'],
+                'version': 4, 'updated_at': datetime(2024, 7, 2, tzinfo=timezone.utc)}
+
+
+async def seed(db):
+    books = await db['books'].insert_many([LEGACY_BOOK, CURRENT_BOOK])
+    book_id = str(books.inserted_ids[0])
+    await db['users'].insert_many([{'username': 'uday', 'email': 'uday@example.com', 'full_name': 'Uday Reddy'},
+                                   {'username': 'tej', 'email': 'tej@example.com', 'full_name': 'Tej Kumar',
+                                    'hashed_password': 'secret', 'total_reviews': 1, 'favorite_books': [book_id], 'version': 2}])
+    await db['reviews'].insert_many([{'book_id': book_id, 'content': 'A captivating story with deep symbolism.', 'rating': 4},
+                                     {'book_id': book_id, 'content': 'Gatsby is unforgettable.', 'rating': 5, 'user_id': None}])
+    return book_id
+
+
+def conforms(schema, payload):
+    items = TypeAdapter(schema).validate_python(payload)
+    dumped = TypeAdapter(schema).dump_python(items, mode='json')
+    assert [set(item) for item in payload] == [set(item) for item in dumped]
+    return items
+
+
+async def test_books_conform_to_book_response(client, db):
+    await seed(db)
+    response = await client.get('/books')
+    assert response.status_code == 200
+    books = conforms(list[BookResponse], response.json())
+    assert [(book.total_reviews, book.average_rating, book.version) for book in books] == [(0, 0.0, 0), (2, 4.5, 4)]
+
+
+async def test_users_conform_to_user_details(client, db):
+    await seed(db)
+    response = await client.get('/get_users')
+    assert response.status_code == 200
+    users = conforms(list[UserDetails], response.json())
+    assert users[0].favorite_books == [] and users[0].total_reviews == 0
+
+
+async def test_reviews_conform_to_review_response(client, db):
+    book_id = await seed(db)
+    response = await client.get('/get_reviews', params={'book_id': book_id})
+    assert response.status_code == 200
+    reviews = conforms(list[ReviewResponse], response.json())
+    assert [review.user_id for review in reviews] == [None, None]
+    batch = await client.get('/get_reviews/batch', params={'book_ids': book_id, 'per_book': 1})
+    assert batch.status_code == 200
+    assert len(conforms(list[ReviewResponse], batch.json()[book_id])) == 1
+
+
+async def test_suggestions_conform_to_book_suggestion(client, db):
+    await seed(db)
+    response = await client.get('/search/books/suggest', params={'prefix': 'tend'})
+    assert response.status_code == 200
+    assert [hit.title for hit in conforms(list[BookSuggestion], response.json())] == ['Tender Is the Night']
+
+
+async def test_search_conforms_to_search_results(mongod_client, mongod_db):
+    await seed(mongod_db)
+    books = await mongod_client.get('/search/books', params={'q': 'gatsby'})
+    assert books.status_code == 200
+    assert BookSearchResults(**books.json()).results[0].title == 'The Great Gatsby'
+    reviews = await mongod_client.get('/search/reviews', params={'q': 'symbolism'})
+    assert reviews.status_code == 200
+    assert ReviewSearchResults(**reviews.json()).results[0].rating == 4
@@ -0,0 +1,23 @@
+import pytest
+from app.schemas.books import BookCreate, BookUpdate
+from app.schemas.categories import CreateCategory
+from app.services.books import BookService
+from app.services.categories import CategoryService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_books_are_suggested_by_category_name(db):
+    books = BookService(db)
+    category = await CategoryService(db).create_category(CreateCategory(name='Science Fiction'))
+    book = await books.create_book(BookCreate(title='Dune', author='Frank Herbert', isbn='9780441013593',
+                                              publisher='Ace', year_published=1965, copies_available=3))
+    assert await books.suggest_books('science') == []
+    await books.update_book(book.id, BookUpdate(category_id=category.id))
+    assert [hit['title'] for hit in await books.suggest_books('science fic')] == ['Dune']
+
+
+def test_search_terms_include_category_name(db):
+    doc = BookService(db)._with_search_terms({'title': 'Dune', 'author': 'Frank Herbert', 'publisher': 'Ace',
+                                              'category': {'id': '1', 'name': 'Science Fiction'}})
+    assert {'science', 'fiction', 'dune'} <= set(doc['search_terms'])
@@ -0,0 +1,14 @@
+import logging
+from app.server import worker_count
+
+
+def test_in_memory_cache_and_events_run_one_worker(caplog):
+    with caplog.at_level(logging.WARNING, logger='app.server'):
+        assert worker_count(4, 'memory', 'memory') == 1
+    assert 'starting 1 worker instead' in caplog.text
+    assert worker_count(1, 'memory', 'memory') == 1
+
+
+def test_shared_cache_or_change_stream_allows_workers():
+    assert worker_count(4, 'redis', 'memory') == 4
+    assert worker_count(4, 'memory', 'changestream') == 4
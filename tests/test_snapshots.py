@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services import snapshots
+from app.services.snapshots import SNAPSHOT_LEASE_SECONDS, SnapshotService
+
+pytestmark = pytest.mark.anyio
+
+
+async def running_job(db, heartbeat_at: datetime):
+    category = await db['categories'].insert_one({'name': 'Science Fiction'})
+    category_id = str(category.inserted_id)
+    await db['books'].insert_one({'title': 'Dune', 'author': 'Frank Herbert', 'publisher': 'Ace',
+                                  'category': {'id': category_id, 'name': 'Sci-Fi'}, 'search_terms': ['dune', 'sci', 'fi']})
+    job = await db['snapshot_jobs'].insert_one({'kind': 'category', 'ref_id': category_id, 'status': 'running', 'attempts': 1,
+                                               'batches': 0, 'updated': 0, 'error': None, 'owner': 'other-worker',
+                                               'heartbeat_at': heartbeat_at, 'created_at': heartbeat_at, 'updated_at': heartbeat_at})
+    return job.inserted_id
+
+
+async def test_resume_leaves_jobs_of_live_workers_alone(db):
+    job_id = await running_job(db, datetime.now(timezone.utc))
+    assert await SnapshotService(db).resume_jobs() == 0
+    job = await db['snapshot_jobs'].find_one({'_id': job_id})
+    assert (job['status'], job['owner'], job['attempts']) == ('running', 'other-worker', 1)
+
+
+async def test_resume_reclaims_jobs_with_expired_heartbeat(db):
+    job_id = await running_job(db, datetime.now(timezone.utc) - timedelta(seconds=SNAPSHOT_LEASE_SECONDS + 1))
+    assert await SnapshotService(db).resume_jobs() == 1
+    job = await db['snapshot_jobs'].find_one({'_id': job_id})
+    assert (job['status'], job['owner'], job['attempts'], job['updated']) == ('done', snapshots.owner, 2, 1)
+    book = await db['books'].find_one({})
+    assert book['category']['name'] == 'Science Fiction'
+    assert {'science', 'fiction'} <= set(book['search_terms'])
@@ -0,0 +1,54 @@
+import json
+import pytest
+from app.services.transfer import RESTORE_ORDER, export_stream, import_file
+
+pytestmark = pytest.mark.anyio
+
+BOOK = {'author': 'F. Scott Fitzgerald', 'publisher': "Charles Scribner's Sons", 'year_published': 1925,
+        'copies_available': 5}
+
+
+def write_ndjson(path, rows):
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    return str(path)
+
+
+async def test_import_refreshes_list_etag_and_cache(client, db, tmp_path):
+    before = await client.get('/books')
+    assert before.json() == []
+
+    path = write_ndjson(tmp_path / 'books.ndjson', [{**BOOK, 'title': f'Book {n}', 'isbn': f'{n:013d}'} for n in range(3)])
+    state = await import_file(db, 'books', path, report=lambda message: None)
+    assert state['inserted'] == 3
+
+    after = await client.get('/books', headers={'If-None-Match': before.headers['etag']})
+    assert after.status_code == 200 and after.headers['etag'] != before.headers['etag']
+    assert sorted(book['title'] for book in after.json()) == ['Book 0', 'Book 1', 'Book 2']
+
+
+async def dump(db, collection, fmt, path):
+    with open(path, 'wb') as output:
+        async for chunk in export_stream(db, collection, fmt, compress=False, include_secrets=True):
+            output.write(chunk)
+    return str(path)
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'csv'])
+async def test_restore_keeps_book_references(db, tmp_path, fmt):
+    from benchmarks.fake import fake_database
+    author = await db['authors'].insert_one({'name': 'F. Scott Fitzgerald', 'awards': ['Pulitzer, finalist'], 'version': 1})
+    category = await db['categories'].insert_one({'name': 'Fiction', 'total_books': 1, 'version': 1})
+    await db['books'].insert_one({**BOOK, 'title': 'The Great Gatsby', 'isbn': '1234567890123', 'author_id': str(author.inserted_id),
+                                  'category': {'id': str(category.inserted_id), 'name': 'Fiction'}, 'version': 1})
+
+    restored = fake_database('bookshelf_restore')
+    for collection in RESTORE_ORDER:
+        path = await dump(db, collection, fmt, tmp_path / f'{collection}.{fmt}')
+        state = await import_file(restored, collection, path, fmt=fmt, report=lambda message: None)
+        assert state['rejected'] == 0
+
+    book = await restored['books'].find_one({})
+    assert book['author_id'] == str(author.inserted_id) and book['category']['id'] == str(category.inserted_id)
+    assert (await restored['authors'].find_one({}))['awards'] == ['Pulitzer, finalist']
+    assert (await restored['authors'].find_one({}))['total_published'] == 1
+    assert (await restored['categories'].find_one({}))['total_books'] == 1